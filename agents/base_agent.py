@@ -1,5 +1,11 @@
-from pydantic import BaseModel,Field
+import hashlib
+import inspect
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+from pydantic import BaseModel, Field, PrivateAttr, model_serializer
 from abc import ABC, abstractmethod
+from agents.tokens import TicketTokens
 
 class Ticket(BaseModel):
     """
@@ -13,6 +19,50 @@ class Ticket(BaseModel):
     monthly_revenue: float = Field(description="Average monthly revenue generated by this customer.")
     account_age_days: int = Field(description="Age of the customer's account in days.")
 
+    @classmethod
+    def trusted(cls, ticket_data: Dict) -> "Ticket":
+        """
+        Creates a ticket from data that is already known to be valid (e.g. read
+        from our own typed queue), without running validation.
+
+        Field values are taken as they are, so they must already have the
+        declared types, except that `monthly_revenue` may be an int (JSON
+        producers often write whole amounts without a fraction). Extra keys
+        are ignored. Raises KeyError if a field is missing.
+
+        Args:
+            ticket_data (Dict): Ticket information with every field of the model.
+
+        Returns:
+            Ticket: The unvalidated ticket.
+        """
+        # Equivalent to `model_construct`, which in pydantic v2 costs more than
+        # validating these few fields, since it handles defaults and aliases per field.
+        fields = {field: ticket_data[field] for field in _TICKET_FIELDS}
+        fields["monthly_revenue"] = float(fields["monthly_revenue"])
+        ticket = cls.__new__(cls)
+        object.__setattr__(ticket, "__dict__", fields)
+        object.__setattr__(ticket, "__pydantic_fields_set__", set(_TICKET_FIELDS))
+        object.__setattr__(ticket, "__pydantic_extra__", None)
+        object.__setattr__(ticket, "__pydantic_private__", None)
+        return ticket
+
+    @property
+    def tokens(self) -> TicketTokens:
+        """
+        The lowercased, tokenized subject and message that keyword rules match
+        against. Computed on first use and shared by every agent analyzing the
+        ticket; recomputed if the subject or message is replaced.
+        """
+        # Kept in __dict__ next to the fields; pydantic ignores it for equality and serialization
+        tokens = self.__dict__.get("_tokens")
+        if tokens is None or tokens.subject_text is not self.subject or tokens.message_text is not self.message:
+            tokens = self.__dict__["_tokens"] = TicketTokens(self.subject, self.message)
+        return tokens
+
+
+_TICKET_FIELDS = tuple(Ticket.model_fields)
+
 class AgentOutput(BaseModel):
     '''
     Model to represent structured output of agents analysis
@@ -21,11 +71,182 @@ class AgentOutput(BaseModel):
     priority: str = Field(description="Priority level of the ticket (Info, Low, Medium, High, Critical).")
     recommended_team: str = Field(description="Recommended team for routing the ticket (e.g., Engineering, Customer Success, Sales Support).")
     reasoning: str = Field(description="Detailed reasoning for the agent's decisions.")
+
+    # Outputs built with `deferred` keep compact reason codes and only render
+    # `reasoning` the first time it is read or the model is serialized.
+    _reason_codes: Tuple = PrivateAttr(default=())
+    _render_reasoning: Optional[Callable[[Tuple], str]] = PrivateAttr(default=None)
+
+    @classmethod
+    def deferred(
+        cls,
+        category: str,
+        priority: str,
+        recommended_team: str,
+        reason_codes: Tuple,
+        render_reasoning: Callable[[Tuple], str]
+    ) -> "AgentOutput":
+        """
+        Creates an output whose reasoning text is built on demand.
+
+        Args:
+            category (str): Ticket category.
+            priority (str): Ticket priority.
+            recommended_team (str): Team to route the ticket to.
+            reason_codes (Tuple): Structured reasons, e.g. ("enterprise_tier", ("high_revenue", 25000.0)).
+            render_reasoning (Callable): Builds the reasoning text from `reason_codes`.
+
+        Returns:
+            AgentOutput: The output, with `reasoning` not yet rendered.
+        """
+        # Equivalent to `model_construct` plus setting the private attributes,
+        # without its per-field default handling, since this runs for every ticket.
+        output = cls.__new__(cls)
+        object.__setattr__(output, "__dict__", {
+            "category": category,
+            "priority": priority,
+            "recommended_team": recommended_team,
+        })
+        object.__setattr__(output, "__pydantic_fields_set__", {"category", "priority", "recommended_team"})
+        object.__setattr__(output, "__pydantic_extra__", None)
+        object.__setattr__(output, "__pydantic_private__", {
+            "_reason_codes": reason_codes,
+            "_render_reasoning": render_reasoning,
+        })
+        return output
+
+    @property
+    def reason_codes(self) -> Tuple:
+        """
+        Structured reason codes behind `reasoning`; empty for outputs created with plain text.
+        """
+        return self.__pydantic_private__["_reason_codes"]
+
+    def reasoning_source(self) -> Union[str, Tuple[Callable[[Tuple], str], Tuple]]:
+        """
+        Returns what `reasoning` is built from, without rendering it: the
+        (render function, reason codes) of an output created with `deferred`,
+        or the reasoning text of an output created with plain text.
+        """
+        private = self.__pydantic_private__
+        if private["_render_reasoning"] is None:
+            return self.__dict__["reasoning"]
+        return private["_render_reasoning"], private["_reason_codes"]
+
+    def __getattr__(self, name: str):
+        if name == "reasoning":
+            self._materialize_reasoning()
+            return self.__dict__["reasoning"]
+        return super().__getattr__(name)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, AgentOutput):
+            return NotImplemented
+        return self.model_dump() == other.model_dump()
+
+    def __repr_args__(self):
+        self._materialize_reasoning()
+        return super().__repr_args__()
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        self._materialize_reasoning()
+        return handler(self)
+
+    def _materialize_reasoning(self) -> None:
+        if "reasoning" not in self.__dict__:
+            private = self.__pydantic_private__
+            self.__dict__["reasoning"] = private["_render_reasoning"](private["_reason_codes"])
+            self.__pydantic_fields_set__.add("reasoning")
+
+
+class TicketAnalysis(NamedTuple):
+    """
+    Full result of orchestrating one ticket: the validated ticket (None if it
+    failed validation), each agent's intermediate output (None if the agents
+    did not run, e.g. on a cache hit) and the final decision.
+    """
+    ticket: Optional[Ticket]
+    technical: Optional[AgentOutput]
+    customer: Optional[AgentOutput]
+    final: AgentOutput
+
+
+def render_reason_codes(reason_codes: Tuple, templates: Dict[str, str]) -> str:
+    """
+    Renders reason codes into space-separated sentences. A code is either a
+    template key or a (key, *args) tuple whose args fill the template. Codes
+    without a template (e.g. from a custom rule file) are used as the text itself.
+    """
+    return " ".join(
+        templates.get(code[0], code[0]).format(*code[1:]) if isinstance(code, tuple) else templates.get(code, code)
+        for code in reason_codes
+    )
+
     
+# Receives (stage, seconds) for every agent analysis when set (see `set_analysis_hook`)
+_analysis_hook: Optional[Callable[[str, float], None]] = None
+
+
+def set_analysis_hook(hook: Optional[Callable[[str, float], None]]) -> None:
+    """
+    Installs a function that is called with ("<AgentClass>.analyze", seconds)
+    after every agent analysis, e.g. `pipeline.latency.LatencyRecorder.observe`,
+    or removes it with None. Without a hook, the timing wrapper around each
+    agent's `analyze` only checks this global.
+    """
+    global _analysis_hook
+    _analysis_hook = hook
+
+
+def _timed(method: Callable, name: str) -> Callable:
+    """
+    Wraps an agent's `analyze` (or `aanalyze`) so the analysis hook times it.
+    Only the outermost call is timed when an override calls `super()`.
+    """
+    if inspect.iscoroutinefunction(method):
+        @wraps(method)
+        async def timed(self, ticket):
+            hook = _analysis_hook
+            if hook is None or getattr(type(self), name) is not timed:
+                return await method(self, ticket)
+            start = perf_counter()
+            try:
+                return await method(self, ticket)
+            finally:
+                hook(f"{type(self).__name__}.{name}", perf_counter() - start)
+    else:
+        @wraps(method)
+        def timed(self, ticket):
+            hook = _analysis_hook
+            if hook is None or getattr(type(self), name) is not timed:
+                return method(self, ticket)
+            start = perf_counter()
+            try:
+                return method(self, ticket)
+            finally:
+                hook(f"{type(self).__name__}.{name}", perf_counter() - start)
+    return timed
+
+
 class BaseAgent(ABC):
     '''
     abstract class for all AI agents in the system
     '''
+    # Relative cost of one analysis. With short-circuiting (see
+    # `Orchestrator.run_agents`) cheaper agents run first, so an expensive agent
+    # (e.g. a model call) is skipped when a cheap one already decides the ticket.
+    COST: float = 1.0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every concrete analysis method is timed automatically while an analysis hook is installed
+        for name in ("analyze", "aanalyze"):
+            method = cls.__dict__.get(name)
+            if method is None or getattr(method, "__isabstractmethod__", False) or getattr(method, "_delegates_analysis", False):
+                continue
+            setattr(cls, name, _timed(method, name))
+
     @abstractmethod
     def analyze(self, ticket: Ticket)-> AgentOutput:
         """
@@ -37,4 +258,57 @@ class BaseAgent(ABC):
         Returns:
             AgentOutput: A Pydantic model instance containing the agent's analysis.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def rules_fingerprint(self) -> str:
+        """
+        Returns a digest of the agent's rules: its upper-case class attributes
+        (rule tables, templates) and the source of its class. The value changes
+        whenever the rules change, so it can be used to invalidate cached results.
+        """
+        fingerprint = self.__dict__.get("_rules_fingerprint")
+        if fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for cls in type(self).__mro__:
+                digest.update(cls.__qualname__.encode())
+                for name, value in sorted(vars(cls).items()):
+                    if name.isupper():
+                        digest.update(f"{name}={value!r}".encode())
+                try:
+                    digest.update(inspect.getsource(cls).encode())
+                except (OSError, TypeError):
+                    pass
+            fingerprint = digest.hexdigest()
+            self.__dict__["_rules_fingerprint"] = fingerprint
+        return fingerprint
+
+
+class AsyncBaseAgent(BaseAgent):
+    '''
+    abstract class for agents whose analysis is asynchronous, e.g. agents that
+    call out to an LLM or another remote service
+    '''
+    @abstractmethod
+    async def aanalyze(self, ticket: Ticket) -> AgentOutput:
+        """
+        Asynchronously analyzes a given ticket and produces structured output.
+
+        Args:
+            ticket (Ticket): The Pydantic model instance of the incoming ticket.
+
+        Returns:
+            AgentOutput: A Pydantic model instance containing the agent's analysis.
+        """
+        pass
+
+    def analyze(self, ticket: Ticket) -> AgentOutput:
+        """
+        Blocking wrapper around `aanalyze` for synchronous callers.
+        """
+        # Imported here: most processes only run synchronous agents
+        import asyncio
+
+        return asyncio.run(self.aanalyze(ticket))
+
+    # Not timed itself: the `aanalyze` it runs is
+    analyze._delegates_analysis = True
\ No newline at end of file
@@ -1,76 +1,63 @@
-from agents.base_agent import BaseAgent, Ticket, AgentOutput
+from typing import Tuple
+from agents.base_agent import Ticket, AgentOutput, render_reason_codes
+from agents.rules import RuleDrivenAgent
 
-class CustomerContextAgent(BaseAgent):
+class CustomerContextAgent(RuleDrivenAgent):
     """
     Specialized agent focused on analyzing the customer's context (tier, revenue,
     previous tickets, account age) to determine business impact and priority.
     """
+    # The tier, revenue, ticket-history and category rules live in the "customer"
+    # section of the active RuleSet (agents/default_rules.json by default).
+    RULES_SECTION = "customer"
+
+    REASON_TEMPLATES = {
+        "enterprise_tier": "Enterprise customer, elevating priority.",
+        "premium_tier": "Premium customer, elevating priority to Medium.",
+        "free_tier": "Free tier customer.",
+        "high_revenue": "High monthly revenue (${}), further elevating priority.",
+        "medium_revenue": "Medium monthly revenue (${}).",
+        "low_revenue": "Low monthly revenue (${}).",
+        "many_previous_tickets": "Many previous tickets ({}), indicates potential chronic issue or frustrated customer, elevating priority.",
+        "some_previous_tickets": "Some previous tickets ({}).",
+        "few_previous_tickets": "Few previous tickets ({}).",
+        "billing_keywords": "Detected billing-related keywords.",
+        "account_keywords": "Detected account management keywords.",
+        "urgent_high_value": "Urgent issue for high-value customer, recommending Account Manager.",
+        "general_inquiry": "General customer inquiry.",
+    }
+
     def analyze(self, ticket: Ticket) -> AgentOutput:
         """
         Analyzes customer attributes to assess priority and suggest appropriate
         customer-facing team.
         """
-        category = "General Inquiry"
-        priority = "Low"
-        recommended_team = "Customer Success"
-        reasoning = []
+        category, priority, recommended_team, reason_codes = self.decide(ticket)
 
-        # --- Priority Determination based on Customer Tier ---
-        if ticket.customer_tier == "enterprise":
-            priority = "High"
-            reasoning.append("Enterprise customer, elevating priority.")
-        elif ticket.customer_tier == "premium":
-            if priority != "High": # Don't downgrade if already high
-                priority = "Medium"
-                reasoning.append("Premium customer, elevating priority to Medium.")
-        elif ticket.customer_tier == "free":
-            if priority == "Low": # Ensure it doesn't get downgraded from technical agent's assessment
-                priority = "Low"
-            reasoning.append("Free tier customer.")
+        return AgentOutput.deferred(
+            category=category,
+            priority=priority,
+            recommended_team=recommended_team,
+            reason_codes=reason_codes,
+            render_reasoning=render_customer_reasoning
+        )
 
-        # --- Priority Adjustment based on Monthly Revenue ---
-        if ticket.monthly_revenue >= 10000:
-            if priority == "Medium": priority = "High"
-            elif priority == "Low": priority = "Medium"
-            reasoning.append(f"High monthly revenue (${ticket.monthly_revenue}), further elevating priority.")
-        elif ticket.monthly_revenue >= 1000:
-            # Maintain current priority
-            reasoning.append(f"Medium monthly revenue (${ticket.monthly_revenue}).")
-        else:
-            if priority == "Medium": priority = "Low" # Only lower if not High/Critical
-            reasoning.append(f"Low monthly revenue (${ticket.monthly_revenue}).")
 
-        # --- Priority Adjustment based on Previous Tickets ---
-        if ticket.previous_tickets >= 5:
-            if priority == "Medium": priority = "High"
-            elif priority == "Low": priority = "Medium"
-            reasoning.append(f"Many previous tickets ({ticket.previous_tickets}), indicates potential chronic issue or frustrated customer, elevating priority.")
-        elif ticket.previous_tickets >= 2:
-            reasoning.append(f"Some previous tickets ({ticket.previous_tickets}).")
-        else:
-            reasoning.append(f"Few previous tickets ({ticket.previous_tickets}).")
+    def analyze_columns(self, tier, monthly_revenue, previous_tickets, billing=None, account=None):
+        """
+        Columnar mode: scores a whole batch of tickets given as NumPy arrays,
+        with results identical to calling `analyze` on each ticket. Requires
+        NumPy, and raises ValueError if this agent's rules are not the built-in
+        customer rules, which the columnar path implements.
 
-        # --- Category and Team Determination ---
-        if "billing" in ticket.subject.lower() or "payment" in ticket.message.lower():
-            category = "Billing Inquiry"
-            recommended_team = "Billing Support"
-            reasoning.append("Detected billing-related keywords.")
-        elif "account" in ticket.subject.lower() or "login" in ticket.message.lower() or "password" in ticket.subject.lower():
-            category = "Account Management"
-            recommended_team = "Customer Success"
-            reasoning.append("Detected account management keywords.")
-        elif priority in ["High", "Critical"] and ticket.customer_tier in ["premium", "enterprise"]:
-            category = "Urgent Customer Issue"
-            recommended_team = "Account Manager"
-            reasoning.append("Urgent issue for high-value customer, recommending Account Manager.")
-        else:
-            category = "General Inquiry"
-            recommended_team = "Customer Success"
-            reasoning.append("General customer inquiry.")
+        See `agents.customer_context_columnar.analyze_customer_columns` for the arguments.
+        """
+        from agents.customer_context_columnar import analyze_customer_columns
+        return analyze_customer_columns(tier, monthly_revenue, previous_tickets, billing, account, self.rules)
 
-        return AgentOutput(
-            category=category,
-            priority=priority,
-            recommended_team=recommended_team,
-            reasoning="Customer context analysis: " + " ".join(reasoning)
-        )
\ No newline at end of file
+
+def render_customer_reasoning(reason_codes: Tuple) -> str:
+    """
+    Renders the reasoning text of a CustomerContextAgent output from its reason codes.
+    """
+    return "Customer context analysis: " + render_reason_codes(reason_codes, CustomerContextAgent.REASON_TEMPLATES)
\ No newline at end of file
@@ -0,0 +1,223 @@
+from typing import Iterator, List, Optional, Sequence
+import numpy as np
+from agents.base_agent import Ticket, AgentOutput
+from agents.rules import RuleSet, active_rules
+from agents.tokens import TokenSet
+
+# Small-integer codes used by the columnar path. Priorities are ordered so
+# that a larger code always means a more urgent ticket.
+TIERS = ("free", "premium", "enterprise")
+PRIORITIES = ("Info", "Low", "Medium", "High", "Critical")
+CATEGORIES = ("General Inquiry", "Billing Inquiry", "Account Management", "Urgent Customer Issue")
+TEAMS = ("Customer Success", "Billing Support", "Account Manager")
+
+TIER_FREE, TIER_PREMIUM, TIER_ENTERPRISE, TIER_OTHER = 0, 1, 2, -1
+PRIORITY_LOW, PRIORITY_MEDIUM, PRIORITY_HIGH, PRIORITY_CRITICAL = 1, 2, 3, 4
+CATEGORY_GENERAL, CATEGORY_BILLING, CATEGORY_ACCOUNT, CATEGORY_URGENT = 0, 1, 2, 3
+TEAM_CUSTOMER_SUCCESS, TEAM_BILLING, TEAM_ACCOUNT_MANAGER = 0, 1, 2
+
+_TEAM_BY_CATEGORY = np.array([TEAM_CUSTOMER_SUCCESS, TEAM_BILLING, TEAM_CUSTOMER_SUCCESS, TEAM_ACCOUNT_MANAGER], dtype=np.int8)
+
+
+class CustomerContextColumns:
+    """
+    Result of `analyze_customer_columns`: one entry per ticket in each array,
+    holding the codes defined in this module.
+    """
+    def __init__(
+        self,
+        tier: np.ndarray,
+        monthly_revenue: np.ndarray,
+        previous_tickets: np.ndarray,
+        priority: np.ndarray,
+        category: np.ndarray,
+        recommended_team: np.ndarray
+    ):
+        self.tier = tier
+        self.monthly_revenue = monthly_revenue
+        self.previous_tickets = previous_tickets
+        self.priority = priority
+        self.category = category
+        self.recommended_team = recommended_team
+
+    def __len__(self) -> int:
+        return len(self.priority)
+
+    def to_outputs(self) -> Iterator[AgentOutput]:
+        """
+        Yields the same `AgentOutput` objects (including reasoning) that
+        `CustomerContextAgent.analyze` produces for each ticket.
+        """
+        from agents.customer_context import render_customer_reasoning
+
+        for i in range(len(self)):
+            yield AgentOutput.deferred(
+                category=CATEGORIES[self.category[i]],
+                priority=PRIORITIES[self.priority[i]],
+                recommended_team=TEAMS[self.recommended_team[i]],
+                reason_codes=self._reason_codes(i),
+                render_reasoning=render_customer_reasoning
+            )
+
+    def _reason_codes(self, i: int) -> tuple:
+        # Reconstructs the scalar path's reason codes for one ticket.
+        reasoning = []
+        tier = self.tier[i]
+        if tier == TIER_ENTERPRISE:
+            reasoning.append("enterprise_tier")
+        elif tier == TIER_PREMIUM:
+            reasoning.append("premium_tier")
+        elif tier == TIER_FREE:
+            reasoning.append("free_tier")
+
+        revenue = float(self.monthly_revenue[i])
+        if revenue >= 10000:
+            reasoning.append(("high_revenue", revenue))
+        elif revenue >= 1000:
+            reasoning.append(("medium_revenue", revenue))
+        else:
+            reasoning.append(("low_revenue", revenue))
+
+        previous_tickets = int(self.previous_tickets[i])
+        if previous_tickets >= 5:
+            reasoning.append(("many_previous_tickets", previous_tickets))
+        elif previous_tickets >= 2:
+            reasoning.append(("some_previous_tickets", previous_tickets))
+        else:
+            reasoning.append(("few_previous_tickets", previous_tickets))
+
+        reasoning.append((
+            "general_inquiry", "billing_keywords", "account_keywords", "urgent_high_value"
+        )[self.category[i]])
+        return tuple(reasoning)
+
+
+def encode_tiers(customer_tiers: Sequence[str]) -> np.ndarray:
+    """
+    Converts tier names to tier codes; unknown tiers become TIER_OTHER.
+    """
+    codes = {name: code for code, name in enumerate(TIERS)}
+    return np.fromiter((codes.get(tier, TIER_OTHER) for tier in customer_tiers), dtype=np.int8, count=len(customer_tiers))
+
+
+def analyze_customer_columns(
+    tier: np.ndarray,
+    monthly_revenue: np.ndarray,
+    previous_tickets: np.ndarray,
+    billing: Optional[np.ndarray] = None,
+    account: Optional[np.ndarray] = None,
+    rules: Optional[RuleSet] = None
+) -> CustomerContextColumns:
+    """
+    Vectorized equivalent of `CustomerContextAgent.analyze` over a batch of tickets.
+    The tiers, thresholds and keywords of the built-in customer rules are
+    compiled into this function, so other rules are rejected rather than
+    silently ignored; use `analyze` for those.
+
+    Args:
+        tier (np.ndarray): Tier codes (see `encode_tiers`).
+        monthly_revenue (np.ndarray): Monthly revenue per ticket.
+        previous_tickets (np.ndarray): Previous ticket count per ticket.
+        billing (np.ndarray, optional): True where the ticket has billing keywords
+                                        (see `keyword_flags`); all False if omitted.
+        account (np.ndarray, optional): True where the ticket has account management keywords.
+        rules (RuleSet, optional): The rules to apply; defaults to the active ruleset.
+
+    Returns:
+        CustomerContextColumns: Priority, category and team codes for every ticket.
+
+    Raises:
+        ValueError: If the customer rules are not the built-in ones.
+    """
+    check_builtin_rules(rules or active_rules())
+    tier = np.asarray(tier, dtype=np.int8)
+    monthly_revenue = np.asarray(monthly_revenue, dtype=np.float64)
+    previous_tickets = np.asarray(previous_tickets, dtype=np.int64)
+    billing = np.zeros(len(tier), dtype=bool) if billing is None else np.asarray(billing, dtype=bool)
+    account = np.zeros(len(tier), dtype=bool) if account is None else np.asarray(account, dtype=bool)
+
+    # --- Priority Determination based on Customer Tier ---
+    priority = np.where(
+        tier == TIER_ENTERPRISE, PRIORITY_HIGH,
+        np.where(tier == TIER_PREMIUM, PRIORITY_MEDIUM, PRIORITY_LOW)
+    ).astype(np.int8)
+
+    # --- Priority Adjustment based on Monthly Revenue ---
+    # Low -> Medium and Medium -> High are both a one-step bump below High.
+    high_revenue = monthly_revenue >= 10000
+    low_revenue = ~(monthly_revenue >= 1000)  # written this way so NaN counts as low, as in the scalar path
+    priority += (high_revenue & (priority < PRIORITY_HIGH)).astype(np.int8)
+    priority -= (low_revenue & (priority == PRIORITY_MEDIUM)).astype(np.int8)
+
+    # --- Priority Adjustment based on Previous Tickets ---
+    priority += ((previous_tickets >= 5) & (priority < PRIORITY_HIGH)).astype(np.int8)
+
+    # --- Category and Team Determination ---
+    urgent = (priority >= PRIORITY_HIGH) & ((tier == TIER_PREMIUM) | (tier == TIER_ENTERPRISE))
+    category = np.select(
+        [billing, account, urgent],
+        [CATEGORY_BILLING, CATEGORY_ACCOUNT, CATEGORY_URGENT],
+        default=CATEGORY_GENERAL
+    ).astype(np.int8)
+
+    return CustomerContextColumns(
+        tier=tier,
+        monthly_revenue=monthly_revenue,
+        previous_tickets=previous_tickets,
+        priority=priority,
+        category=category,
+        recommended_team=_TEAM_BY_CATEGORY[category]
+    )
+
+
+def keyword_flags(subjects: Sequence[str], messages: Sequence[str]):
+    """
+    Computes the billing and account keyword flags used by the category rules,
+    matching whole words like the scalar path (see `agents.tokens`).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (billing, account) boolean arrays.
+    """
+    return _keyword_flags([TokenSet.from_text(subject) for subject in subjects], [TokenSet.from_text(message) for message in messages])
+
+
+def check_builtin_rules(rules: RuleSet) -> None:
+    """
+    Raises ValueError unless `rules` has the built-in customer rules, the only
+    ones the columnar path implements.
+    """
+    if rules.spec["customer"] != RuleSet.default().spec["customer"]:
+        raise ValueError(
+            "The columnar customer analysis only supports the built-in customer rules; "
+            "use CustomerContextAgent.analyze for custom rules"
+        )
+
+
+def analyze_tickets_columnar(tickets: List[Ticket], rules: Optional[RuleSet] = None) -> CustomerContextColumns:
+    """
+    Convenience wrapper: builds the columns from validated tickets and scores them.
+    """
+    check_builtin_rules(rules or active_rules())
+    billing, account = _keyword_flags([t.tokens.subject for t in tickets], [t.tokens.message for t in tickets])
+    return analyze_customer_columns(
+        encode_tiers([t.customer_tier for t in tickets]),
+        np.fromiter((t.monthly_revenue for t in tickets), dtype=np.float64, count=len(tickets)),
+        np.fromiter((t.previous_tickets for t in tickets), dtype=np.int64, count=len(tickets)),
+        billing,
+        account,
+        rules
+    )
+
+
+def _keyword_flags(subjects: Sequence[TokenSet], messages: Sequence[TokenSet]):
+    # Same as `keyword_flags` for already tokenized texts
+    count = len(subjects)
+    billing = np.fromiter(
+        ("billing" in subject.words or "payment" in message.words for subject, message in zip(subjects, messages)),
+        dtype=bool, count=count
+    )
+    account = np.fromiter(
+        (not subject.words.isdisjoint(("account", "password")) or "login" in message.words for subject, message in zip(subjects, messages)),
+        dtype=bool, count=count
+    )
+    return billing, account
@@ -0,0 +1,68 @@
+from typing import Dict, FrozenSet, Iterable, Sequence, Tuple
+from agents.tokens import TokenSet, normalize_keyword
+
+
+class KeywordMatcher:
+    """
+    Matches many keyword groups against a tokenized text (see `agents.tokens`).
+
+    Keywords match whole words: a keyword is tokenized like the text and
+    matches where its tokens occur consecutively, so "db" does not match inside
+    "feedback". Matching is a set intersection with the text's words and, only
+    if the text contains the first word of a multi-word keyword, with the
+    phrases of the keyword lengths that start at those words.
+    Keywords without any word characters never match.
+    """
+    def __init__(self, groups: Sequence[Tuple[str, Iterable[str]]]):
+        """
+        Args:
+            groups: Ordered (group_name, keywords) pairs.
+        """
+        groups_by_phrase: Dict[str, set] = {}
+        for group_name, keywords in groups:
+            for keyword in keywords:
+                phrase = normalize_keyword(keyword)
+                if phrase:
+                    groups_by_phrase.setdefault(phrase, set()).add(group_name)
+
+        self._groups_by_phrase: Dict[str, FrozenSet[str]] = {
+            phrase: frozenset(group_names) for phrase, group_names in groups_by_phrase.items()
+        }
+        self._words = frozenset(phrase for phrase in groups_by_phrase if " " not in phrase)
+        self._phrases = frozenset(phrase for phrase in groups_by_phrase if " " in phrase)
+        self._phrase_starts = frozenset(phrase.split(" ", 1)[0] for phrase in self._phrases)
+        self._phrase_lengths = tuple(sorted({phrase.count(" ") + 1 for phrase in self._phrases}))
+        self.max_words = max((phrase.count(" ") + 1 for phrase in groups_by_phrase), default=1)
+        self._masks_by_phrase: Dict[str, int] = {}
+
+    def match(self, tokens: TokenSet) -> FrozenSet[str]:
+        """
+        Returns the names of all groups with at least one keyword in `tokens`.
+        """
+        groups_by_phrase = self._groups_by_phrase
+        matched = set()
+        for phrase in self._matched_phrases(tokens):
+            matched |= groups_by_phrase[phrase]
+        return frozenset(matched)
+
+    def match_mask(self, tokens: TokenSet) -> int:
+        """
+        Same as `match` for integer bit-flag group names, returning the OR of
+        all matched groups.
+        """
+        mask = 0
+        masks_by_phrase = self._masks_by_phrase
+        for phrase in self._matched_phrases(tokens):
+            phrase_mask = masks_by_phrase.get(phrase)
+            if phrase_mask is None:
+                phrase_mask = masks_by_phrase[phrase] = sum(self._groups_by_phrase[phrase])
+            mask |= phrase_mask
+        return mask
+
+    def _matched_phrases(self, tokens: TokenSet) -> FrozenSet[str]:
+        words = tokens.words
+        matched = self._words & words
+        starts = self._phrase_starts & words
+        if starts:
+            matched |= self._phrases & tokens.phrases(self._phrase_lengths, starts)
+        return matched
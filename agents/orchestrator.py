@@ -0,0 +1,173 @@
+import logging
+from time import perf_counter
+from typing import Callable, List, Optional, Tuple, Union
+from agents.base_agent import AgentOutput, BaseAgent, Ticket
+from agents.rules import RuleSet, active_rules
+from pipeline import latency
+from pipeline.log import logger
+
+# Reasoning shown for an agent that was skipped because the other one decided the ticket
+SKIPPED_REASONING = "Not analyzed; the {} analysis already decides the outcome."
+
+
+class Orchestrator:
+    """
+    Orchestration layer: resolves the technical and customer context analyses
+    of a ticket into the final routing decision.
+
+    Conflict resolution is a lookup in the ruleset's precomputed resolution
+    table (see `agents.rules.RoutingTable`): the final priority is the highest
+    of the two agents' priorities, and the routing rules pick whose category
+    and team are used. An Orchestrator holds no per-ticket state, so one
+    instance can be shared by any number of callers.
+    """
+    def __init__(self, rules: Optional[RuleSet] = None):
+        """
+        Args:
+            rules (RuleSet, optional): Fixed rules; follows the active ruleset if omitted.
+        """
+        self._rules = rules
+
+    @property
+    def rules(self) -> RuleSet:
+        return self._rules or active_rules()
+
+    def resolve(self, tech_analysis: Optional[AgentOutput], cust_analysis: Optional[AgentOutput]) -> Tuple[str, str, str]:
+        """
+        Returns the final (category, priority, recommended_team) for two agent
+        analyses. One of them may be None if the other decides the ticket on
+        its own (see `decided`).
+        """
+        routing = self.rules.routing
+        if tech_analysis is None or cust_analysis is None:
+            agent, analysis = ("customer", cust_analysis) if tech_analysis is None else ("technical", tech_analysis)
+            decided = routing.decided_by(agent, (analysis.category, analysis.priority, analysis.recommended_team))
+            if decided is None:
+                raise ValueError(f"The {agent} analysis alone does not decide the ticket; both analyses are needed")
+            return decided
+        return routing.resolve(tech_analysis, cust_analysis)
+
+    def decided(self, agent: str, analysis: AgentOutput) -> Optional[Tuple[str, str, str]]:
+        """
+        Returns the final (category, priority, recommended_team) if the analysis
+        of one agent ("technical" or "customer") fixes it whatever the other
+        agent returns, e.g. a Critical technical issue, which the routing rules
+        send to the technical team at the top priority. None otherwise.
+        """
+        return self.rules.routing.decided_by(agent, (analysis.category, analysis.priority, analysis.recommended_team))
+
+    def run_agents(
+        self,
+        ticket: Ticket,
+        technical_agent: BaseAgent,
+        customer_agent: BaseAgent
+    ) -> Tuple[Optional[AgentOutput], Optional[AgentOutput]]:
+        """
+        Runs the agents in order of their declared `COST` (the technical agent
+        first on a tie) and skips the second one when the first one's analysis
+        already decides the ticket (see `decided`).
+
+        Returns:
+            Tuple: The technical and customer analyses; the skipped one is None.
+        """
+        (first_name, first_agent), (second_name, second_agent) = self.cost_order(technical_agent, customer_agent)
+        analyses = {first_name: first_agent.analyze(ticket)}
+        if self.decided(first_name, analyses[first_name]) is None:
+            analyses[second_name] = second_agent.analyze(ticket)
+        return analyses.get("technical"), analyses.get("customer")
+
+    def resolve_outcomes(self, tech_outcome: Tuple[str, str, str], cust_outcome: Tuple[str, str, str]) -> Tuple[str, str, str]:
+        """
+        Same as `resolve` for plain (category, priority, recommended_team)
+        tuples, e.g. decision table entries on bulk paths. The result is a
+        shared tuple; treat it as read-only.
+        """
+        return self.rules.routing.resolve_outcomes(tech_outcome, cust_outcome)
+
+    @staticmethod
+    def cost_order(technical_agent: BaseAgent, customer_agent: BaseAgent) -> List[Tuple[str, BaseAgent]]:
+        """
+        Returns the ("technical" / "customer", agent) pairs cheapest first by
+        `BaseAgent.COST`, the technical agent first on a tie.
+        """
+        return sorted((("technical", technical_agent), ("customer", customer_agent)), key=lambda item: item[1].COST)
+
+    def merge(self, ticket_id: str, tech_analysis: Optional[AgentOutput], cust_analysis: Optional[AgentOutput]) -> AgentOutput:
+        """
+        Builds the final output for a ticket from the agents' analyses.
+
+        Args:
+            ticket_id (str): ID of the ticket, for logging.
+            tech_analysis (AgentOutput, optional): Output of the technical agent;
+                                                   None if it was skipped (see `run_agents`).
+            cust_analysis (AgentOutput, optional): Output of the customer context agent;
+                                                   None if it was skipped.
+
+        Returns:
+            AgentOutput: The final aggregated analysis and routing decision.
+        """
+        recorder = latency.recorder
+        start = perf_counter() if recorder is not None else 0.0
+        final_category, final_priority, final_recommended_team = self.resolve(tech_analysis, cust_analysis)
+
+        # Reasoning from both agents is combined only if it is read
+        final_output = AgentOutput.deferred(
+            category=final_category,
+            priority=final_priority,
+            recommended_team=final_recommended_team,
+            reason_codes=(
+                tech_analysis.reasoning_source() if tech_analysis is not None else None,
+                cust_analysis.reasoning_source() if cust_analysis is not None else None,
+                (final_priority, final_category, final_recommended_team)
+            ),
+            render_reasoning=render_final_reasoning
+        )
+        self.log_decision(ticket_id, final_category, final_priority, final_recommended_team)
+        if recorder is not None:
+            recorder.observe("merge", perf_counter() - start)
+        return final_output
+
+    @staticmethod
+    def log_decision(ticket_id: str, category: str, priority: str, recommended_team: str) -> None:
+        """
+        Logs a final decision at INFO level (the "summary" verbosity).
+        """
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Ticket %s Final Decision: Category='%s', Priority='%s', Team='%s'",
+                ticket_id, category, priority, recommended_team,
+                extra={"fields": {
+                    "ticket_id": ticket_id,
+                    "agent": "orchestrator",
+                    "category": category,
+                    "priority": priority,
+                    "recommended_team": recommended_team,
+                }}
+            )
+
+
+def render_final_reasoning(reason_codes: Tuple) -> str:
+    """
+    Combines the reasoning from both agents with the orchestration decision.
+    The reason codes are (technical reasoning, customer reasoning, (priority,
+    category, team)), where each agent's reasoning is its
+    `AgentOutput.reasoning_source()`, or None if the agent was skipped.
+    """
+    tech_source, cust_source, (final_priority, final_category, final_recommended_team) = reason_codes
+    tech_reasoning = _render_source(tech_source) if tech_source is not None else SKIPPED_REASONING.format("customer context")
+    cust_reasoning = _render_source(cust_source) if cust_source is not None else SKIPPED_REASONING.format("technical")
+    return (
+        f"Technical perspective: {tech_reasoning}\n"
+        f"Customer context perspective: {cust_reasoning}\n"
+        f"Orchestration decision: Final priority is '{final_priority}' "
+        f"based on maximum urgency. Final routing to '{final_category}' "
+        f"with '{final_recommended_team}' recommended team."
+    )
+
+
+def _render_source(source: Union[str, Tuple[Callable[[Tuple], str], Tuple]]) -> str:
+    # Plain-text reasoning is used as is; deferred reasoning is rendered by the agent's own function
+    if isinstance(source, str):
+        return source
+    render_reasoning, reason_codes = source
+    return render_reasoning(reason_codes)
@@ -0,0 +1,193 @@
+import sys
+from typing import Optional, Tuple
+from agents.base_agent import Ticket, AgentOutput, TicketAnalysis
+from agents.rules import DecisionTable, RuleDrivenAgent
+from agents.tokens import TicketTokens
+from agents.orchestrator import Orchestrator, render_final_reasoning
+
+
+class TicketRecord:
+    """
+    Slotted, already-validated ticket for holding large batches in memory.
+
+    Has the same attributes as `Ticket`, so the agents and decision tables
+    accept it directly, at a fraction of the memory of a Pydantic model. The
+    customer tier is interned, so all records share one string per tier.
+    """
+    __slots__ = (
+        "ticket_id", "customer_tier", "subject", "message",
+        "previous_tickets", "monthly_revenue", "account_age_days", "_tokens",
+    )
+
+    def __init__(
+        self,
+        ticket_id: str,
+        customer_tier: str,
+        subject: str,
+        message: str,
+        previous_tickets: int,
+        monthly_revenue: float,
+        account_age_days: int
+    ):
+        self.ticket_id = ticket_id
+        self.customer_tier = sys.intern(customer_tier)
+        self.subject = subject
+        self.message = message
+        self.previous_tickets = previous_tickets
+        self.monthly_revenue = monthly_revenue
+        self.account_age_days = account_age_days
+        self._tokens: Optional[TicketTokens] = None
+
+    @classmethod
+    def from_ticket(cls, ticket: Ticket) -> "TicketRecord":
+        return cls(
+            ticket.ticket_id, ticket.customer_tier, ticket.subject, ticket.message,
+            ticket.previous_tickets, ticket.monthly_revenue, ticket.account_age_days
+        )
+
+    @property
+    def tokens(self) -> TicketTokens:
+        """
+        Same as `Ticket.tokens`: the tokenized subject and message, computed on
+        first use and recomputed if the subject or message is replaced.
+        """
+        tokens = self._tokens
+        if tokens is None or tokens.subject_text is not self.subject or tokens.message_text is not self.message:
+            tokens = self._tokens = TicketTokens(self.subject, self.message)
+        return tokens
+
+    def to_ticket(self) -> Ticket:
+        """
+        Converts back to a `Ticket` without re-validating the fields.
+        """
+        return Ticket.trusted({field: getattr(self, field) for field in _RECORD_FIELDS})
+
+
+_RECORD_FIELDS = tuple(field for field in TicketRecord.__slots__ if not field.startswith("_"))
+
+# Tickets that are already validated: the processing functions analyze them as they are.
+VALIDATED_TICKET_TYPES = (Ticket, TicketRecord)
+
+
+class AnalysisRecord:
+    """
+    Compact result of analyzing one ticket on a bulk path.
+
+    Instead of three Pydantic outputs, a record references the shared decision
+    table entries of both agents and the shared final (category, priority,
+    team) tuple from the resolution table, plus only the ticket values its
+    reasoning quotes (e.g. the revenue). Nothing is rendered until the record
+    is converted with `to_output` or `to_analysis` at the API boundary.
+    """
+    __slots__ = ("ticket_id", "final", "technical", "customer", "technical_args", "customer_args", "error_output")
+
+    def __init__(
+        self,
+        ticket_id: Optional[str],
+        final: Tuple[str, str, str],
+        technical: Optional[Tuple] = None,
+        customer: Optional[Tuple] = None,
+        technical_args: Optional[Tuple] = None,
+        customer_args: Optional[Tuple] = None,
+        error_output: Optional[AgentOutput] = None
+    ):
+        self.ticket_id = ticket_id
+        self.final = final
+        self.technical = technical
+        self.customer = customer
+        self.technical_args = technical_args
+        self.customer_args = customer_args
+        self.error_output = error_output
+
+    @classmethod
+    def from_error(cls, ticket_id: Optional[str], error_output: AgentOutput) -> "AnalysisRecord":
+        """
+        Record for a ticket that failed validation, wrapping its error output.
+        """
+        return cls(
+            ticket_id,
+            (error_output.category, error_output.priority, error_output.recommended_team),
+            error_output=error_output
+        )
+
+    @property
+    def category(self) -> str:
+        return self.final[0]
+
+    @property
+    def priority(self) -> str:
+        return self.final[1]
+
+    @property
+    def recommended_team(self) -> str:
+        return self.final[2]
+
+    def to_output(self) -> AgentOutput:
+        """
+        Returns the final `AgentOutput`, identical to `pipeline.processing.process_ticket`'s.
+        """
+        # Imported here: the agent modules are only loaded once an agent is created (see `agents.registry`)
+        from agents.customer_context import render_customer_reasoning
+        from agents.technical_analyzer import render_technical_reasoning
+
+        if self.error_output is not None:
+            return self.error_output
+        category, priority, recommended_team = self.final
+        return AgentOutput.deferred(
+            category=category,
+            priority=priority,
+            recommended_team=recommended_team,
+            reason_codes=(
+                (render_technical_reasoning, DecisionTable.reason_codes(self.technical, self.technical_args)),
+                (render_customer_reasoning, DecisionTable.reason_codes(self.customer, self.customer_args)),
+                (priority, category, recommended_team)
+            ),
+            render_reasoning=render_final_reasoning
+        )
+
+    def to_analysis(self, ticket: Optional[Ticket] = None) -> TicketAnalysis:
+        """
+        Returns the `TicketAnalysis`, identical to `pipeline.processing.process_ticket_detailed`'s.
+
+        Args:
+            ticket (Ticket, optional): The analyzed ticket, if the caller kept it.
+        """
+        from agents.customer_context import render_customer_reasoning
+        from agents.technical_analyzer import render_technical_reasoning
+
+        if self.error_output is not None:
+            return TicketAnalysis(None, None, None, self.error_output)
+        return TicketAnalysis(
+            ticket,
+            _agent_output(self.technical, self.technical_args, render_technical_reasoning),
+            _agent_output(self.customer, self.customer_args, render_customer_reasoning),
+            self.to_output()
+        )
+
+
+def analyze_record(
+    ticket: Ticket,
+    technical_agent: RuleDrivenAgent,
+    customer_agent: RuleDrivenAgent,
+    orchestrator: Orchestrator
+) -> AnalysisRecord:
+    """
+    Analyzes a validated ticket (or `TicketRecord`) into an `AnalysisRecord`,
+    using table lookups only: no agent or final outputs are built.
+    """
+    technical, technical_args = technical_agent.lookup(ticket)
+    customer, customer_args = customer_agent.lookup(ticket)
+    final = orchestrator.resolve_outcomes(technical[:3], customer[:3])
+    orchestrator.log_decision(ticket.ticket_id, *final)
+    return AnalysisRecord(ticket.ticket_id, final, technical, customer, technical_args, customer_args)
+
+
+def _agent_output(entry: Tuple, args: Optional[Tuple], render_reasoning) -> AgentOutput:
+    category, priority, recommended_team = entry[:3]
+    return AgentOutput.deferred(
+        category=category,
+        priority=priority,
+        recommended_team=recommended_team,
+        reason_codes=DecisionTable.reason_codes(entry, args),
+        render_reasoning=render_reasoning
+    )
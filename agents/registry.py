@@ -0,0 +1,103 @@
+from importlib import import_module
+from typing import Dict, List, Type, Union
+from agents.base_agent import BaseAgent
+
+# Built-in agents by role. They are given as "module:attribute" paths and only
+# imported when an agent for the role is first created.
+BUILTIN_AGENTS: Dict[str, str] = {
+    "technical": "agents.technical_analyzer:TechnicalAnalyzerAgent",
+    "customer": "agents.customer_context:CustomerContextAgent",
+}
+
+# Entry point group that installed packages use to provide agents (see `discover_agents`).
+ENTRY_POINT_GROUP = "ticket_analyzer.agents"
+
+_registered: Dict[str, Union[str, Type[BaseAgent]]] = {}
+_resolved: Dict[str, Type[BaseAgent]] = {}
+_version = 0
+
+
+def register_agent(role: str, agent: Union[str, Type[BaseAgent]]) -> None:
+    """
+    Sets the agent class used for a role, replacing the built-in one.
+
+    Args:
+        role (str): "technical", "customer" or a new role.
+        agent (Union[str, Type[BaseAgent]]): The class, or its "module:Class"
+                                             path, which is imported on first use.
+    """
+    global _version
+    if isinstance(agent, str) and ":" not in agent:
+        raise ValueError(f"Agent path must look like 'module:Class', got '{agent}'")
+    _registered[role] = agent
+    _resolved.pop(role, None)
+    _version += 1
+
+
+def discover_agents() -> List[str]:
+    """
+    Registers the agents that installed packages declare as entry points in
+    the `ENTRY_POINT_GROUP` group (entry point name = role). They are imported
+    only when used. Explicit `register_agent` calls made afterwards win.
+
+    Returns:
+        List[str]: The roles found.
+    """
+    # Imported here: reading package metadata is slow and most processes never need it
+    from importlib.metadata import entry_points
+
+    roles = []
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        register_agent(entry_point.name, entry_point.value)
+        roles.append(entry_point.name)
+    return roles
+
+
+def agent_class(role: str) -> Type[BaseAgent]:
+    """
+    Returns the agent class for a role, importing it on first use.
+
+    Raises:
+        KeyError: If no agent is registered for the role.
+        TypeError: If the registered object is not a `BaseAgent` subclass.
+    """
+    cls = _resolved.get(role)
+    if cls is not None:
+        return cls
+    target = _registered.get(role, BUILTIN_AGENTS.get(role))
+    if target is None:
+        raise KeyError(f"No agent registered for role '{role}'; known roles: {registered_roles()}")
+    if isinstance(target, str):
+        module_name, _, attribute = target.partition(":")
+        target = getattr(import_module(module_name), attribute)
+    if not (isinstance(target, type) and issubclass(target, BaseAgent)):
+        raise TypeError(f"Agent for role '{role}' must be a BaseAgent subclass, got {target!r}")
+    _resolved[role] = target
+    return target
+
+
+def create_agent(role: str, **kwargs) -> BaseAgent:
+    """
+    Creates an agent for a role (see `agent_class`), passing `kwargs` to its constructor.
+    """
+    return agent_class(role)(**kwargs)
+
+
+def registered_roles() -> List[str]:
+    return sorted(set(BUILTIN_AGENTS) | set(_registered))
+
+
+def registered_agents() -> Dict[str, Union[str, Type[BaseAgent]]]:
+    """
+    Returns the agents registered with `register_agent`, by role, e.g. to
+    register the same agents in worker processes.
+    """
+    return dict(_registered)
+
+
+def registry_version() -> int:
+    """
+    Returns a counter that changes whenever an agent is registered, so callers
+    that cache agent instances know when to recreate them.
+    """
+    return _version
@@ -0,0 +1,670 @@
+import hashlib
+import json
+import os
+from itertools import product
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional, Tuple
+from agents.base_agent import BaseAgent, Ticket, AgentOutput
+from agents.keyword_matcher import KeywordMatcher
+from agents.tokens import TokenSet
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "default_rules.json")
+
+OUTPUT_FIELDS = ("category", "priority", "recommended_team")
+
+# Keyword condition sources and the tokenized text each one is matched against
+# (see `Ticket.tokens`; tokenized once per ticket and shared by all agents).
+KEYWORD_SOURCES: Dict[str, Callable[[Ticket], TokenSet]] = {
+    "keywords": lambda ticket: ticket.tokens.keywords,
+    "subject_keywords": lambda ticket: ticket.tokens.subject,
+    "message_keywords": lambda ticket: ticket.tokens.message,
+}
+
+# Ticket fields rules may test. These are the fields `pipeline.cache.ticket_cache_key`
+# hashes, so cached results stay valid under any ruleset.
+CONDITION_FIELDS = ("customer_tier", "previous_tickets", "monthly_revenue")
+
+# Decision tables whose feature space is at most this large are filled at compile
+# time; larger ones are filled as new feature combinations are seen.
+MAX_PRECOMPUTED_ENTRIES = 1 << 16
+
+
+class RuleSet:
+    """
+    A compiled set of routing rules for both agents and the orchestrator.
+
+    Rules are declared as data (see `agents/default_rules.json`) and compiled
+    once into decision tables: each ticket is reduced to a small integer key
+    (a bitmask of matched keyword groups combined with the codes of its tier
+    and revenue / ticket-count bands), and the category, priority, team and
+    reason codes for that key are looked up instead of being re-derived.
+
+    A RuleSet is immutable, so swapping in a new one with `activate_rules` is
+    a single reference assignment: analyses already running finish with the
+    ruleset they started with.
+    """
+    def __init__(self, spec: Dict):
+        """
+        Args:
+            spec (Dict): Rule definitions with "priorities", "technical",
+                         "customer" and "routing" sections.
+
+        Raises:
+            ValueError: If the rules are malformed.
+        """
+        if not isinstance(spec, dict):
+            raise ValueError(f"The rules must be a mapping of sections, got {type(spec).__name__}")
+        self.spec = spec
+        self.fingerprint = hashlib.blake2b(
+            json.dumps(spec, sort_keys=True).encode(), digest_size=16
+        ).hexdigest()
+        try:
+            self.priorities: Tuple[str, ...] = tuple(spec["priorities"])
+            if not self.priorities:
+                raise ValueError("The rules must list at least one priority")
+            self.technical = DecisionTable(spec["technical"])
+            self.customer = DecisionTable(spec["customer"])
+            for section in ("technical", "customer"):
+                for priority in getattr(self, section).possible_values("priority"):
+                    if priority not in self.priorities:
+                        raise ValueError(f"The {section} rules use priority '{priority}', which is not in the priorities")
+            self.routing = RoutingTable(spec["routing"], self.priorities, self.technical, self.customer)
+        except KeyError as e:
+            raise ValueError(f"Missing rule section or field: {e}") from e
+
+    def __reduce__(self):
+        # Ship the declarative spec to worker processes and recompile there.
+        return (RuleSet, (self.spec,))
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSet":
+        """
+        Loads and compiles rules from a JSON file, or a YAML file (.yaml/.yml,
+        requires PyYAML).
+        """
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError as e:
+                    raise ImportError("PyYAML is required to load YAML rule files: pip install pyyaml") from e
+                return cls(yaml.safe_load(f))
+            return cls(json.load(f))
+
+    @classmethod
+    def default(cls) -> "RuleSet":
+        """
+        Returns the built-in rules shipped in `agents/default_rules.json`.
+        """
+        global _default_rules
+        if _default_rules is None:
+            _default_rules = cls.load(DEFAULT_RULES_PATH)
+        return _default_rules
+
+
+class DecisionTable:
+    """
+    One agent's rules compiled into a lookup table.
+
+    The rules are a sequence of steps; in each step the first rule whose
+    conditions hold applies its "set"/"adjust" changes and records its reason.
+    """
+    def __init__(self, spec: Dict):
+        self.defaults = tuple(spec["defaults"][field] for field in OUTPUT_FIELDS)
+        self._features = _FeatureSpace()
+        steps = spec["steps"]
+        if not isinstance(steps, list) or not all(isinstance(step, list) and all(isinstance(rule, dict) for rule in step) for step in steps):
+            raise ValueError("Rule steps must be a list of steps, each a list of rules")
+        self._steps = [[_Rule(rule, self._features) for rule in step] for step in spec["steps"]]
+        self._matchers = [
+            (KEYWORD_SOURCES[source], KeywordMatcher(groups).match_mask)
+            for source, groups in self._features.keyword_groups().items()
+        ]
+        self._categorical_encoders, self._band_encoders = self._features.encoders()
+        self._table: Dict[int, Tuple] = {}
+        if self._features.size <= MAX_PRECOMPUTED_ENTRIES:
+            for key in range(self._features.size):
+                self._table[key] = self._evaluate(key)
+
+    def decide(self, ticket: Ticket) -> Tuple[str, str, str, Tuple]:
+        """
+        Returns (category, priority, recommended_team, reason_codes) for a ticket.
+        """
+        decision, args = self.lookup(ticket)
+        if args is None:
+            return decision[:4]
+        return (*decision[:3], self.reason_codes(decision, args))
+
+    def lookup(self, ticket: Ticket) -> Tuple[Tuple, Optional[Tuple]]:
+        """
+        Compact form of `decide`: returns the shared table entry for the ticket,
+        (category, priority, recommended_team, reason code template, argument
+        slots), and the ticket values its reasoning quotes (None if it quotes
+        none). `reason_codes` combines the two.
+        """
+        # --- Feature Key: matched keyword groups, then field codes (see _FeatureSpace) ---
+        key = 0
+        for text_of, match_mask in self._matchers:
+            key |= match_mask(text_of(ticket))
+        for field, codes, scale in self._categorical_encoders:
+            key += codes.get(getattr(ticket, field), 0) * scale
+        for field, thresholds, scale in self._band_encoders:
+            value = getattr(ticket, field)
+            # Thresholds ascend; a NaN value fails every `>=` and lands in band 0
+            for threshold in thresholds:
+                if value >= threshold:
+                    key += scale
+                else:
+                    break
+
+        entry = self._table.get(key)
+        if entry is None:
+            entry = self._table[key] = self._evaluate(key)
+        arg_slots = entry[4]
+        if not arg_slots:
+            return entry, None
+        return entry, tuple(get_args(ticket) for _, _, get_args, _, _ in arg_slots)
+
+    def entry(self, key: int) -> Tuple:
+        """
+        Returns the table entry for a feature key (see `feature_encoders`).
+        """
+        entry = self._table.get(key)
+        if entry is None:
+            entry = self._table[key] = self._evaluate(key)
+        return entry
+
+    def feature_encoders(self) -> Tuple[Dict[str, List[Tuple[int, Tuple[str, ...]]]], List[Tuple], List[Tuple]]:
+        """
+        Describes how `lookup` builds a ticket's feature key, for callers that
+        compute keys from precomputed features (e.g. `pipeline.incremental`).
+
+        Returns:
+            Tuple: (keyword groups, categorical encoders, band encoders). Keyword
+                   groups map each keyword source to its (bit, keywords) groups;
+                   the key is the OR of the bits of matched groups, plus the
+                   code of each (field, value codes, scale) categorical encoder
+                   times its scale, plus for each (field, ascending thresholds,
+                   scale) band encoder the number of thresholds the value reaches
+                   times its scale.
+        """
+        return self._features.keyword_groups(), self._categorical_encoders, self._band_encoders
+
+    @property
+    def feature_space_size(self) -> int:
+        """
+        Number of distinct feature keys.
+        """
+        return self._features.size
+
+    @staticmethod
+    def signature(entry: Tuple) -> Tuple:
+        """
+        Returns a comparable description of a table entry: the outputs, the
+        reason code template and, for each quoted reason, its position, code
+        and ticket fields. Entries of different rulesets with the same
+        signature produce the same output for any ticket.
+        """
+        return (*entry[:4], tuple((position, code, fields) for position, code, _, _, fields in entry[4]))
+
+    @staticmethod
+    def reason_codes(entry: Tuple, args: Optional[Tuple]) -> Tuple:
+        """
+        Fills the ticket values quoted by the reasoning (e.g. the revenue) into
+        a table entry's reason code template.
+        """
+        if args is None:
+            return entry[3]
+        reason_codes = list(entry[3])
+        for (position, code, _, single, _), value in zip(entry[4], args):
+            reason_codes[position] = (code, value) if single else (code, *value)
+        return tuple(reason_codes)
+
+    def possible_values(self, field: str) -> List[str]:
+        """
+        Returns every value the table can produce for an output field.
+        """
+        index = OUTPUT_FIELDS.index(field)
+        values = {self.defaults[index]}
+        for step in self._steps:
+            for rule in step:
+                if field in rule.set:
+                    values.add(rule.set[field])
+                values.update(rule.adjust.get(field, {}).values())
+        return sorted(values)
+
+    def keywords(self) -> List[str]:
+        """
+        Returns the keywords of every keyword condition, in rule order.
+        """
+        return self._features.keywords()
+
+    def _evaluate(self, key: int) -> Tuple:
+        # Runs the declared rules for one feature combination.
+        features = self._features.decode(key)
+        decided = dict(zip(OUTPUT_FIELDS, self.defaults))
+        reason_codes = []
+        arg_slots = []
+        for step in self._steps:
+            for rule in step:
+                if rule.matches(features, decided):
+                    decided.update(rule.set)
+                    for field, mapping in rule.adjust.items():
+                        decided[field] = mapping.get(decided[field], decided[field])
+                    if rule.reason is not None:
+                        if rule.reason_args:
+                            arg_slots.append((
+                                len(reason_codes), rule.reason,
+                                attrgetter(*rule.reason_args), len(rule.reason_args) == 1, rule.reason_args
+                            ))
+                        reason_codes.append(rule.reason)
+                    break
+        return (*(decided[field] for field in OUTPUT_FIELDS), tuple(reason_codes), tuple(arg_slots))
+
+
+class RoutingTable:
+    """
+    The orchestrator's rules: the final priority is the highest of the agents'
+    priorities, and the first routing rule that holds picks which agent's
+    category and team are used.
+
+    Every (category, priority, team) result the technical and customer tables
+    can produce gets a small outcome code, and the final decision for every
+    pair of outcome codes is precomputed, so resolving a ticket is two dict
+    lookups and a list index. Results outside those sets (e.g. from custom
+    agents) are resolved from the rules, memoized per combination of the fields
+    the routing rules read.
+    """
+    def __init__(self, spec: Dict, priorities: Tuple[str, ...], technical: DecisionTable, customer: DecisionTable):
+        agents = {"technical": technical, "customer": customer}
+        self.priorities = priorities
+        self._ranks = {priority: rank for rank, priority in enumerate(priorities)}
+        self.defaults = (spec["defaults"]["category"], spec["defaults"]["recommended_team"])
+        self._rules = []
+        referenced = []
+        for rule in spec["rules"]:
+            conditions = []
+            for condition in _conditions(rule):
+                atoms = []
+                for name, expected in condition.items():
+                    agent, _, field = name.partition(".")
+                    if agent not in agents or field not in OUTPUT_FIELDS:
+                        raise ValueError(f"Unknown routing condition field: {name}")
+                    if (agent, field) not in referenced:
+                        referenced.append((agent, field))
+                    atoms.append(((agent, field), _value_predicate(name, expected)))
+                conditions.append(atoms)
+            source = rule["source"]
+            if source not in agents:
+                raise ValueError(f"Unknown routing source: {source}")
+            self._rules.append((conditions, source))
+        self._referenced = tuple(referenced)
+
+        self._table: Dict[Tuple, Optional[str]] = {}
+        keys = [()]
+        for agent, field in self._referenced:
+            keys = [key + (value,) for key in keys for value in agents[agent].possible_values(field)]
+        for key in keys:
+            self._table[key] = self._evaluate(key)
+
+        # --- Precomputed Resolution Table ---
+        self.technical_outcomes: Tuple[Tuple[str, str, str], ...] = tuple(
+            product(*(technical.possible_values(field) for field in OUTPUT_FIELDS))
+        )
+        self.customer_outcomes: Tuple[Tuple[str, str, str], ...] = tuple(
+            product(*(customer.possible_values(field) for field in OUTPUT_FIELDS))
+        )
+        self._technical_codes = {outcome: code for code, outcome in enumerate(self.technical_outcomes)}
+        self._customer_codes = {outcome: code for code, outcome in enumerate(self.customer_outcomes)}
+        self._resolution: List[Tuple[str, str, str]] = [
+            self._resolve_fields(tech_outcome, cust_outcome)
+            for tech_outcome in self.technical_outcomes
+            for cust_outcome in self.customer_outcomes
+        ]
+        # --- Short-Circuit Table: (agent, outcome) -> final decision or None, filled on first use ---
+        self._decided: Dict[Tuple[str, Tuple[str, str, str]], Optional[Tuple[str, str, str]]] = {}
+
+    def resolve(self, tech_analysis: AgentOutput, cust_analysis: AgentOutput) -> Tuple[str, str, str]:
+        """
+        Returns the final (category, priority, recommended_team).
+        """
+        return self.resolve_outcomes(
+            (tech_analysis.category, tech_analysis.priority, tech_analysis.recommended_team),
+            (cust_analysis.category, cust_analysis.priority, cust_analysis.recommended_team)
+        )
+
+    def resolve_outcomes(self, tech_outcome: Tuple[str, str, str], cust_outcome: Tuple[str, str, str]) -> Tuple[str, str, str]:
+        """
+        Same as `resolve` for (category, priority, recommended_team) tuples. The
+        returned tuple is shared; treat it as read-only.
+        """
+        tech_code = self._technical_codes.get(tech_outcome)
+        cust_code = self._customer_codes.get(cust_outcome)
+        if tech_code is None or cust_code is None:
+            return self._resolve_fields(tech_outcome, cust_outcome)
+        return self._resolution[tech_code * len(self.customer_outcomes) + cust_code]
+
+    def outcome_codes(self, tech_outcome: Tuple[str, str, str], cust_outcome: Tuple[str, str, str]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Returns the outcome codes of (category, priority, team) results of the
+        technical and customer agents, or None for results the rules cannot produce.
+        """
+        return self._technical_codes.get(tech_outcome), self._customer_codes.get(cust_outcome)
+
+    def resolve_codes(self, tech_code: int, cust_code: int) -> Tuple[str, str, str]:
+        """
+        Returns the final (category, priority, recommended_team) for a pair of outcome codes.
+        """
+        return self._resolution[tech_code * len(self.customer_outcomes) + cust_code]
+
+    def decided_by(self, agent: str, outcome: Tuple[str, str, str]) -> Optional[Tuple[str, str, str]]:
+        """
+        Returns the final (category, priority, recommended_team) if one agent's
+        result fixes it whatever the other agent returns, or None if the other
+        agent's result is still needed. This holds when the result has the top
+        priority and the routing rules pick the same source for any values of
+        the other agent's fields; it is checked against every possible value,
+        not only those the other agent's rules produce, so it also holds for
+        custom agents.
+
+        Args:
+            agent (str): "technical" or "customer".
+            outcome (Tuple[str, str, str]): That agent's (category, priority, recommended_team).
+        """
+        key = (agent, outcome)
+        if key in self._decided:
+            return self._decided[key]
+        decided = None
+        if self._ranks.get(outcome[1]) == len(self.priorities) - 1:
+            source = self._source_given(agent, outcome)
+            if source == agent:
+                decided = outcome
+            elif source is None:
+                decided = (self.defaults[0], outcome[1], self.defaults[1])
+        self._decided[key] = decided
+        return decided
+
+    def _source_given(self, agent: str, outcome: Tuple[str, str, str]):
+        # The routing source (None for the defaults) when only `agent`'s fields are known, or
+        # _UNDECIDED if it depends on the other agent. Rules are folded from last to first.
+        values = dict(zip(OUTPUT_FIELDS, outcome))
+        source_from_here = None
+        for conditions, source in reversed(self._rules):
+            holds = _holds_given(conditions, agent, values)
+            if holds:
+                source_from_here = source
+            elif holds is None and source_from_here != source:
+                source_from_here = _UNDECIDED
+        return source_from_here
+
+    def _resolve_fields(self, tech_outcome: Tuple[str, str, str], cust_outcome: Tuple[str, str, str]) -> Tuple[str, str, str]:
+        # Applies the routing rules to two (category, priority, team) results.
+        ranks = self._ranks
+        priority = self.priorities[max(ranks.get(tech_outcome[1], 0), ranks.get(cust_outcome[1], 0))]
+
+        outcomes = {"technical": tech_outcome, "customer": cust_outcome}
+        key = tuple(outcomes[agent][OUTPUT_FIELDS.index(field)] for agent, field in self._referenced)
+        source = self._table.get(key, False)
+        if source is False:
+            source = self._table[key] = self._evaluate(key)
+        if source is None:
+            category, recommended_team = self.defaults
+        else:
+            category, _, recommended_team = outcomes[source]
+        return category, priority, recommended_team
+
+    def _evaluate(self, key: Tuple) -> Optional[str]:
+        values = dict(zip(self._referenced, key))
+        for conditions, source in self._rules:
+            if any(all(predicate(values[name]) for name, predicate in atoms) for atoms in conditions):
+                return source
+        return None
+
+
+class RuleDrivenAgent(BaseAgent):
+    """
+    Base class for agents whose decisions come from a `RuleSet` section.
+
+    Agents created without explicit rules follow the active ruleset, so
+    `activate_rules` re-routes them without restarting.
+    """
+    # Name of the RuleSet attribute holding this agent's decision table
+    RULES_SECTION: str = ""
+
+    def __init__(self, rules: Optional[RuleSet] = None):
+        """
+        Args:
+            rules (RuleSet, optional): Fixed rules for this agent; follows the active ruleset if omitted.
+        """
+        self._rules = rules
+
+    @property
+    def rules(self) -> RuleSet:
+        return self._rules or _active_rules or active_rules()
+
+    def use_rules(self, rules: Optional[RuleSet]) -> None:
+        """
+        Pins this agent to `rules`, or back to the active ruleset if None.
+        """
+        self._rules = rules
+
+    def decide(self, ticket: Ticket) -> Tuple[str, str, str, Tuple]:
+        """
+        Looks up (category, priority, recommended_team, reason_codes) in this agent's decision table.
+        """
+        # Read the rules reference once, so a concurrent swap cannot split a ticket across rulesets
+        rules = self._rules or _active_rules or active_rules()
+        return getattr(rules, self.RULES_SECTION).decide(ticket)
+
+    def lookup(self, ticket: Ticket) -> Tuple[Tuple, Optional[Tuple]]:
+        """
+        Compact form of `decide` for bulk paths; see `DecisionTable.lookup`.
+        """
+        rules = self._rules or _active_rules or active_rules()
+        return getattr(rules, self.RULES_SECTION).lookup(ticket)
+
+    def rules_fingerprint(self) -> str:
+        return super().rules_fingerprint() + self.rules.fingerprint
+
+
+_default_rules: Optional[RuleSet] = None
+_active_rules: Optional[RuleSet] = None
+
+
+def active_rules() -> RuleSet:
+    """
+    Returns the ruleset used by default agents and the orchestrator.
+    """
+    global _active_rules
+    if _active_rules is None:
+        _active_rules = RuleSet.default()
+    return _active_rules
+
+
+def activate_rules(rules: Optional[RuleSet]) -> None:
+    """
+    Hot-swaps the active ruleset (None restores the built-in rules). Tickets
+    already being analyzed finish with the rules they started with.
+    """
+    global _active_rules
+    _active_rules = rules or RuleSet.default()
+
+
+class _Rule:
+    """
+    One compiled rule: conditions (any of several AND-ed groups), the changes
+    it applies, and its reason code.
+    """
+    def __init__(self, spec: Dict, features: "_FeatureSpace"):
+        self.conditions = [
+            [features.atom(name, expected) for name, expected in condition.items()]
+            for condition in _conditions(spec)
+        ]
+        self.set: Dict[str, str] = dict(spec.get("set", {}))
+        self.adjust: Dict[str, Dict[str, str]] = dict(spec.get("adjust", {}))
+        for field in list(self.set) + list(self.adjust):
+            if field not in OUTPUT_FIELDS:
+                raise ValueError(f"Rules can only set {', '.join(OUTPUT_FIELDS)}, not {field}")
+        self.reason: Optional[str] = spec.get("reason")
+        self.reason_args: Tuple[str, ...] = tuple(spec.get("reason_args", ()))
+        for field in self.reason_args:
+            if field not in Ticket.model_fields:
+                raise ValueError(f"Unknown reason argument field: {field}")
+
+    def matches(self, features: Dict, decided: Dict[str, str]) -> bool:
+        return any(all(atom(features, decided) for atom in atoms) for atoms in self.conditions)
+
+
+class _FeatureSpace:
+    """
+    The ticket features the rules of one agent depend on, and their encoding
+    into a single integer key: matched keyword groups as low bits, then the
+    mixed-radix codes of categorical fields and numeric threshold bands.
+    """
+    def __init__(self):
+        self._keyword_bits: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        self._categories: Dict[str, List[str]] = {}
+        self._thresholds: Dict[str, List[float]] = {}
+        self._layout: Optional[List[Tuple]] = None
+
+    def atom(self, name: str, expected) -> Callable[[Dict, Dict[str, str]], bool]:
+        """
+        Compiles one condition into a predicate over (decoded features, decided fields).
+        """
+        if name in KEYWORD_SOURCES:
+            key = (name, tuple(_string_list(name, expected)))
+            bit = self._keyword_bits.setdefault(key, 1 << len(self._keyword_bits))
+            return lambda features, decided: bool(features["mask"] & bit)
+        if name in OUTPUT_FIELDS:
+            predicate = _value_predicate(name, expected)
+            return lambda features, decided: predicate(decided[name])
+        if name.endswith("_min") and name[:-4] in CONDITION_FIELDS:
+            field = name[:-4]
+            if isinstance(expected, bool) or not isinstance(expected, (int, float)):
+                raise ValueError(f"{name} must be a number, got {expected!r}")
+            threshold = float(expected)
+            thresholds = self._thresholds.setdefault(field, [])
+            if threshold not in thresholds:
+                thresholds.append(threshold)
+            # Band codes are assigned once all thresholds are known, so compare at decode time.
+            return lambda features, decided: features[field] >= threshold
+        if name in CONDITION_FIELDS:
+            expected = _string_list(name, expected)
+            values = self._categories.setdefault(name, [])
+            values.extend(value for value in expected if value not in values)
+            allowed = frozenset(expected)
+            return lambda features, decided: features[name] in allowed
+        raise ValueError(f"Unknown rule condition field: {name}")
+
+    def keyword_groups(self) -> Dict[str, List[Tuple[int, Tuple[str, ...]]]]:
+        groups: Dict[str, List] = {}
+        for (source, keywords), bit in self._keyword_bits.items():
+            groups.setdefault(source, []).append((bit, keywords))
+        return groups
+
+    def keywords(self) -> List[str]:
+        return [keyword for (_, keywords) in self._keyword_bits for keyword in keywords]
+
+    @property
+    def size(self) -> int:
+        size = 1 << len(self._keyword_bits)
+        for _, _, radix in self._get_layout():
+            size *= radix
+        return size
+
+    def encoders(self) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        Returns the (field, value codes, scale) entries of categorical fields and
+        the (field, ascending thresholds, scale) entries of banded fields; a key
+        is the keyword mask plus each field's code times its scale.
+        """
+        categorical, banded = [], []
+        scale = 1 << len(self._keyword_bits)
+        for field, codes, radix in self._get_layout():
+            (categorical if isinstance(codes, dict) else banded).append((field, codes, scale))
+            scale *= radix
+        return categorical, banded
+
+    def decode(self, key: int) -> Dict:
+        bits = len(self._keyword_bits)
+        features = {"mask": key & ((1 << bits) - 1)}
+        key >>= bits
+        for field, codes, radix in self._get_layout():
+            key, code = divmod(key, radix)
+            if isinstance(codes, dict):
+                # Code 0 stands for any value no rule mentions.
+                features[field] = next((value for value, c in codes.items() if c == code), None)
+            else:
+                # A representative value for the band: its lower threshold (or below all of them).
+                features[field] = codes[code - 1] if code else float("-inf")
+        return features
+
+    def _get_layout(self) -> List[Tuple]:
+        if self._layout is None:
+            layout = []
+            for field, values in self._categories.items():
+                layout.append((field, {value: code for code, value in enumerate(values, 1)}, len(values) + 1))
+            for field, thresholds in self._thresholds.items():
+                thresholds = sorted(thresholds)
+                layout.append((field, thresholds, len(thresholds) + 1))
+            self._layout = layout
+        return self._layout
+
+
+# Marks a routing source that depends on fields that are not known yet.
+_UNDECIDED = object()
+
+
+def _holds_given(conditions: List[List[Tuple]], agent: str, values: Dict[str, str]) -> Optional[bool]:
+    """
+    Evaluates routing conditions when only `agent`'s fields are known: True or
+    False if the known fields settle them, None if the other agent's fields decide.
+    """
+    unknown = False
+    for atoms in conditions:
+        holds = True
+        for (atom_agent, field), predicate in atoms:
+            if atom_agent != agent:
+                holds = None
+            elif not predicate(values[field]):
+                holds = False
+                break
+        if holds:
+            return True
+        if holds is None:
+            unknown = True
+    return None if unknown else False
+
+
+def _conditions(spec: Dict) -> List[Dict]:
+    # "when" is one condition or a list of alternatives; no "when" always holds.
+    when = spec.get("when", {})
+    conditions = [when] if isinstance(when, dict) else when
+    if not isinstance(conditions, list) or not all(isinstance(condition, dict) for condition in conditions):
+        raise ValueError(f"'when' must be a condition or a list of conditions, got {when!r}")
+    return conditions
+
+
+def _string_list(name: str, values) -> List[str]:
+    # A bare string would otherwise be taken as a list of its characters.
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"{name} must be a list of strings, got {values!r}")
+    return values
+
+
+def _value_predicate(name: str, expected) -> Callable[[str], bool]:
+    """
+    Compiles a value test: a list of allowed values, {"not": [values]} or {"contains": text}.
+    """
+    if isinstance(expected, dict):
+        if "not" in expected:
+            excluded = frozenset(_string_list(name, expected["not"]))
+            return lambda value: value not in excluded
+        if "contains" in expected:
+            text = expected["contains"]
+            if not isinstance(text, str):
+                raise ValueError(f"{name} must contain a string, got {text!r}")
+            return lambda value: text in value
+        raise ValueError(f"Unknown value test: {expected}")
+    allowed = frozenset(_string_list(name, expected))
+    return lambda value: value in allowed
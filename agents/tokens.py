@@ -0,0 +1,83 @@
+import re
+from itertools import chain
+from typing import AbstractSet, FrozenSet, Iterable, List, Optional
+
+# Tokens are runs of word characters in the lowercased text. Keywords are
+# tokenized the same way and match whole tokens (or runs of consecutive tokens),
+# so "db" matches "DB" and "db-migration" but not "feedback".
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits a text into tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_keyword(keyword: str) -> str:
+    """
+    Returns the form a keyword is matched in: its tokens joined by single
+    spaces, e.g. "Status-Code" -> "status code". Empty if it has no tokens.
+    """
+    return " ".join(tokenize(keyword))
+
+
+class TokenSet:
+    """
+    The words and multi-word phrases of one or more token sequences, so that
+    keyword checks are set intersections (see `agents.keyword_matcher.KeywordMatcher`).
+
+    Phrases never span two sequences, e.g. the end of the subject and the
+    start of the message. They are built on demand, only for the phrase
+    lengths and first words asked for.
+    """
+    __slots__ = ("sequences", "words")
+
+    def __init__(self, *sequences: List[str]):
+        self.sequences = sequences
+        self.words: FrozenSet[str] = frozenset(chain.from_iterable(sequences))
+
+    @classmethod
+    def from_text(cls, *texts: str) -> "TokenSet":
+        """
+        Tokenizes each text as a separate sequence.
+        """
+        return cls(*(tokenize(text) for text in texts))
+
+    def phrases(self, lengths: Iterable[int], starts: Optional[AbstractSet[str]] = None) -> FrozenSet[str]:
+        """
+        Returns the phrases of `lengths` consecutive tokens, joined by single spaces.
+
+        Args:
+            lengths (Iterable[int]): Phrase lengths in tokens, e.g. (2, 3).
+            starts (AbstractSet[str], optional): Only phrases starting with one of
+                                                  these words; any word if omitted.
+        """
+        lengths = tuple(lengths)
+        phrases = set()
+        for tokens in self.sequences:
+            count = len(tokens)
+            for start, token in enumerate(tokens):
+                if starts is None or token in starts:
+                    phrases.update(" ".join(tokens[start:start + length]) for length in lengths if start + length <= count)
+        return frozenset(phrases)
+
+
+class TicketTokens:
+    """
+    A ticket's subject and message, lowercased and tokenized once and shared by
+    every agent that analyzes the ticket (see `Ticket.tokens`). `subject`,
+    `message` and `keywords` (both) are the texts the keyword sources of the
+    rules read.
+    """
+    __slots__ = ("subject_text", "message_text", "subject", "message", "keywords")
+
+    def __init__(self, subject: str, message: str):
+        # The texts the tokens were computed from, to detect a ticket whose text was replaced
+        self.subject_text = subject
+        self.message_text = message
+        subject_tokens, message_tokens = tokenize(subject), tokenize(message)
+        self.subject = TokenSet(subject_tokens)
+        self.message = TokenSet(message_tokens)
+        self.keywords = TokenSet(subject_tokens, message_tokens)
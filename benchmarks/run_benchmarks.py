@@ -0,0 +1,186 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from array import array
+from itertools import islice, repeat
+from typing import Callable, Dict, Iterable, List, Optional
+from agents.base_agent import Ticket
+from agents.technical_analyzer import TechnicalAnalyzerAgent
+from agents.customer_context import CustomerContextAgent
+from benchmarks.synthetic import generate_tickets
+from evaluation.evaluator import MetricsAccumulator, accumulate_results, ticket_labels
+from pipeline.processing import process_ticket, process_tickets_detailed
+from pipeline.log import configure_logging
+
+DEFAULT_SCALES = (1_000, 100_000, 1_000_000)
+
+# Tickets per batch in the evaluator benchmark.
+EVALUATE_CHUNK_SIZE = 1000
+
+
+def _agent_benchmark(agent_factory: Callable) -> Callable[[Iterable[Dict]], Iterable[int]]:
+    """
+    Times `analyze` on pre-validated tickets; validation is not part of the measurement.
+    """
+    def run(tickets: Iterable[Dict]) -> Iterable[int]:
+        agent = agent_factory()
+        clock = time.perf_counter_ns
+        for ticket_data in tickets:
+            ticket = Ticket(**ticket_data)
+            start = clock()
+            agent.analyze(ticket)
+            yield clock() - start
+    return run
+
+
+def _process_ticket_benchmark(tickets: Iterable[Dict]) -> Iterable[int]:
+    """
+    Times the full orchestrated path on raw tickets, validation included.
+    """
+    clock = time.perf_counter_ns
+    for ticket_data in tickets:
+        start = clock()
+        process_ticket(ticket_data)
+        yield clock() - start
+
+
+def _evaluate_benchmark(tickets: Iterable[Dict]) -> Iterable[int]:
+    """
+    Times the evaluator's batch path, orchestration and metrics accumulation
+    (what each `accumulate_parallel` worker runs), over chunks of
+    `EVALUATE_CHUNK_SIZE` raw tickets. Each ticket is reported with its
+    chunk's average latency, so the percentiles describe chunks.
+    """
+    clock = time.perf_counter_ns
+    tickets = iter(tickets)
+    accumulator = MetricsAccumulator()
+    while True:
+        chunk = list(islice(tickets, EVALUATE_CHUNK_SIZE))
+        if not chunk:
+            break
+        start = clock()
+        accumulator.merge(accumulate_results(
+            process_tickets_detailed(chunk, chunk_size=len(chunk)),
+            [ticket_labels(ticket_data) for ticket_data in chunk]
+        ))
+        yield from repeat((clock() - start) // len(chunk), len(chunk))
+
+
+BENCHMARKS = {
+    "technical_analyzer": _agent_benchmark(TechnicalAnalyzerAgent),
+    "customer_context": _agent_benchmark(CustomerContextAgent),
+    "process_ticket": _process_ticket_benchmark,
+    "evaluate": _evaluate_benchmark,
+}
+
+
+def run_benchmark(name: str, scale: int, seed: int = 0, measure_memory: bool = True) -> Dict[str, float]:
+    """
+    Runs one benchmark over `scale` synthetic tickets.
+
+    Returns:
+        Dict[str, float]: tickets_per_sec (based on time spent in the measured
+                          call), latency percentiles in microseconds and, if
+                          measured, peak traced memory in MiB during a second pass.
+    """
+    benchmark = BENCHMARKS[name]
+    latencies = array("q", benchmark(generate_tickets(scale, seed=seed)))
+    result = {"tickets": scale, **_latency_summary(latencies)}
+
+    if measure_memory:
+        # Separate pass: tracing allocations would distort the latency numbers.
+        tracemalloc.start()
+        for _ in benchmark(generate_tickets(scale, seed=seed)):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_memory_mib"] = peak / (1024 * 1024)
+    return result
+
+
+def _latency_summary(latencies: array) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    total_seconds = sum(ordered) / 1e9
+
+    def percentile(p: float) -> float:
+        return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)] / 1000
+
+    return {
+        "tickets_per_sec": len(ordered) / total_seconds if total_seconds > 0 else 0,
+        "p50_us": percentile(50),
+        "p90_us": percentile(90),
+        "p99_us": percentile(99),
+        "max_us": ordered[-1] / 1000,
+    }
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Lists regressions against a saved baseline: throughput lower, or p99 latency
+    or peak memory higher, than the baseline by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    for key, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(key)
+        if previous is None:
+            continue
+        if current["tickets_per_sec"] < previous["tickets_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {current['tickets_per_sec']:.0f}/s vs baseline {previous['tickets_per_sec']:.0f}/s")
+        if current["p99_us"] > previous["p99_us"] * (1 + tolerance):
+            regressions.append(f"{key}: p99 {current['p99_us']:.1f}us vs baseline {previous['p99_us']:.1f}us")
+        if "peak_memory_mib" in current and "peak_memory_mib" in previous:
+            if current["peak_memory_mib"] > previous["peak_memory_mib"] * (1 + tolerance):
+                regressions.append(f"{key}: peak memory {current['peak_memory_mib']:.1f}MiB vs baseline {previous['peak_memory_mib']:.1f}MiB")
+    return regressions
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks for the ticket analyzer agents and orchestrator.")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES), help="Comma-separated ticket counts (default: 1000,100000,1000000).")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic ticket generator.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak-memory pass.")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against; exits with status 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression when comparing (default: 0.10).")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    configure_logging("silent")
+
+    results = {"python": platform.python_version(), "benchmarks": {}}
+    print(f"{'benchmark':<28}{'tickets/s':>12}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>10}{'peak MiB':>10}")
+    for scale in (int(s) for s in args.scales.split(",")):
+        for name in args.benchmarks.split(","):
+            result = run_benchmark(name, scale, args.seed, measure_memory=not args.no_memory)
+            key = f"{name}@{scale}"
+            results["benchmarks"][key] = result
+            peak = f"{result['peak_memory_mib']:.1f}" if "peak_memory_mib" in result else "-"
+            print(
+                f"{key:<28}{result['tickets_per_sec']:>12.0f}{result['p50_us']:>10.1f}"
+                f"{result['p90_us']:>10.1f}{result['p99_us']:>10.1f}{result['max_us']:>10.1f}{peak:>10}"
+            )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
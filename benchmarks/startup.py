@@ -0,0 +1,109 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Import-time budget for `import main` in a fresh interpreter, in milliseconds.
+# Most of it is pydantic; the budget leaves headroom for a slower machine but
+# fails if a heavy dependency is imported at module level again.
+IMPORT_BUDGET_MS = 400.0
+
+# Modules that importing `main` must not load: they are only needed by some
+# commands or code paths, which import them when run.
+DEFERRED_MODULES = (
+    "agents.customer_context",
+    "agents.technical_analyzer",
+    "argparse",
+    "asyncio",
+    "concurrent.futures.process",
+    "evaluation",
+    "evaluation.evaluator",
+    "multiprocessing",
+    "numpy",
+    "pipeline.search",
+    "yaml",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure_import(module: str = "main", runs: int = 5) -> Dict:
+    """
+    Imports `module` in `runs` fresh interpreters (after one warm-up run that
+    writes the bytecode caches) and reports how long the import took.
+
+    Returns:
+        Dict: "median_ms", "min_ms" and "max_ms" of the import time, and
+              "deferred_loaded", the `DEFERRED_MODULES` the import loaded.
+    """
+    timings, modules = [], set()
+    for run in range(runs + 1):
+        completed = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)], capture_output=True, text=True, check=True
+        )
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        if run:
+            timings.append(probe["ms"])
+        modules.update(probe["modules"])
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in modules],
+    }
+
+
+def check_budget(result: Dict, budget_ms: float) -> List[str]:
+    """
+    Lists violations of the startup budget: a median import time over
+    `budget_ms`, or deferred modules loaded at import.
+    """
+    violations = []
+    if result["median_ms"] > budget_ms:
+        violations.append(f"import {result['module']}: {result['median_ms']:.0f}ms vs budget {budget_ms:.0f}ms")
+    for name in result["deferred_loaded"]:
+        violations.append(f"import {result['module']}: loads {name}, which should be imported on use")
+    return violations
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark for the ticket analyzer.")
+    parser.add_argument("--module", default="main", help="Module to import (default: main).")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time (default: 5).")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help=f"Median import time budget in ms (default: {IMPORT_BUDGET_MS:.0f}).")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    result = measure_import(args.module, args.runs)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"import {result['module']}: median {result['median_ms']:.1f}ms "
+            f"(min {result['min_ms']:.1f}ms, max {result['max_ms']:.1f}ms, {result['runs']} runs)"
+        )
+
+    violations = check_budget(result, args.budget_ms)
+    for violation in violations:
+        print(f"OVER BUDGET {violation}")
+    if violations:
+        return 1
+    print(f"Within the {args.budget_ms:.0f}ms import budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
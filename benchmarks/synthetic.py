@@ -0,0 +1,88 @@
+import math
+import random
+from typing import Dict, Iterator, List, Sequence, Tuple
+from agents.rules import active_rules
+
+# Filler vocabulary for the non-keyword part of subjects and messages.
+FILLER_WORDS = (
+    "hi", "hello", "team", "we", "our", "the", "a", "is", "are", "not", "working", "since",
+    "yesterday", "today", "please", "help", "thanks", "issue", "problem", "seeing", "users",
+    "customers", "when", "after", "update", "again", "still", "can", "you", "look", "into",
+    "this", "it", "seems", "like", "page", "app", "error", "failing", "slow", "broken", "urgent",
+)
+
+DEFAULT_TIER_MIX = (("free", 0.6), ("premium", 0.3), ("enterprise", 0.1))
+
+
+def keyword_vocabulary() -> List[str]:
+    """
+    Returns every keyword the active rules of both agents react to, so
+    generated tickets exercise all rules.
+    """
+    rules = active_rules()
+    return list(dict.fromkeys(rules.technical.keywords() + rules.customer.keywords()))
+
+
+def generate_tickets(
+    count: int,
+    seed: int = 0,
+    keyword_density: float = 0.05,
+    tier_mix: Sequence[Tuple[str, float]] = DEFAULT_TIER_MIX,
+    subject_words: Tuple[int, int] = (3, 12),
+    message_words_median: int = 40,
+    id_prefix: str = "SYN-"
+) -> Iterator[Dict]:
+    """
+    Lazily generates raw synthetic tickets with a reproducible distribution.
+
+    Subject lengths are uniform in `subject_words`; message lengths are
+    log-normal around `message_words_median` words (long tail up to a few
+    thousand words). Each word is an agent keyword with probability
+    `keyword_density`, otherwise filler.
+
+    Args:
+        count (int): Number of tickets to generate.
+        seed (int): Random seed; the same seed always yields the same tickets.
+        keyword_density (float): Probability that a word is a rule keyword.
+        tier_mix (Sequence[Tuple[str, float]]): (tier, weight) pairs.
+        subject_words (Tuple[int, int]): Inclusive range of subject lengths in words.
+        message_words_median (int): Median message length in words.
+        id_prefix (str): Prefix of generated ticket IDs.
+
+    Yields:
+        Dict: Raw ticket dictionaries accepted by `process_ticket`.
+    """
+    rng = random.Random(seed)
+    keywords = keyword_vocabulary()
+    tiers = [tier for tier, _ in tier_mix]
+    weights = [weight for _, weight in tier_mix]
+    message_mu = math.log(max(message_words_median, 1))
+
+    def text(word_count: int) -> str:
+        return " ".join(
+            rng.choice(keywords) if rng.random() < keyword_density else rng.choice(FILLER_WORDS)
+            for _ in range(word_count)
+        )
+
+    for i in range(count):
+        tier = rng.choices(tiers, weights)[0]
+        message_words = min(int(rng.lognormvariate(message_mu, 0.8)) + 1, 5000)
+        yield {
+            "ticket_id": f"{id_prefix}{i}",
+            "customer_tier": tier,
+            "subject": text(rng.randint(*subject_words)).capitalize(),
+            "message": text(message_words).capitalize() + ".",
+            "previous_tickets": min(int(rng.expovariate(0.4)), 100),
+            "monthly_revenue": _revenue(rng, tier),
+            "account_age_days": rng.randint(0, 3650),
+        }
+
+
+def _revenue(rng: random.Random, tier: str) -> float:
+    # Revenue ranges per tier, loosely matching the hand-written test cases.
+    if tier == "enterprise":
+        return round(rng.uniform(5000, 100000), 2)
+    if tier == "premium":
+        return round(rng.uniform(500, 15000), 2)
+    return 0.0 if rng.random() < 0.8 else round(rng.uniform(0, 100), 2)
+
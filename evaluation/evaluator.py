@@ -1,66 +1,82 @@
-from typing import List, Dict, Callable
-from agents.base_agent import Ticket, AgentOutput
-from agents.technical_analyzer import TechnicalAnalyzerAgent
-from agents.customer_context import CustomerContextAgent
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice, repeat, tee
+from typing import Iterable, List, Dict, Callable, Optional, Tuple, Union
+from agents.base_agent import Ticket, AgentOutput, TicketAnalysis
+from agents.records import VALIDATED_TICKET_TYPES
+from agents.registry import create_agent
 
-def evaluate_system(
-    test_cases: List[Dict],
-    process_ticket_func: Callable[[Dict], AgentOutput]
-) -> Dict[str, float]:
-    """
-    Evaluates the performance of the multi-agent system using various metrics.
+# Optional ground-truth fields of a labeled ticket, keyed by the output field they label.
+LABEL_FIELDS = {
+    "category": "expected_category",
+    "priority": "expected_priority",
+    "recommended_team": "expected_team",
+}
 
-    Args:
-        test_cases (List[Dict]): A list of raw ticket dictionaries to evaluate.
-        process_ticket_func (Callable): The main function to process a ticket,
-                                        which orchestrates the agents.
+# Labeled tickets whose (expected, predicted) pairs `accumulate_results` counts in one bulk call.
+LABEL_BATCH_SIZE = 10000
 
-    Returns:
-        Dict[str, float]: A dictionary containing the calculated metrics.
-    """
-    results_summary = {
-        "total_tickets": len(test_cases),
-        "inter_agent_category_agreement_rate": 0,
-        "inter_agent_priority_agreement_rate": 0,
-        "output_completeness_rate": 0,
-        "avg_reasoning_length": 0,
-        "simulated_correctness_score": 0 # This will be based on heuristic for this simulation
-    }
 
-    category_agreements = 0
-    priority_agreements = 0
-    complete_outputs = 0
-    total_reasoning_length = 0
-    simulated_correctness_score = 0
+class MetricsAccumulator:
+    """
+    Incrementally accumulates the evaluation metrics one ticket at a time,
+    so arbitrarily large evaluations run in constant memory.
 
-    technical_agent = TechnicalAnalyzerAgent()
-    customer_agent = CustomerContextAgent()
+    All state is integer counts, so accumulators built over separate shards
+    can be combined with `merge` and give exactly the same summary as a
+    single serial pass, whatever the sharding.
+    """
+    def __init__(self):
+        self.total_tickets = 0
+        self.category_agreements = 0
+        self.priority_agreements = 0
+        self.complete_outputs = 0
+        self.total_reasoning_length = 0
+        self.simulated_correctness_score = 0
+        # (expected, predicted) -> count for each labeled output field
+        self.confusion: Dict[str, Counter] = {field: Counter() for field in LABEL_FIELDS}
 
-    for test_case_data in test_cases:
-        # Re-parse ticket for individual agent analysis (for agreement calculation)
-        ticket = Ticket(**test_case_data)
+    def add(
+        self,
+        ticket: Optional[Ticket],
+        tech_analysis: Optional[AgentOutput],
+        cust_analysis: Optional[AgentOutput],
+        final_output: AgentOutput,
+        labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Adds one ticket's agent outputs and final decision to the metrics. A
+        ticket that failed validation (`ticket` is None) counts towards the
+        total and completeness only. `labels` maps output fields ("category",
+        "priority", "recommended_team") to their expected values.
+        """
+        self.total_tickets += 1
 
-        tech_analysis = technical_agent.analyze(ticket)
-        cust_analysis = customer_agent.analyze(ticket)
+        if labels:
+            for field, expected in labels.items():
+                self.confusion[field][(expected, getattr(final_output, field))] += 1
 
         # Calculate inter-agent agreement
-        if tech_analysis.category == cust_analysis.category:
-            category_agreements += 1
-        if tech_analysis.priority == cust_analysis.priority:
-            priority_agreements += 1
-
-        # Process the ticket through the full orchestrated system
-        final_output = process_ticket_func(test_case_data)
+        if tech_analysis is not None and cust_analysis is not None:
+            if tech_analysis.category == cust_analysis.category:
+                self.category_agreements += 1
+            if tech_analysis.priority == cust_analysis.priority:
+                self.priority_agreements += 1
 
         # Check output completeness
         if all(
             getattr(final_output, field) is not None and getattr(final_output, field) != ""
             for field in AgentOutput.model_fields.keys()
         ):
-            complete_outputs += 1
+            self.complete_outputs += 1
 
         # Sum reasoning length for average calculation
-        total_reasoning_length += len(final_output.reasoning)
+        self.total_reasoning_length += len(final_output.reasoning)
+
+        if ticket is None:
+            return
 
         # --- Simulated Correctness Score (Heuristic-based for this example) ---
         # This is a very simple heuristic. In a real system, this would involve
@@ -79,24 +95,357 @@ def evaluate_system(
         if "question" in ticket.subject.lower() and final_output.recommended_team == "Customer Success":
              score += 1
 
-        simulated_correctness_score += score
+        self.simulated_correctness_score += score
+
+    def add_labels(self, field: str, expected: List[str], predicted: List[str]) -> None:
+        """
+        Counts the (expected, predicted) pairs of many labeled tickets for one
+        output field at once, with a single `bincount` over the label codes
+        (see `evaluation.ground_truth.confusion_matrix`); pair by pair if
+        NumPy is not installed.
+        """
+        if not expected:
+            return
+        counts = self.confusion[field]
+        try:
+            from evaluation.ground_truth import confusion_matrix
+        except ImportError:
+            counts.update(zip(expected, predicted))
+            return
+        labels, matrix = confusion_matrix(expected, predicted)
+        for i, j in zip(*matrix.nonzero()):
+            counts[(labels[i], labels[j])] += int(matrix[i, j])
+
+    def merge(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        """
+        Adds the counts of `other` (e.g. from another shard) to this accumulator.
+        """
+        self.total_tickets += other.total_tickets
+        self.category_agreements += other.category_agreements
+        self.priority_agreements += other.priority_agreements
+        self.complete_outputs += other.complete_outputs
+        self.total_reasoning_length += other.total_reasoning_length
+        self.simulated_correctness_score += other.simulated_correctness_score
+        for field, counts in other.confusion.items():
+            self.confusion[field].update(counts)
+        return self
+
+    def subtract(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        """
+        Removes the counts of `other` from this accumulator, e.g. the old
+        contributions of tickets that are being re-analyzed.
+        """
+        self.total_tickets -= other.total_tickets
+        self.category_agreements -= other.category_agreements
+        self.priority_agreements -= other.priority_agreements
+        self.complete_outputs -= other.complete_outputs
+        self.total_reasoning_length -= other.total_reasoning_length
+        self.simulated_correctness_score -= other.simulated_correctness_score
+        for field, counts in other.confusion.items():
+            self.confusion[field].subtract(counts)
+            self.confusion[field] += Counter()  # drops pairs whose count reached zero
+        return self
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the counts as a JSON-serializable dictionary (see `from_dict`).
+        """
+        return {
+            "total_tickets": self.total_tickets,
+            "category_agreements": self.category_agreements,
+            "priority_agreements": self.priority_agreements,
+            "complete_outputs": self.complete_outputs,
+            "total_reasoning_length": self.total_reasoning_length,
+            "simulated_correctness_score": self.simulated_correctness_score,
+            "confusion": {
+                field: [[expected, predicted, count] for (expected, predicted), count in counts.items()]
+                for field, counts in self.confusion.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> "MetricsAccumulator":
+        """
+        Restores an accumulator saved with `to_dict`.
+        """
+        accumulator = cls()
+        for name, value in state.items():
+            if name != "confusion":
+                setattr(accumulator, name, value)
+        for field, counts in state.get("confusion", {}).items():
+            accumulator.confusion[field] = Counter({(expected, predicted): count for expected, predicted, count in counts})
+        return accumulator
+
+    def confusion_matrix(self, field: str) -> Tuple[List[str], List[List[int]]]:
+        """
+        Returns (labels, matrix) for a labeled output field, where
+        matrix[i][j] counts tickets expected as labels[i] and predicted as labels[j].
+        Labels are sorted so the result does not depend on processing order.
+        """
+        counts = self.confusion[field]
+        labels = sorted({label for pair in counts for label in pair})
+        index = {label: i for i, label in enumerate(labels)}
+        matrix = [[0] * len(labels) for _ in labels]
+        for (expected, predicted), count in counts.items():
+            matrix[index[expected]][index[predicted]] += count
+        return labels, matrix
+
+    def ground_truth(self) -> Dict[str, Dict]:
+        """
+        Returns accuracy, per-class precision/recall/F1 and the confusion matrix
+        for every labeled output field (see `evaluation.ground_truth`). Requires numpy.
+        """
+        from evaluation.ground_truth import classification_metrics
+
+        return {
+            field: classification_metrics(*self.confusion_matrix(field))
+            for field, counts in self.confusion.items()
+            if counts
+        }
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns the metrics in the format of `evaluate_system`.
+        """
+        total = self.total_tickets
+        return {
+            "total_tickets": total,
+            "inter_agent_category_agreement_rate": self.category_agreements / total if total > 0 else 0,
+            "inter_agent_priority_agreement_rate": self.priority_agreements / total if total > 0 else 0,
+            "output_completeness_rate": self.complete_outputs / total if total > 0 else 0,
+            "avg_reasoning_length": self.total_reasoning_length / total if total > 0 else 0,
+            "simulated_correctness_score": self.simulated_correctness_score / total if total > 0 else 0,
+        }
+
+
+def evaluate_results(
+    results: Iterable[TicketAnalysis],
+    labels: Optional[Iterable[Optional[Dict[str, str]]]] = None
+) -> Dict[str, float]:
+    """
+    Evaluates already-computed orchestrator results in a single streaming pass,
+    reusing the agents' intermediate outputs instead of re-running the agents.
+
+    Args:
+        results (Iterable[TicketAnalysis]): Results, e.g. from `pipeline.processing.process_tickets_detailed`.
+        labels (Iterable[Optional[Dict[str, str]]], optional): Expected outputs aligned
+                                                               with `results` (see `ticket_labels`).
+
+    Returns:
+        Dict[str, float]: A dictionary containing the calculated metrics.
+    """
+    return accumulate_results(results, labels).summary()
+
+
+def accumulate_results(
+    results: Iterable[TicketAnalysis],
+    labels: Optional[Iterable[Optional[Dict[str, str]]]] = None
+) -> MetricsAccumulator:
+    """
+    Same as `evaluate_results`, but returns the accumulator itself, which also
+    holds the confusion counts and can be merged with other shards. Label
+    pairs are counted in bulk, `LABEL_BATCH_SIZE` tickets at a time (see
+    `MetricsAccumulator.add_labels`).
+    """
+    accumulator = MetricsAccumulator()
+    labels = iter(labels) if labels is not None else repeat(None)
+    pending = {field: ([], []) for field in LABEL_FIELDS}
+    pending_count = 0
+    technical_agent = customer_agent = None
+    for result in results:
+        tech_analysis, cust_analysis = result.technical, result.customer
+        if result.ticket is not None and (tech_analysis is None or cust_analysis is None):
+            # The agents did not run (e.g. a cache hit); analyze for the agreement metrics
+            if technical_agent is None:
+                technical_agent, customer_agent = create_agent("technical"), create_agent("customer")
+            tech_analysis = technical_agent.analyze(result.ticket)
+            cust_analysis = customer_agent.analyze(result.ticket)
+        accumulator.add(result.ticket, tech_analysis, cust_analysis, result.final)
+
+        expected_outputs = next(labels, None)
+        if expected_outputs:
+            for field, expected in expected_outputs.items():
+                expected_labels, predicted_labels = pending[field]
+                expected_labels.append(expected)
+                predicted_labels.append(getattr(result.final, field))
+            pending_count += 1
+            if pending_count == LABEL_BATCH_SIZE:
+                _flush_labels(accumulator, pending)
+                pending_count = 0
+    _flush_labels(accumulator, pending)
+    return accumulator
+
+
+def _flush_labels(accumulator: MetricsAccumulator, pending: Dict[str, Tuple[List[str], List[str]]]) -> None:
+    for field, (expected_labels, predicted_labels) in pending.items():
+        accumulator.add_labels(field, expected_labels, predicted_labels)
+        expected_labels.clear()
+        predicted_labels.clear()
+
+
+def evaluate_system(
+    test_cases: Iterable[Dict],
+    process_ticket_func: Callable[[Dict], Union[AgentOutput, TicketAnalysis]],
+    trusted: bool = False
+) -> Dict[str, float]:
+    """
+    Evaluates the performance of the multi-agent system using various metrics.
+
+    Test cases are consumed one at a time, so any iterable (including a lazy
+    stream) can be evaluated in constant memory. If `process_ticket_func`
+    returns a `TicketAnalysis` (e.g. `pipeline.processing.process_ticket_detailed`), the
+    agents' intermediate outputs are reused and each ticket is analyzed once;
+    otherwise the agents are run separately for the agreement metrics.
+
+    With `trusted`, test cases are converted to tickets without validation
+    (see `Ticket.trusted`) and `process_ticket_func` receives the `Ticket`
+    instead of the dictionary, as `pipeline.processing.process_ticket` accepts.
+
+    Args:
+        test_cases (Iterable[Dict]): Raw ticket dictionaries to evaluate.
+        process_ticket_func (Callable): The main function to process a ticket,
+                                        which orchestrates the agents.
+        trusted (bool): Skips validating the test cases, which must then be valid.
+
+    Returns:
+        Dict[str, float]: A dictionary containing the calculated metrics.
+    """
+    test_cases, labeled_cases = tee(test_cases)
+    if trusted:
+        test_cases = (
+            test_case_data if isinstance(test_case_data, VALIDATED_TICKET_TYPES) else Ticket.trusted(test_case_data)
+            for test_case_data in test_cases
+        )
+    return evaluate_results(
+        (_as_analysis(test_case_data, process_ticket_func(test_case_data)) for test_case_data in test_cases),
+        (ticket_labels(test_case_data) for test_case_data in labeled_cases)
+    )
+
+
+def evaluate_labeled(
+    test_cases: Iterable[Dict],
+    workers: int = 1,
+    chunk_size: int = 10000,
+    trusted: bool = False
+) -> Dict:
+    """
+    Evaluates the orchestrator against labeled tickets (see `LABEL_FIELDS`).
+
+    Returns the `evaluate_system` metrics plus a "ground_truth" entry with
+    accuracy, per-class precision/recall/F1 and the confusion matrix for each
+    labeled field. Requires numpy.
+
+    Args:
+        test_cases (Iterable[Dict]): Raw, labeled ticket dictionaries.
+        workers (int): Number of worker processes; 1 evaluates in this process.
+        chunk_size (int): Number of tickets per chunk or shard.
+        trusted (bool): Skips validating the tickets (see `Ticket.trusted`).
+
+    Returns:
+        Dict: The summary metrics and the "ground_truth" report.
+    """
+    if workers == 1:
+        from pipeline.processing import process_tickets_detailed
+
+        test_cases, labeled_cases = tee(test_cases)
+        accumulator = accumulate_results(
+            process_tickets_detailed(test_cases, chunk_size=chunk_size, trusted=trusted),
+            (ticket_labels(test_case_data) for test_case_data in labeled_cases)
+        )
+    else:
+        accumulator = accumulate_parallel(test_cases, workers, chunk_size, trusted)
+    return {**accumulator.summary(), "ground_truth": accumulator.ground_truth()}
 
 
-    results_summary["inter_agent_category_agreement_rate"] = (
-        category_agreements / results_summary["total_tickets"]
-    ) if results_summary["total_tickets"] > 0 else 0
-    results_summary["inter_agent_priority_agreement_rate"] = (
-        priority_agreements / results_summary["total_tickets"]
-    ) if results_summary["total_tickets"] > 0 else 0
-    results_summary["output_completeness_rate"] = (
-        complete_outputs / results_summary["total_tickets"]
-    ) if results_summary["total_tickets"] > 0 else 0
-    results_summary["avg_reasoning_length"] = (
-        total_reasoning_length / results_summary["total_tickets"]
-    ) if results_summary["total_tickets"] > 0 else 0
-    results_summary["simulated_correctness_score"] = (
-        simulated_correctness_score / results_summary["total_tickets"]
-    ) if results_summary["total_tickets"] > 0 else 0
+def evaluate_system_parallel(
+    test_cases: Iterable[Dict],
+    workers: Optional[int] = None,
+    chunk_size: int = 10000,
+    trusted: bool = False
+) -> Dict[str, float]:
+    """
+    Evaluates the orchestrator over a (large) corpus of raw tickets by sharding
+    it across worker processes.
+
+    Returns the same summary as `evaluate_system(test_cases, pipeline.processing.process_ticket)`;
+    the result is identical for any worker count or chunk size. With `trusted`,
+    the workers skip validating the tickets (see `Ticket.trusted`).
+    """
+    return accumulate_parallel(test_cases, workers, chunk_size, trusted).summary()
+
+
+def accumulate_parallel(
+    test_cases: Iterable[Dict],
+    workers: Optional[int] = None,
+    chunk_size: int = 10000,
+    trusted: bool = False
+) -> MetricsAccumulator:
+    """
+    Runs the orchestrator and metrics over shards of `chunk_size` tickets in a
+    process pool and merges the per-shard accumulators. Only the accumulators
+    (integer counts) are sent back, and at most two shards per worker are in
+    flight at a time.
+
+    Args:
+        test_cases (Iterable[Dict]): Raw ticket dictionaries, optionally labeled
+                                     (see `LABEL_FIELDS`).
+        workers (int, optional): Number of worker processes; defaults to the CPU count.
+        chunk_size (int): Number of tickets per shard.
+        trusted (bool): Skips validating the tickets in the workers.
+
+    Returns:
+        MetricsAccumulator: The merged metrics, including confusion counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    test_cases = iter(test_cases)
+    accumulator = MetricsAccumulator()
+    from agents.registry import registered_agents
+    from agents.rules import active_rules
+    from pipeline.processing import init_worker
+    accumulate_chunk = partial(_accumulate_chunk, trusted=trusted)
+
+    # The workers get the parent's rules and agent registrations, as in `process_tickets_parallel`.
+    initargs = (active_rules(), registered_agents())
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as executor:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < 2 * workers:
+                chunk = list(islice(test_cases, chunk_size))
+                if not chunk:
+                    break
+                in_flight.append(executor.submit(accumulate_chunk, chunk))
+            if not in_flight:
+                break
+            accumulator.merge(in_flight.popleft().result())
+    return accumulator
+
+
+def ticket_labels(ticket_data: Dict) -> Optional[Dict[str, str]]:
+    """
+    Extracts the expected outputs of a labeled raw ticket, or None if it has none.
+    """
+    if not isinstance(ticket_data, dict):
+        return None
+    labels = {field: ticket_data[key] for field, key in LABEL_FIELDS.items() if key in ticket_data}
+    return labels or None
+
+
+def _accumulate_chunk(chunk: List[Dict], trusted: bool = False) -> MetricsAccumulator:
+    """
+    Worker-side entry point for `accumulate_parallel`.
+    """
+    from pipeline.processing import process_tickets_detailed
+
+    return accumulate_results(
+        process_tickets_detailed(chunk, chunk_size=len(chunk), trusted=trusted),
+        [ticket_labels(ticket_data) for ticket_data in chunk]
+    )
 
 
-    return results_summary
+def _as_analysis(test_case_data: Union[Dict, Ticket], result: Union[AgentOutput, TicketAnalysis]) -> TicketAnalysis:
+    if isinstance(result, TicketAnalysis):
+        return result
+    if isinstance(test_case_data, VALIDATED_TICKET_TYPES):
+        return TicketAnalysis(test_case_data, None, None, result)
+    # Re-parse ticket for individual agent analysis (for agreement calculation)
+    return TicketAnalysis(Ticket(**test_case_data), None, None, result)
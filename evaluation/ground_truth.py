@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+def confusion_matrix(
+    expected: Sequence[str],
+    predicted: Sequence[str],
+    labels: Optional[Sequence[str]] = None
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Builds a confusion matrix from aligned arrays of expected and predicted labels.
+
+    Labels are encoded to integer codes once and counted with a single
+    `bincount`, so millions of results are counted without a Python-level loop.
+
+    Args:
+        expected (Sequence[str]): Ground-truth label per ticket.
+        predicted (Sequence[str]): Predicted label per ticket.
+        labels (Sequence[str], optional): Label order, covering every label in both
+                                          inputs; their sorted union if omitted.
+
+    Returns:
+        Tuple[List[str], np.ndarray]: (labels, matrix), where matrix[i, j] counts
+                                      tickets expected as labels[i] and predicted as labels[j].
+    """
+    expected = np.asarray(expected, dtype=str)
+    predicted = np.asarray(predicted, dtype=str)
+    if labels is None:
+        labels = np.union1d(expected, predicted)
+    labels = np.asarray(labels, dtype=str)
+    order = np.argsort(labels)
+    sorted_labels = labels[order]
+    expected_codes = order[np.searchsorted(sorted_labels, expected)]
+    predicted_codes = order[np.searchsorted(sorted_labels, predicted)]
+    n = len(labels)
+    counts = np.bincount(expected_codes * n + predicted_codes, minlength=n * n)
+    return labels.tolist(), counts.reshape(n, n)
+
+
+def classification_metrics(labels: Sequence[str], matrix: np.ndarray) -> Dict:
+    """
+    Computes accuracy and per-class precision, recall and F1 from a confusion matrix.
+
+    Classes that are never predicted (or never expected) get a precision
+    (or recall) of 0.0 instead of a division error.
+
+    Args:
+        labels (Sequence[str]): Class labels, in matrix order.
+        matrix (np.ndarray): Confusion matrix (rows expected, columns predicted).
+
+    Returns:
+        Dict: accuracy, macro_f1, support, per_class metrics and the confusion matrix.
+    """
+    matrix = np.asarray(matrix, dtype=np.int64)
+    true_positives = np.diag(matrix).astype(np.float64)
+    predicted_counts = matrix.sum(axis=0)
+    expected_counts = matrix.sum(axis=1)
+    total = int(matrix.sum())
+
+    precision = np.divide(true_positives, predicted_counts, out=np.zeros_like(true_positives), where=predicted_counts > 0)
+    recall = np.divide(true_positives, expected_counts, out=np.zeros_like(true_positives), where=expected_counts > 0)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(denominator), where=denominator > 0)
+
+    return {
+        "accuracy": float(true_positives.sum() / total) if total > 0 else 0,
+        "macro_f1": float(f1.mean()) if len(labels) > 0 else 0,
+        "support": total,
+        "per_class": {
+            label: {
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1": float(f1[i]),
+                "support": int(expected_counts[i]),
+            }
+            for i, label in enumerate(labels)
+        },
+        "confusion_matrix": {"labels": list(labels), "matrix": matrix.tolist()},
+    }
+
+
+def label_metrics(expected: Sequence[str], predicted: Sequence[str]) -> Dict:
+    """
+    Convenience wrapper: `classification_metrics` straight from label arrays.
+    """
+    return classification_metrics(*confusion_matrix(expected, predicted))
@@ -1,112 +1,63 @@
 import json
-from agents.base_agent import Ticket, AgentOutput
-from agents.technical_analyzer import TechnicalAnalyzerAgent
-from agents.customer_context import CustomerContextAgent
-from evaluation.evaluator import evaluate_system
-from evaluation.test_cases import get_test_cases
-
-def process_ticket(ticket_data: dict) -> AgentOutput:
-    """
-    Processes a single support ticket using multiple specialized agents
-    and an orchestration layer to determine final routing.
-
-    Args:
-        ticket_data (dict): A dictionary containing raw ticket information.
-
-    Returns:
-        AgentOutput: The final aggregated analysis and routing decision.
-    """
-    try:
-        # Validate and parse the input ticket data using Pydantic model
-        ticket = Ticket(**ticket_data)
-    except Exception as e:
-        print(f"Error validating ticket input: {e}")
-        # Return a default error output or raise the exception
-        return AgentOutput(
-            category="Error",
-            priority="Critical", # Mark as critical for immediate review
-            recommended_team="System Admin",
-            reasoning=f"Failed to parse ticket input: {e}"
-        )
-
-    print(f"\nProcessing Ticket ID: {ticket.ticket_id}")
-
-    # Initialize specialized agents
-    technical_agent = TechnicalAnalyzerAgent()
-    customer_agent = CustomerContextAgent()
-
-    # Get analyses from each agent
-    # We pass the full ticket object to each agent for their specialized analysis
-    tech_analysis: AgentOutput = technical_agent.analyze(ticket)
-    cust_analysis: AgentOutput = customer_agent.analyze(ticket)
-
-    print(f"  Technical Agent Analysis: Category='{tech_analysis.category}', Priority='{tech_analysis.priority}', Team='{tech_analysis.recommended_team}'")
-    print(f"  Customer Agent Analysis: Category='{cust_analysis.category}', Priority='{cust_analysis.priority}', Team='{cust_analysis.recommended_team}'")
-
-    # --- Orchestration and Conflict Resolution Logic ---
-    # Define a mapping for priority levels to allow numeric comparison
-    priority_map = {
-        "Info": 1,
-        "Low": 2,
-        "Medium": 3,
-        "High": 4,
-        "Critical": 5
-    }
-
-    # Determine final priority: Take the highest priority suggested by any agent
-    final_priority_value = max(
-        priority_map.get(tech_analysis.priority, 1),
-        priority_map.get(cust_analysis.priority, 1)
-    )
-    final_priority = next(
-        (p_name for p_name, p_val in priority_map.items() if p_val == final_priority_value),
-        "Medium" # Default if not found, though it should be
-    )
-
-    # Determine final category and recommended team
-    final_category: str = "General Inquiry"
-    final_recommended_team: str = "Support Tier 1"
-    final_reasoning: str = ""
-
-    # Prioritize technical issues if identified by the Technical Analyzer
-    if "Technical" in tech_analysis.category:
-        final_category = tech_analysis.category
-        final_recommended_team = tech_analysis.recommended_team
-    elif "Urgent Customer Issue" in cust_analysis.category:
-        # If not technical, check for urgent customer-related issues
-        final_category = cust_analysis.category
-        final_recommended_team = cust_analysis.recommended_team
-    else:
-        # Fallback to customer agent's general category or a default
-        if cust_analysis.category != "General Inquiry":
-            final_category = cust_analysis.category
-            final_recommended_team = cust_analysis.recommended_team
-        else:
-            final_category = tech_analysis.category # Use technical agent's general category if customer agent didn't find specific category.
-            final_recommended_team = tech_analysis.recommended_team
-
-
-    # Combine reasoning from both agents
-    final_reasoning = (
-        f"Technical perspective: {tech_analysis.reasoning}\n"
-        f"Customer context perspective: {cust_analysis.reasoning}\n"
-        f"Orchestration decision: Final priority is '{final_priority}' "
-        f"based on maximum urgency. Final routing to '{final_category}' "
-        f"with '{final_recommended_team}' recommended team."
-    )
-
-    final_output = AgentOutput(
-        category=final_category,
-        priority=final_priority,
-        recommended_team=final_recommended_team,
-        reasoning=final_reasoning
-    )
-
-    print(f"  Final Decision: Category='{final_output.category}', Priority='{final_output.priority}', Team='{final_output.recommended_team}'")
-    return final_output
+import logging
+import sys
+from typing import List, Optional
+from agents.registry import register_agent
+from agents.rules import RuleSet, activate_rules
+from pipeline import latency
+from pipeline.log import configure_logging, logger
+# The processing functions live in `pipeline.processing`; they are re-exported here for callers of this module
+from pipeline.processing import (
+    process_ticket,
+    process_ticket_detailed,
+    process_tickets,
+    process_tickets_compact,
+    process_tickets_detailed,
+    process_tickets_parallel,
+    process_store_parallel,
+    run_stream,
+)
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> "argparse.Namespace":
+    # Imported here so that library use of this module does not pay for it
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Multi-Agent Customer Support Ticket Analyzer")
+    parser.add_argument("--input", help="JSONL or CSV ticket file or ticket store directory to analyze, or '-' for stdin. Runs the built-in test cases if omitted.")
+    parser.add_argument("--output", default="-", help="JSONL file to write results to, or '-' for stdout (default).")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format; inferred from the file extension if omitted.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes (default: 1).")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Tickets validated and dispatched per chunk (default: 1000).")
+    parser.add_argument("--verbosity", choices=["silent", "summary", "debug"], default="summary", help="Log detail written to stderr (default: summary).")
+    parser.add_argument("--debug-log", help="Optional file receiving debug logs as JSON lines, regardless of --verbosity.")
+    parser.add_argument("--rules", help="JSON or YAML rule file to use instead of the built-in rules.")
+    parser.add_argument("--agent", action="append", default=[], metavar="ROLE=MODULE:CLASS", help="Agent class to use for a role (technical, customer), imported on first use. Repeatable.")
+    parser.add_argument("--short-circuit", action="store_true", help="Skip an agent when the other one's analysis already decides the ticket.")
+    parser.add_argument("--latency-report", help="File to write per-stage latency histograms to: Prometheus text for a .prom file, JSON otherwise.")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
+    args = _parse_args()
+    configure_logging(args.verbosity, args.debug_log)
+    for agent_spec in args.agent:
+        role, _, agent_path = agent_spec.partition("=")
+        register_agent(role, agent_path)
+    if args.rules:
+        activate_rules(RuleSet.load(args.rules))
+    if args.latency_report:
+        latency.enable_latency_tracking()
+    if args.input:
+        run_stream(args.input, args.output, args.format, args.workers, args.chunk_size, args.short_circuit)
+        if args.latency_report:
+            latency.recorder.write(args.latency_report)
+        sys.exit(0)
+
+    # Evaluation is only needed for the demo run below
+    from evaluation.evaluator import evaluate_results
+    from evaluation.test_cases import get_test_cases
+
     print("--- Starting Multi-Agent Ticket Analysis System ---")
 
     # Get test cases
@@ -118,17 +69,21 @@ if __name__ == "__main__":
     for i, test_case in enumerate(test_cases):
         print(f"\n--- Test Case {i+1} ---")
         ticket_id = test_case.get("ticket_id", "N/A")
-        print(f"Input Ticket: {json.dumps(test_case, indent=2)}")
-        final_analysis = process_ticket(test_case)
-        results.append(final_analysis)
-        print(f"\nFinal Analyzed Output for Ticket {ticket_id}:")
-        print(final_analysis.model_dump_json(indent=2))
-
-    # Evaluate the system performance on all test cases
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Input Ticket: %s", json.dumps(test_case, indent=2))
+        analysis = process_ticket_detailed(test_case)
+        results.append(analysis)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final Analyzed Output for Ticket %s:\n%s", ticket_id, analysis.final.model_dump_json(indent=2))
+
+    # Evaluate the system performance on all test cases, reusing the agent outputs above
     print("\n--- Evaluating System Performance ---")
-    evaluation_results = evaluate_system(test_cases, process_ticket)
+    evaluation_results = evaluate_results(results)
     print("\nEvaluation Summary:")
     for metric, value in evaluation_results.items():
         print(f"- {metric}: {value}")
 
+    if args.latency_report:
+        latency.recorder.write(args.latency_report)
+
     print("\n--- Multi-Agent System Execution Complete ---")
\ No newline at end of file
@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+from agents.base_agent import Ticket, AgentOutput
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of final `AgentOutput`s keyed on ticket content.
+
+    Entries expire after `ttl_seconds` (if set) and the least recently used
+    entry is evicted once `max_size` is reached. The cache is bound to a rules
+    fingerprint and clears itself when it is used with different rules, so a
+    change to the agents' rule tables never serves stale results.
+    """
+    def __init__(
+        self,
+        max_size: int = 100_000,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_size (int): Maximum number of cached outputs.
+            ttl_seconds (float, optional): Lifetime of an entry; entries never expire if omitted.
+            clock (Callable): Monotonic time source, in seconds.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._rules_fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bind_rules(self, rules_fingerprint: str) -> None:
+        """
+        Associates the cache with a set of rules, clearing it if they changed.
+        """
+        if rules_fingerprint != self._rules_fingerprint:
+            with self._lock:
+                self._entries.clear()
+                self._rules_fingerprint = rules_fingerprint
+
+    def get(self, key: bytes) -> Optional[AgentOutput]:
+        """
+        Returns the cached output for `key`, or None on a miss or expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, output = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return output
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, output: AgentOutput) -> None:
+        """
+        Stores `output` under `key`, evicting the least recently used entry if full.
+        """
+        expires_at = None if self.ttl_seconds is None else self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit/miss/eviction counters, current size and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def ticket_cache_key(ticket: Ticket) -> bytes:
+    """
+    Hashes the ticket fields the agents read. `ticket_id` and `account_age_days`
+    are not used by any agent, so re-submitted tickets share a key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for value in (ticket.customer_tier, ticket.subject, ticket.message):
+        encoded = value.encode()
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    digest.update(repr((ticket.previous_tickets, ticket.monthly_revenue)).encode())
+    return digest.digest()
@@ -0,0 +1,410 @@
+import json
+import threading
+import time
+from collections import deque
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from agents.base_agent import AgentOutput, BaseAgent
+from pipeline import latency
+from pipeline.cache import ResultCache
+from pipeline.log import logger
+from pipeline.processing import error_output, process_tickets
+
+
+class QueueMessage:
+    """
+    One delivery of a message: its body and the ID used to acknowledge it.
+    """
+    __slots__ = ("message_id", "body", "deliveries")
+
+    def __init__(self, message_id: int, body: Any, deliveries: int = 1):
+        self.message_id = message_id
+        self.body = body
+        self.deliveries = deliveries
+
+    def __repr__(self) -> str:
+        return f"QueueMessage(message_id={self.message_id}, deliveries={self.deliveries})"
+
+
+class InMemoryQueue:
+    """
+    Thread-safe in-memory stand-in for a message queue with batch receive and
+    acknowledgement, for tests and local runs of `MicroBatchConsumer`.
+
+    Received messages stay in flight until they are acknowledged (`ack`) or
+    returned for redelivery (`nack`). Unlike a real broker, in-flight messages
+    never time out, so a consumer that stops without acknowledging keeps them.
+    Any queue client with the same `receive`, `ack` and `nack` methods can be
+    consumed the same way.
+    """
+    def __init__(self):
+        self._ready: "deque[QueueMessage]" = deque()
+        self._in_flight: Dict[int, QueueMessage] = {}
+        self._condition = threading.Condition()
+        self._next_id = 0
+        self.acked = 0
+
+    def __len__(self) -> int:
+        """
+        Returns the number of messages waiting to be received.
+        """
+        with self._condition:
+            return len(self._ready)
+
+    @property
+    def in_flight(self) -> int:
+        with self._condition:
+            return len(self._in_flight)
+
+    def put(self, body: Any) -> int:
+        """
+        Publishes one message, e.g. a raw ticket dictionary or its JSON encoding.
+
+        Returns:
+            int: The message ID.
+        """
+        return self.put_many([body])[0]
+
+    def put_many(self, bodies: Sequence[Any]) -> List[int]:
+        """
+        Publishes several messages at once.
+
+        Returns:
+            List[int]: Their message IDs, in order.
+        """
+        with self._condition:
+            message_ids = list(range(self._next_id, self._next_id + len(bodies)))
+            self._next_id += len(bodies)
+            self._ready.extend(QueueMessage(message_id, body, 0) for message_id, body in zip(message_ids, bodies))
+            self._condition.notify_all()
+        return message_ids
+
+    def receive(self, max_messages: int, timeout: float = 0.0) -> List[QueueMessage]:
+        """
+        Returns up to `max_messages` messages, waiting up to `timeout` seconds
+        for the first one. Returns an empty list if none arrived in time.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._ready:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+            messages = []
+            while self._ready and len(messages) < max_messages:
+                message = self._ready.popleft()
+                message.deliveries += 1
+                self._in_flight[message.message_id] = message
+                messages.append(message)
+            return messages
+
+    def ack(self, messages: Sequence[QueueMessage]) -> None:
+        """
+        Acknowledges a batch of received messages, removing them from the queue.
+        """
+        with self._condition:
+            for message in messages:
+                if self._in_flight.pop(message.message_id, None) is not None:
+                    self.acked += 1
+
+    def nack(self, messages: Sequence[QueueMessage]) -> None:
+        """
+        Returns a batch of received messages to the front of the queue for redelivery.
+        """
+        with self._condition:
+            returned = [self._in_flight.pop(message.message_id) for message in messages if message.message_id in self._in_flight]
+            self._ready.extendleft(reversed(returned))
+            if returned:
+                self._condition.notify_all()
+
+
+class AdaptiveBatchSize:
+    """
+    Batch size controller that holds the p99 of per-message latency under a target.
+
+    The p99 is measured over the messages of the batches processed since the
+    last change of size. Once at least `min_samples` messages have been
+    measured, the size is halved if the p99 exceeds the target, and grows by
+    an eighth (at least 1) if the p99 is below `headroom` times the target and
+    the batches were full. Partially filled batches mean the queue is draining
+    faster than messages arrive, so a larger size would not be used.
+    """
+    def __init__(
+        self,
+        target_p99: float,
+        initial: int = 100,
+        min_size: int = 1,
+        max_size: int = 1000,
+        min_samples: int = 100,
+        headroom: float = 0.8
+    ):
+        """
+        Args:
+            target_p99 (float): Target p99 latency in seconds, from a message's
+                                receipt to its acknowledgement.
+            initial (int): Starting batch size.
+            min_size (int): Smallest batch size.
+            max_size (int): Largest batch size.
+            min_samples (int): Messages measured before the size may change again.
+            headroom (float): Fraction of the target below which the size grows.
+        """
+        self.target_p99 = target_p99
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_samples = min_samples
+        self.headroom = headroom
+        self.size = max(min_size, min(initial, max_size))
+        self._latencies: List[float] = []
+        self._all_full = True
+
+    def observe(self, latencies: Sequence[float], full: bool) -> int:
+        """
+        Records the per-message latencies of one batch and adjusts the size.
+
+        Args:
+            latencies (Sequence[float]): Latency of each message in the batch, in seconds.
+            full (bool): Whether the batch reached the current size, rather than the wait limit.
+
+        Returns:
+            int: The batch size to use next.
+        """
+        self._latencies.extend(latencies)
+        self._all_full = self._all_full and full
+        if len(self._latencies) < self.min_samples:
+            return self.size
+
+        p99 = self.p99()
+        if p99 > self.target_p99:
+            size = max(self.min_size, self.size // 2)
+        elif p99 < self.target_p99 * self.headroom and self._all_full:
+            size = min(self.max_size, self.size + max(1, self.size // 8))
+        else:
+            size = self.size
+        # Measurements taken at the old size say little about the new one
+        self._latencies = []
+        self._all_full = True
+        self.size = size
+        return size
+
+    def p99(self) -> float:
+        """
+        Returns the p99 latency of the messages measured at the current size (NaN if none).
+        """
+        if not self._latencies:
+            return float("nan")
+        ordered = sorted(self._latencies)
+        return ordered[min(int(0.99 * len(ordered)), len(ordered) - 1)]
+
+
+class MicroBatchConsumer:
+    """
+    Consumes tickets from a message queue in micro-batches.
+
+    Messages are collected until the batch is full or `max_wait` seconds have
+    passed since its first message arrived. The batch is then validated and
+    analyzed in one `process_tickets` call, the results are handed to
+    `on_results`, and the messages are acknowledged together. If analysis or
+    `on_results` fails, the messages of the batch are retried one at a time:
+    those that succeed are acknowledged, and only the failing ones are returned
+    to the queue, so every message is acknowledged only after its result was
+    delivered (at least once). A message that has been delivered
+    `max_deliveries` times and still fails is handed to `on_dead_letter`
+    and acknowledged, so a poison message cannot block the queue. Messages
+    that are not valid tickets get the usual error output and are acknowledged.
+
+    With `target_p99`, the batch size adapts to the observed latency (see
+    `AdaptiveBatchSize`) between 1 and `max_batch_size`.
+    """
+    def __init__(
+        self,
+        queue,
+        on_results: Optional[Callable[[List[Tuple[QueueMessage, AgentOutput]]], None]] = None,
+        max_batch_size: int = 100,
+        max_wait: float = 0.05,
+        target_p99: Optional[float] = None,
+        poll_timeout: float = 1.0,
+        technical_agent: Optional[BaseAgent] = None,
+        customer_agent: Optional[BaseAgent] = None,
+        cache: Optional[ResultCache] = None,
+        short_circuit: bool = False,
+        max_deliveries: int = 5,
+        on_dead_letter: Optional[Callable[[QueueMessage, Exception], None]] = None
+    ):
+        """
+        Args:
+            queue: Queue client with `receive(max_messages, timeout)`, `ack(messages)`
+                   and `nack(messages)`, e.g. `InMemoryQueue`. Messages have a
+                   `deliveries` count; their bodies are raw ticket dictionaries
+                   or their JSON encoding (str or bytes).
+            on_results (Callable, optional): Called with the (message, output) pairs of
+                                             each batch, before it is acknowledged.
+            max_batch_size (int): Batch size, or the largest one with `target_p99`.
+            max_wait (float): Longest time, in seconds, a batch waits to fill up.
+            target_p99 (float, optional): Target p99 latency in seconds from a message's
+                                          receipt to its acknowledgement; adapts the batch size if set.
+            poll_timeout (float): Longest time, in seconds, `poll` waits for a first message.
+            technical_agent (BaseAgent, optional): Technical agent; the shared one if omitted.
+            customer_agent (BaseAgent, optional): Customer context agent; the shared one if omitted.
+            cache (ResultCache, optional): Cache consulted before running the agents.
+            short_circuit (bool): Skips an agent whose analysis cannot change the
+                                  decision (see `Orchestrator.run_agents`).
+            max_deliveries (int): Deliveries after which a failing message is dead-lettered.
+            on_dead_letter (Callable, optional): Called with each dead-lettered message and
+                                                 the error of its last attempt, e.g. to
+                                                 publish it to a dead-letter queue. The
+                                                 message is only logged if omitted.
+        """
+        self.queue = queue
+        self.on_results = on_results
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.poll_timeout = poll_timeout
+        self.technical_agent = technical_agent
+        self.customer_agent = customer_agent
+        self.cache = cache
+        self.short_circuit = short_circuit
+        self.max_deliveries = max_deliveries
+        self.on_dead_letter = on_dead_letter
+        self.sizer = (
+            AdaptiveBatchSize(target_p99, initial=max_batch_size, max_size=max_batch_size)
+            if target_p99 is not None else None
+        )
+        self.batches = 0
+        self.processed = 0
+        self.failed_batches = 0
+        self.dead_lettered = 0
+        self._stopped = threading.Event()
+
+    @property
+    def batch_size(self) -> int:
+        return self.sizer.size if self.sizer is not None else self.max_batch_size
+
+    def poll(self) -> int:
+        """
+        Collects, processes and acknowledges one batch.
+
+        Returns:
+            int: The number of messages in the batch; 0 if none arrived within `poll_timeout`.
+        """
+        batch_size = self.batch_size
+        messages, received_at = self._collect(batch_size)
+        if not messages:
+            return 0
+
+        start = perf_counter()
+        try:
+            self._deliver(messages)
+        except Exception:
+            logger.warning("Batch of %d messages failed; retrying its messages one at a time", len(messages), exc_info=True)
+            self.failed_batches += 1
+            self._retry_each(messages)
+            return len(messages)
+        self.queue.ack(messages)
+        acked_at = perf_counter()
+
+        self.batches += 1
+        self.processed += len(messages)
+        recorder = latency.recorder
+        if recorder is not None:
+            recorder.observe("batch", acked_at - start)
+        if self.sizer is not None:
+            self.sizer.observe([acked_at - t for t in received_at], len(messages) >= batch_size)
+        return len(messages)
+
+    def run(self, max_batches: Optional[int] = None, stop_when_empty: bool = False) -> None:
+        """
+        Polls batches until `stop` is called.
+
+        Args:
+            max_batches (int, optional): Also stops after this many batches.
+            stop_when_empty (bool): Also stops when no message arrives within `poll_timeout`.
+        """
+        self._stopped.clear()
+        batches = 0
+        while not self._stopped.is_set() and (max_batches is None or batches < max_batches):
+            if self.poll():
+                batches += 1
+            elif stop_when_empty:
+                break
+
+    def stop(self) -> None:
+        """
+        Makes `run` return after the current batch, e.g. from another thread.
+        """
+        self._stopped.set()
+
+    def _deliver(self, messages: List[QueueMessage]) -> None:
+        outputs = self._analyze(messages)
+        if self.on_results is not None:
+            self.on_results(list(zip(messages, outputs)))
+
+    def _retry_each(self, messages: List[QueueMessage]) -> None:
+        # Isolates the failing messages of a failed batch: only they are redelivered or dead-lettered
+        for message in messages:
+            try:
+                self._deliver([message])
+            except Exception as error:
+                if message.deliveries < self.max_deliveries:
+                    logger.warning("Message %s failed (delivery %d); returning it to the queue", message.message_id, message.deliveries)
+                    self.queue.nack([message])
+                else:
+                    self._dead_letter(message, error)
+                continue
+            self.queue.ack([message])
+            self.processed += 1
+
+    def _dead_letter(self, message: QueueMessage, error: Exception) -> None:
+        try:
+            if self.on_dead_letter is not None:
+                self.on_dead_letter(message, error)
+            else:
+                logger.error("Dropping message %s after %d deliveries: %s", message.message_id, message.deliveries, error)
+        except Exception:
+            logger.exception("Dead-letter handler failed for message %s; returning it to the queue", message.message_id)
+            self.queue.nack([message])
+            return
+        self.queue.ack([message])
+        self.dead_lettered += 1
+
+    def _collect(self, batch_size: int) -> Tuple[List[QueueMessage], List[float]]:
+        # Waits up to poll_timeout for a first message, then up to max_wait for the batch to fill
+        messages = self.queue.receive(batch_size, self.poll_timeout)
+        now = perf_counter()
+        received_at = [now] * len(messages)
+        deadline = now + self.max_wait
+        while messages and len(messages) < batch_size:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            more = self.queue.receive(batch_size - len(messages), remaining)
+            now = perf_counter()
+            messages.extend(more)
+            received_at.extend([now] * len(more))
+        return messages, received_at
+
+    def _analyze(self, messages: List[QueueMessage]) -> List[AgentOutput]:
+        # One process_tickets call per batch, so validation is a single bulk call
+        tickets, errors = [], {}
+        for position, message in enumerate(messages):
+            try:
+                tickets.append(_decode(message.body))
+            except ValueError as error:
+                errors[position] = error_output(error)
+        outputs = iter(process_tickets(
+            tickets,
+            chunk_size=max(len(tickets), 1),
+            technical_agent=self.technical_agent,
+            customer_agent=self.customer_agent,
+            cache=self.cache,
+            short_circuit=self.short_circuit
+        ))
+        return [errors[position] if position in errors else next(outputs) for position in range(len(messages))]
+
+
+def _decode(body: Any) -> Dict:
+    if isinstance(body, (bytes, bytearray, str)):
+        body = json.loads(body)
+    if not isinstance(body, dict):
+        raise ValueError(f"Message body is not a ticket object: {type(body).__name__}")
+    return body
@@ -0,0 +1,448 @@
+import json
+import os
+from array import array
+from itertools import tee
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from agents.base_agent import Ticket, AgentOutput, TicketAnalysis
+from agents.customer_context import CustomerContextAgent
+from agents.keyword_matcher import KeywordMatcher
+from agents.orchestrator import Orchestrator
+from agents.records import VALIDATED_TICKET_TYPES, AnalysisRecord, analyze_record
+from agents.rules import CONDITION_FIELDS, KEYWORD_SOURCES, DecisionTable, RuleSet, active_rules
+from agents.technical_analyzer import TechnicalAnalyzerAgent
+from evaluation.evaluator import MetricsAccumulator, ticket_labels
+from pipeline.processing import error_output
+
+INDEX_VERSION = 2
+
+
+class Reanalysis(NamedTuple):
+    """
+    Result of `AnalysisIndex.reanalyze`: the positions of the reprocessed
+    tickets in the corpus and their new final outputs, in the same order.
+    """
+    positions: List[int]
+    outputs: List[AgentOutput]
+
+
+class AnalysisIndex:
+    """
+    Persisted per-ticket index of the rule features of a ticket corpus, for
+    re-analyzing only the tickets a rule change affects.
+
+    For each ticket the index records which rule keywords occur in each
+    keyword source (see `agents.rules.KEYWORD_SOURCES`) and the condition
+    fields the rules test. That is everything a decision table reads, so the
+    decision for every ticket under any ruleset can be computed from the index
+    alone, a few array operations per keyword group instead of a text scan per
+    ticket. Only keywords the index has not seen yet require a pass over the text.
+    """
+    def __init__(self, rules: RuleSet):
+        self.rules = rules
+        self.ticket_ids: List[Optional[str]] = []
+        self.valid = np.zeros(0, dtype=bool)
+        self.labels: Dict[int, Dict[str, str]] = {}
+        self.metrics = MetricsAccumulator()
+        self.keywords: Dict[str, List[str]] = {source: [] for source in KEYWORD_SOURCES}
+        # Keyword hits per source as CSR arrays: ids[ptr[i]:ptr[i + 1]] are the keywords of ticket i
+        self._hits: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Condition field columns; text fields hold codes into `_vocabularies` (-1 for invalid tickets)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._vocabularies: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ticket_ids)
+
+    @classmethod
+    def build(cls, tickets: Iterable, rules: Optional[RuleSet] = None) -> "AnalysisIndex":
+        """
+        Analyzes a corpus once and indexes its rule features.
+
+        Args:
+            tickets (Iterable): Raw ticket dictionaries (optionally labeled, see
+                                `evaluation.evaluator.LABEL_FIELDS`) or validated
+                                tickets, e.g. a `pipeline.ticket_store.TicketStore`.
+            rules (RuleSet, optional): Rules to analyze with; the active ruleset if omitted.
+
+        Returns:
+            AnalysisIndex: The index, with the metrics of the analysis.
+        """
+        index = cls(rules or active_rules())
+        index.keywords = rule_keywords(index.rules)
+        matchers = {
+            source: (KEYWORD_SOURCES[source], KeywordMatcher([(keyword, (keyword,)) for keyword in keywords]))
+            for source, keywords in index.keywords.items()
+        }
+        keyword_ids = {source: _ids(keywords) for source, keywords in index.keywords.items()}
+        hits = {source: (array("q", [0]), array("i")) for source in KEYWORD_SOURCES}
+        columns = ConditionColumns()
+        agents = _agents(index.rules)
+
+        tickets, labeled = tee(tickets)
+        for position, (ticket_data, labels) in enumerate(zip(tickets, map(ticket_labels, labeled))):
+            if labels:
+                index.labels[position] = labels
+            try:
+                ticket = ticket_data if isinstance(ticket_data, VALIDATED_TICKET_TYPES) else Ticket(**ticket_data)
+            except Exception as e:
+                index.ticket_ids.append(ticket_data.get("ticket_id") if isinstance(ticket_data, dict) else None)
+                index.metrics.add(None, None, None, error_output(e), labels)
+                columns.append(None)
+                for source, (ptr, _) in hits.items():
+                    ptr.append(ptr[-1])
+                continue
+
+            index.ticket_ids.append(ticket.ticket_id)
+            columns.append(ticket)
+            for source, (tokens_of, matcher) in matchers.items():
+                ptr, ids = hits[source]
+                ids.extend(sorted(keyword_ids[source][keyword] for keyword in matcher.match(tokens_of(ticket))))
+                ptr.append(len(ids))
+            analysis = analyze_record(ticket, *agents).to_analysis(ticket)
+            index.metrics.add(ticket, analysis.technical, analysis.customer, analysis.final, labels)
+
+        index._hits = {
+            source: (np.frombuffer(ptr, dtype=np.int64).copy(), np.frombuffer(ids, dtype=np.int32).copy())
+            for source, (ptr, ids) in hits.items()
+        }
+        index.valid, index._columns, index._vocabularies = columns.finish()
+        return index
+
+    def affected(self, rules: RuleSet, tickets: Optional[Iterable] = None) -> np.ndarray:
+        """
+        Returns the positions of the tickets whose agent outputs or final
+        decision differ between the indexed rules and `rules`.
+
+        Args:
+            rules (RuleSet): The changed rules.
+            tickets (Iterable, optional): The indexed corpus, in index order. Only
+                                          needed if `rules` use keywords the
+                                          index has not seen yet; they are
+                                          scanned for and added to the index.
+
+        Raises:
+            ValueError: If `rules` use new keywords and `tickets` is not given.
+        """
+        self._index_keywords(rules, tickets)
+        decisions: Dict[Tuple, int] = {}
+        old = self._decision_codes(self.rules, decisions)
+        new = self._decision_codes(rules, decisions)
+        return np.flatnonzero(self.valid & (old != new))
+
+    def reanalyze(self, rules: RuleSet, tickets: Sequence) -> Reanalysis:
+        """
+        Switches the index to `rules`, reprocessing only the affected tickets
+        (see `affected`) and updating the metrics by their old and new outputs.
+
+        Args:
+            rules (RuleSet): The changed rules.
+            tickets (Sequence): The indexed corpus with random access by
+                                position, e.g. a `TicketStore` or a list of
+                                raw ticket dictionaries.
+
+        Returns:
+            Reanalysis: The reprocessed positions and their new final outputs.
+
+        Raises:
+            ValueError: If `tickets` does not match the indexed corpus.
+        """
+        positions = self.affected(rules, tickets).tolist()
+        old_agents, new_agents = _agents(self.rules), _agents(rules)
+        removed, added = MetricsAccumulator(), MetricsAccumulator()
+        outputs = []
+        for position in positions:
+            ticket = tickets[position]
+            if not isinstance(ticket, VALIDATED_TICKET_TYPES):
+                ticket = Ticket(**ticket)
+            if ticket.ticket_id != self.ticket_ids[position]:
+                raise ValueError(f"Ticket {ticket.ticket_id} at position {position} is not the indexed ticket")
+            labels = self.labels.get(position)
+            old_analysis = _analysis(ticket, *old_agents)
+            removed.add(ticket, old_analysis.technical, old_analysis.customer, old_analysis.final, labels)
+            new_analysis = analyze_record(ticket, *new_agents).to_analysis(ticket)
+            added.add(ticket, new_analysis.technical, new_analysis.customer, new_analysis.final, labels)
+            outputs.append(new_analysis.final)
+        self.metrics.subtract(removed).merge(added)
+        self.rules = rules
+        return Reanalysis(positions, outputs)
+
+    def outcomes(self) -> List[Optional[Tuple[str, str, str]]]:
+        """
+        Returns the current final (category, priority, recommended_team) of
+        every ticket from the index alone, None for tickets that failed validation.
+        """
+        finals, inverse = final_outcomes(self.rules, self._feature_keys)
+        return [finals[code] if valid else None for code, valid in zip(inverse.tolist(), self.valid.tolist())]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to a directory (see `load`).
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {"valid": self.valid}
+        for source, (ptr, ids) in self._hits.items():
+            arrays[f"{source}.ptr"] = ptr
+            arrays[f"{source}.ids"] = ids
+        for field, column in self._columns.items():
+            arrays[f"column.{field}"] = column
+        np.savez(os.path.join(path, "features.npz"), **arrays)
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as meta_file:
+            json.dump({
+                "version": INDEX_VERSION,
+                "rules": self.rules.spec,
+                "ticket_ids": self.ticket_ids,
+                "labels": {str(position): labels for position, labels in self.labels.items()},
+                "keywords": self.keywords,
+                "vocabularies": self._vocabularies,
+                "metrics": self.metrics.to_dict(),
+            }, meta_file)
+
+    @classmethod
+    def load(cls, path: str) -> "AnalysisIndex":
+        """
+        Reads an index written by `save`.
+        """
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported analysis index version: {meta.get('version')}")
+        index = cls(RuleSet(meta["rules"]))
+        index.ticket_ids = meta["ticket_ids"]
+        index.labels = {int(position): labels for position, labels in meta["labels"].items()}
+        index.keywords = meta["keywords"]
+        index._vocabularies = meta["vocabularies"]
+        index.metrics = MetricsAccumulator.from_dict(meta["metrics"])
+        with np.load(os.path.join(path, "features.npz")) as arrays:
+            index.valid = arrays["valid"]
+            index._hits = {source: (arrays[f"{source}.ptr"], arrays[f"{source}.ids"]) for source in index.keywords}
+            index._columns = {field: arrays[f"column.{field}"] for field in CONDITION_FIELDS}
+        return index
+
+    def _index_keywords(self, rules: RuleSet, tickets: Optional[Iterable]) -> None:
+        # Scans the corpus for keywords of `rules` that are not indexed yet.
+        missing = {
+            source: [keyword for keyword in keywords if keyword not in self.keywords[source]]
+            for source, keywords in rule_keywords(rules).items()
+        }
+        missing = {source: keywords for source, keywords in missing.items() if keywords}
+        if not missing:
+            return
+        if tickets is None:
+            raise ValueError(f"The rules use keywords the index has not seen yet; pass the tickets to scan for them: {missing}")
+
+        matchers = {
+            source: (KEYWORD_SOURCES[source], KeywordMatcher([(keyword, (keyword,)) for keyword in keywords]))
+            for source, keywords in missing.items()
+        }
+        new_ids = {source: _ids(keywords, len(self.keywords[source])) for source, keywords in missing.items()}
+        owners = {source: array("q") for source in missing}
+        ids = {source: array("i") for source in missing}
+        count = 0
+        for position, (ticket_data, valid) in enumerate(zip(tickets, self.valid.tolist())):
+            count += 1
+            if not valid:
+                continue
+            ticket = ticket_data if isinstance(ticket_data, VALIDATED_TICKET_TYPES) else Ticket(**ticket_data)
+            for source, (tokens_of, matcher) in matchers.items():
+                for keyword in matcher.match(tokens_of(ticket)):
+                    owners[source].append(position)
+                    ids[source].append(new_ids[source][keyword])
+        if count != len(self):
+            raise ValueError(f"The index holds {len(self)} tickets, but {count} were given")
+
+        for source in missing:
+            ptr, old_ids = self._hits[source]
+            all_owners = np.concatenate([np.repeat(np.arange(len(self)), np.diff(ptr)), np.frombuffer(owners[source], dtype=np.int64)])
+            all_ids = np.concatenate([old_ids, np.frombuffer(ids[source], dtype=np.int32)])
+            order = np.argsort(all_owners, kind="stable")
+            counts = np.bincount(all_owners, minlength=len(self))
+            self._hits[source] = (np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), all_ids[order])
+            self.keywords[source] = self.keywords[source] + missing[source]
+
+    def _decision_codes(self, rules: RuleSet, decisions: Dict[Tuple, int]) -> np.ndarray:
+        # Codes each ticket's (technical entry, customer entry, final decision);
+        # equal codes mean identical outputs. `decisions` is shared between rulesets.
+        pairs, inverse = _unique_pairs(self._feature_keys(rules.technical), self._feature_keys(rules.customer))
+        codes = []
+        for tech_key, cust_key in pairs:
+            technical, customer = rules.technical.entry(tech_key), rules.customer.entry(cust_key)
+            decision = (
+                DecisionTable.signature(technical),
+                DecisionTable.signature(customer),
+                rules.routing.resolve_outcomes(technical[:3], customer[:3])
+            )
+            codes.append(decisions.setdefault(decision, len(decisions)))
+        return np.asarray(codes, dtype=np.int64)[inverse]
+
+    def _feature_keys(self, table: DecisionTable) -> np.ndarray:
+        count = len(self)
+        owners = {source: np.repeat(np.arange(count), np.diff(ptr)) for source, (ptr, _) in self._hits.items()}
+
+        def keyword_matches(source: str, keywords: Tuple[str, ...]) -> np.ndarray:
+            ptr, ids = self._hits[source]
+            keyword_ids = _ids(self.keywords[source])
+            matched = np.zeros(count, dtype=bool)
+            matched[owners[source][np.isin(ids, [keyword_ids[keyword] for keyword in keywords])]] = True
+            return matched
+
+        return feature_keys(table, count, keyword_matches, self._columns, self._vocabularies)
+
+
+class ConditionColumns:
+    """
+    Collects the condition fields the rules test (see `agents.rules.CONDITION_FIELDS`)
+    as columns, one ticket at a time. Text fields are stored as codes into a vocabulary.
+    """
+    def __init__(self):
+        self._valid = array("b")
+        self._values: Dict[str, List] = {field: [] for field in CONDITION_FIELDS}
+        self._vocabularies: Dict[str, Dict[str, int]] = {field: {} for field in CONDITION_FIELDS if _is_text_field(field)}
+
+    def append(self, ticket: Optional[Ticket]) -> None:
+        """
+        Adds a ticket's fields, or a placeholder for a ticket that failed validation (None).
+        """
+        self._valid.append(ticket is not None)
+        vocabularies = self._vocabularies
+        for field, values in self._values.items():
+            if ticket is None:
+                values.append(-1 if field in vocabularies else 0)
+            elif field in vocabularies:
+                values.append(vocabularies[field].setdefault(getattr(ticket, field), len(vocabularies[field])))
+            else:
+                values.append(getattr(ticket, field))
+
+    def finish(self) -> Tuple[np.ndarray, Dict[str, np.ndarray], Dict[str, List[str]]]:
+        """
+        Returns (valid mask, columns, vocabularies of the text fields).
+        """
+        columns = {}
+        for field, values in self._values.items():
+            if field in self._vocabularies:
+                columns[field] = np.asarray(values, dtype=np.int32)
+            else:
+                columns[field] = np.asarray(values, dtype=np.float64 if _is_float_field(field) else np.int64)
+        valid = np.frombuffer(self._valid, dtype=np.int8).astype(bool)
+        return valid, columns, {field: list(vocabulary) for field, vocabulary in self._vocabularies.items()}
+
+
+def feature_keys(
+    table: DecisionTable,
+    count: int,
+    keyword_matches: Callable[[str, Tuple[str, ...]], np.ndarray],
+    columns: Dict[str, np.ndarray],
+    vocabularies: Dict[str, List[str]]
+) -> np.ndarray:
+    """
+    Vectorized equivalent of the key computation in `DecisionTable.lookup`
+    for `count` tickets described by precomputed features.
+
+    Args:
+        table (DecisionTable): The table to compute keys for.
+        count (int): Number of tickets.
+        keyword_matches (Callable): Returns, for a keyword source and a keyword
+                                    group, a boolean array of the tickets
+                                    containing any keyword of the group.
+        columns (Dict[str, np.ndarray]): Condition field columns (see `ConditionColumns`).
+        vocabularies (Dict[str, List[str]]): Vocabularies of the text columns.
+
+    Returns:
+        np.ndarray: The feature key of every ticket.
+    """
+    if table.feature_space_size >= 1 << 63:
+        raise ValueError("The rules have too many features to index")
+    keyword_groups, categorical_encoders, band_encoders = table.feature_encoders()
+    keys = np.zeros(count, dtype=np.int64)
+    for source, groups in keyword_groups.items():
+        for bit, keywords in groups:
+            keys[keyword_matches(source, keywords)] += bit
+    for field, codes, scale in categorical_encoders:
+        if field in vocabularies:
+            values, inverse = vocabularies[field], columns[field]
+        else:
+            values, inverse = np.unique(columns[field], return_inverse=True)
+            values, inverse = values.tolist(), inverse.reshape(-1)
+        # A trailing 0 serves the -1 codes of invalid tickets
+        keys += np.asarray([codes.get(value, 0) for value in values] + [0], dtype=np.int64)[inverse] * scale
+    for field, thresholds, scale in band_encoders:
+        column = columns[field]
+        bands = np.searchsorted(np.asarray(thresholds, dtype=np.float64), column, side="right")
+        if column.dtype.kind == "f":
+            bands[np.isnan(column)] = 0  # NaN reaches no threshold
+        keys += bands.astype(np.int64) * scale
+    return keys
+
+
+def final_outcomes(
+    rules: RuleSet,
+    keys_of: Callable[[DecisionTable], np.ndarray]
+) -> Tuple[List[Tuple[str, str, str]], np.ndarray]:
+    """
+    Resolves the final decisions of a corpus from its feature keys.
+
+    Args:
+        rules (RuleSet): The rules to decide with.
+        keys_of (Callable): Returns the feature keys of every ticket for a decision table.
+
+    Returns:
+        Tuple: The distinct final (category, priority, recommended_team)
+               outcomes and, for every ticket, the index of its outcome.
+    """
+    pairs, inverse = _unique_pairs(keys_of(rules.technical), keys_of(rules.customer))
+    finals = [
+        rules.routing.resolve_outcomes(rules.technical.entry(tech_key)[:3], rules.customer.entry(cust_key)[:3])
+        for tech_key, cust_key in pairs
+    ]
+    return finals, inverse
+
+
+def rule_keywords(rules: RuleSet) -> Dict[str, List[str]]:
+    """
+    Returns every keyword the rules of both agents test, per keyword source, in rule order.
+    """
+    keywords: Dict[str, List[str]] = {source: [] for source in KEYWORD_SOURCES}
+    for table in (rules.technical, rules.customer):
+        for source, groups in table.feature_encoders()[0].items():
+            for _, group_keywords in groups:
+                keywords[source].extend(keyword for keyword in group_keywords if keyword not in keywords[source])
+    return keywords
+
+
+def _agents(rules: RuleSet) -> Tuple[TechnicalAnalyzerAgent, CustomerContextAgent, Orchestrator]:
+    return TechnicalAnalyzerAgent(rules), CustomerContextAgent(rules), Orchestrator(rules)
+
+
+def _analysis(
+    ticket: Ticket,
+    technical_agent: TechnicalAnalyzerAgent,
+    customer_agent: CustomerContextAgent,
+    orchestrator: Orchestrator
+) -> TicketAnalysis:
+    """
+    Same as `analyze_record(...).to_analysis(ticket)` without logging the decision,
+    for recomputing outputs that were already reported.
+    """
+    technical, technical_args = technical_agent.lookup(ticket)
+    customer, customer_args = customer_agent.lookup(ticket)
+    final = orchestrator.resolve_outcomes(technical[:3], customer[:3])
+    return AnalysisRecord(ticket.ticket_id, final, technical, customer, technical_args, customer_args).to_analysis(ticket)
+
+
+def _unique_pairs(tech_keys: np.ndarray, cust_keys: np.ndarray) -> Tuple[List[Tuple[int, int]], np.ndarray]:
+    if not len(tech_keys):
+        return [], np.zeros(0, dtype=np.int64)
+    pairs, inverse = np.unique(np.stack([tech_keys, cust_keys], axis=1), axis=0, return_inverse=True)
+    return [tuple(pair) for pair in pairs.tolist()], inverse.reshape(-1)
+
+
+def _ids(keywords: List[str], start: int = 0) -> Dict[str, int]:
+    return {keyword: i for i, keyword in enumerate(keywords, start)}
+
+
+def _is_text_field(field: str) -> bool:
+    return Ticket.model_fields[field].annotation is str
+
+
+def _is_float_field(field: str) -> bool:
+    return Ticket.model_fields[field].annotation is float
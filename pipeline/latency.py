@@ -0,0 +1,224 @@
+import json
+import math
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
+from agents.base_agent import set_analysis_hook
+
+# Upper bounds (seconds) of the histogram buckets: 1-2-5 steps from 1 µs to
+# 10 s, plus an overflow bucket. Fixed bounds keep `observe` to one bisect and
+# let histograms from different processes or runs be added up.
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(
+    round(mantissa * 10.0 ** exponent, 12) for exponent in range(-6, 2) for mantissa in (1, 2, 5)
+)[:-2]
+
+# Recorder that the pipeline reports stage latencies to, or None when
+# latency tracking is off. Instrumented call sites read it once per call, so
+# tracking costs a single global lookup while disabled.
+recorder: Optional["LatencyRecorder"] = None
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket histogram of durations in seconds.
+    """
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Adds the observations of another histogram to this one.
+        """
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the `q` quantile (0 <= q <= 1) by interpolating linearly
+        within the bucket that contains it, the way Prometheus'
+        `histogram_quantile` does. Returns NaN for an empty histogram.
+        """
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = BUCKET_BOUNDS[i - 1] if i else 0.0
+                upper = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / bucket_count, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def snapshot(self) -> Dict:
+        """
+        Returns the histogram as a JSON-serializable dictionary, with
+        cumulative bucket counts keyed by upper bound.
+        """
+        cumulative, buckets = 0, []
+        for bound, bucket_count in zip(BUCKET_BOUNDS + (math.inf,), self.counts):
+            cumulative += bucket_count
+            buckets.append(["+Inf" if bound == math.inf else bound, cumulative])
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "max": self.max,
+            "p50": _finite(self.quantile(0.5)),
+            "p90": _finite(self.quantile(0.9)),
+            "p99": _finite(self.quantile(0.99)),
+            "buckets": buckets,
+        }
+
+
+class LatencyRecorder:
+    """
+    Per-stage latency histograms.
+
+    Stages are created on first use. Recording is locked, so stages can be
+    timed from several threads at once, e.g. the executor threads of
+    `pipeline.service.TicketService`. Recorders can be pickled, to send the
+    observations of a worker process back to the parent (see `drain`).
+    """
+    def __init__(self):
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        with self._lock:
+            return {"stages": self.stages}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.stages = state["stages"]
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Records one duration of `stage`.
+        """
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """
+        Times the body of a `with` block as one observation of `stage`.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, perf_counter() - start)
+
+    def merge(self, other: "LatencyRecorder") -> None:
+        """
+        Adds the observations of another recorder, e.g. one per worker process, to this one.
+        """
+        with other._lock:
+            stages = list(other.stages.items())
+        with self._lock:
+            for stage, histogram in stages:
+                self.stages.setdefault(stage, LatencyHistogram()).merge(histogram)
+
+    def drain(self) -> "LatencyRecorder":
+        """
+        Moves the observations so far into a new recorder and returns it,
+        leaving this one empty.
+        """
+        drained = LatencyRecorder()
+        with self._lock:
+            drained.stages, self.stages = self.stages, {}
+        return drained
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Returns every stage's histogram (see `LatencyHistogram.snapshot`), by stage name.
+        """
+        with self._lock:
+            return {stage: histogram.snapshot() for stage, histogram in sorted(self.stages.items())}
+
+    def to_prometheus(self, metric: str = "ticket_analyzer_stage_seconds") -> str:
+        """
+        Renders the histograms in the Prometheus text exposition format, as
+        one histogram metric labelled by stage.
+        """
+        lines = [
+            f"# HELP {metric} Time spent in each ticket processing stage.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.stages.items()):
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKET_BOUNDS + (math.inf,), histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f'{metric}_bucket{{stage="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{label}"}} {histogram.sum!r}')
+                lines.append(f'{metric}_count{{stage="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Writes the histograms to `path`: in Prometheus text format for a
+        ".prom" file, as a JSON snapshot otherwise.
+        """
+        with open(path, "w", encoding="utf-8") as report:
+            if path.endswith(".prom"):
+                report.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), report, indent=2)
+
+
+def enable_latency_tracking(latency_recorder: Optional[LatencyRecorder] = None) -> LatencyRecorder:
+    """
+    Starts recording stage latencies: validation, every agent's `analyze`
+    (through the `BaseAgent` analysis hook), the orchestration merge and
+    output serialization.
+
+    Args:
+        latency_recorder (LatencyRecorder, optional): Recorder to report to; a new one if omitted.
+
+    Returns:
+        LatencyRecorder: The recorder in use.
+    """
+    global recorder
+    recorder = latency_recorder or LatencyRecorder()
+    set_analysis_hook(recorder.observe)
+    return recorder
+
+
+def disable_latency_tracking() -> None:
+    """
+    Stops recording stage latencies. The last recorder keeps its data.
+    """
+    global recorder
+    recorder = None
+    set_analysis_hook(None)
+
+
+def _finite(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
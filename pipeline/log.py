@@ -0,0 +1,63 @@
+import json
+import logging
+from typing import Optional
+
+# Shared logger for the ticket analyzer. Per-ticket messages are logged at
+# DEBUG (agent analyses) and INFO (final decision) with lazy %-style arguments,
+# so a disabled level costs a single level check per call site.
+logger = logging.getLogger("ticket_analyzer")
+
+VERBOSITY_LEVELS = {
+    "silent": logging.CRITICAL + 1,
+    "summary": logging.INFO,
+    "debug": logging.DEBUG,
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each log record as a single JSON object, including any structured
+    fields passed through `extra={"fields": {...}}`.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(verbosity: str = "summary", debug_sink: Optional[str] = None) -> None:
+    """
+    Configures the ticket analyzer logger.
+
+    Args:
+        verbosity (str): "silent" (no output), "summary" (one line
+                         per ticket plus warnings) or "debug" (per-agent detail).
+        debug_sink (str, optional): File that receives every DEBUG-and-above record
+                                    as JSON lines, independently of `verbosity`.
+    """
+    if verbosity not in VERBOSITY_LEVELS:
+        raise ValueError(f"Unknown verbosity '{verbosity}', expected one of {list(VERBOSITY_LEVELS)}")
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    console = logging.StreamHandler()
+    console.setLevel(VERBOSITY_LEVELS[verbosity])
+    console.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(console)
+    level = VERBOSITY_LEVELS[verbosity]
+
+    if debug_sink:
+        sink = logging.FileHandler(debug_sink, encoding="utf-8")
+        sink.setLevel(logging.DEBUG)
+        sink.setFormatter(JsonFormatter())
+        logger.addHandler(sink)
+        level = logging.DEBUG
+
+    logger.setLevel(level)
+    logger.propagate = False
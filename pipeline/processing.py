@@ -0,0 +1,574 @@
+import logging
+import os
+from collections import deque
+from functools import lru_cache, partial
+from itertools import islice, tee
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from pydantic import TypeAdapter
+from agents.base_agent import BaseAgent, Ticket, AgentOutput, TicketAnalysis
+from agents.orchestrator import Orchestrator
+from agents.records import VALIDATED_TICKET_TYPES, AnalysisRecord, analyze_record
+from agents.registry import create_agent, register_agent, registered_agents, registry_version
+from agents.rules import RuleDrivenAgent, RuleSet, activate_rules, active_rules
+from pipeline import latency
+from pipeline.cache import ResultCache, ticket_cache_key
+from pipeline.log import logger
+
+# Validates a whole chunk of raw tickets in one call on the batch path.
+_ticket_list_adapter = TypeAdapter(List[Ticket])
+
+# Stateless and follows the active ruleset, so one instance serves every caller
+_orchestrator = Orchestrator()
+
+def process_ticket(
+    ticket_data: Union[dict, Ticket],
+    cache: Optional[ResultCache] = None,
+    trusted: bool = False,
+    short_circuit: bool = False
+) -> AgentOutput:
+    """
+    Processes a single support ticket using multiple specialized agents
+    and an orchestration layer to determine final routing.
+
+    Args:
+        ticket_data (Union[dict, Ticket]): A dictionary containing raw ticket
+                                           information, or an already validated ticket.
+        cache (ResultCache, optional): Returns a cached output for tickets with
+                                       identical content instead of recomputing it.
+        trusted (bool): Skips validating `ticket_data` (see `Ticket.trusted`). Only
+                        for tickets from sources that are already typed, e.g. our own queue.
+        short_circuit (bool): Runs the agents cheapest first and skips the second
+                              one when the first already decides the ticket (see
+                              `Orchestrator.run_agents`). Skipped agents show as
+                              "Not analyzed" in the reasoning.
+
+    Returns:
+        AgentOutput: The final aggregated analysis and routing decision.
+    """
+    return process_ticket_detailed(ticket_data, cache, trusted, short_circuit).final
+
+
+def process_ticket_detailed(
+    ticket_data: Union[dict, Ticket],
+    cache: Optional[ResultCache] = None,
+    trusted: bool = False,
+    short_circuit: bool = False
+) -> TicketAnalysis:
+    """
+    Same as `process_ticket`, but also returns the validated ticket and each
+    agent's intermediate output alongside the final decision.
+
+    Args:
+        ticket_data (Union[dict, Ticket]): A dictionary containing raw ticket
+                                           information, or an already validated ticket.
+        cache (ResultCache, optional): Returns a cached output for tickets with
+                                       identical content instead of recomputing it.
+        trusted (bool): Skips validating `ticket_data` (see `Ticket.trusted`).
+        short_circuit (bool): Skips an agent whose analysis cannot change the
+                              decision; its output is then None (see `process_ticket`).
+
+    Returns:
+        TicketAnalysis: The ticket, the agents' outputs and the final decision.
+    """
+    if isinstance(ticket_data, VALIDATED_TICKET_TYPES):
+        ticket = ticket_data
+    else:
+        recorder = latency.recorder
+        start = perf_counter() if recorder is not None else 0.0
+        try:
+            # Validate and parse the input ticket data using Pydantic model
+            ticket = Ticket.trusted(ticket_data) if trusted else Ticket(**ticket_data)
+        except Exception as e:
+            return TicketAnalysis(None, None, None, error_output(e))
+        finally:
+            if recorder is not None:
+                recorder.observe("validation", perf_counter() - start)
+
+    # Reuse the shared specialized agents; they hold no per-ticket state
+    technical_agent, customer_agent = default_agents()
+
+    return _analyze_ticket(ticket, technical_agent, customer_agent, cache, short_circuit)
+
+
+def process_tickets(
+    tickets: Iterable[Dict],
+    chunk_size: int = 1000,
+    technical_agent: Optional[BaseAgent] = None,
+    customer_agent: Optional[BaseAgent] = None,
+    cache: Optional[ResultCache] = None,
+    trusted: bool = False,
+    short_circuit: bool = False
+) -> Iterator[AgentOutput]:
+    """
+    Processes a stream of support tickets, reusing one set of agents and
+    validating tickets a chunk at a time.
+
+    Outputs are yielded lazily and in input order. A ticket that fails
+    validation yields the same "Error"/"System Admin" output as
+    `process_ticket` without affecting the rest of its chunk.
+
+    Args:
+        tickets (Iterable[Dict]): Raw ticket dictionaries.
+        chunk_size (int): Number of tickets validated per bulk validation call.
+        technical_agent (BaseAgent, optional): Agent to reuse; the shared "technical" agent (see `agents.registry`) if omitted.
+        customer_agent (BaseAgent, optional): Agent to reuse; the shared "customer" agent if omitted.
+        cache (ResultCache, optional): Returns a cached output for tickets with
+                                       identical content instead of recomputing it.
+        trusted (bool): Skips validating the tickets (see `Ticket.trusted`). `Ticket`
+                        instances in `tickets` are never validated again.
+        short_circuit (bool): Runs the agents cheapest first and skips the second
+                              one when the first already decides the ticket (see
+                              `Orchestrator.run_agents`). Skipped agents show as
+                              "Not analyzed" in the reasoning.
+
+    Yields:
+        AgentOutput: The final analysis for each ticket, in input order.
+    """
+    for analysis in process_tickets_detailed(tickets, chunk_size, technical_agent, customer_agent, cache, trusted, short_circuit):
+        yield analysis.final
+
+
+def process_tickets_detailed(
+    tickets: Iterable[Dict],
+    chunk_size: int = 1000,
+    technical_agent: Optional[BaseAgent] = None,
+    customer_agent: Optional[BaseAgent] = None,
+    cache: Optional[ResultCache] = None,
+    trusted: bool = False,
+    short_circuit: bool = False
+) -> Iterator[TicketAnalysis]:
+    """
+    Same as `process_tickets`, but yields a `TicketAnalysis` per ticket with the
+    agents' intermediate outputs alongside the final decision.
+    """
+    default_technical_agent, default_customer_agent = default_agents()
+    technical_agent = technical_agent or default_technical_agent
+    customer_agent = customer_agent or default_customer_agent
+
+    tickets = iter(tickets)
+    while True:
+        chunk = list(islice(tickets, chunk_size))
+        if not chunk:
+            break
+        for ticket in validate_chunk(chunk, trusted):
+            if isinstance(ticket, VALIDATED_TICKET_TYPES):
+                yield _analyze_ticket(ticket, technical_agent, customer_agent, cache, short_circuit)
+            else:
+                yield TicketAnalysis(None, None, None, error_output(ticket))
+
+
+def process_tickets_compact(
+    tickets: Iterable[Dict],
+    chunk_size: int = 1000,
+    technical_agent: Optional[RuleDrivenAgent] = None,
+    customer_agent: Optional[RuleDrivenAgent] = None,
+    trusted: bool = False
+) -> Iterator[AnalysisRecord]:
+    """
+    Bulk counterpart of `process_tickets` for holding many results in memory.
+
+    Yields a slotted `AnalysisRecord` per ticket that references the shared
+    decision table entries instead of building Pydantic outputs; convert with
+    `record.to_output()` or `record.to_analysis()` where a model is needed.
+    Validated tickets are released after each chunk.
+
+    Args:
+        tickets (Iterable[Dict]): Raw ticket dictionaries.
+        chunk_size (int): Number of tickets validated per bulk validation call.
+        technical_agent (RuleDrivenAgent, optional): Rule-driven agent to reuse; the shared one if omitted.
+        customer_agent (RuleDrivenAgent, optional): Rule-driven agent to reuse; the shared one if omitted.
+        trusted (bool): Skips validating the tickets (see `Ticket.trusted`).
+
+    Yields:
+        AnalysisRecord: The compact analysis for each ticket, in input order.
+    """
+    default_technical_agent, default_customer_agent = default_agents()
+    technical_agent = technical_agent or default_technical_agent
+    customer_agent = customer_agent or default_customer_agent
+
+    tickets = iter(tickets)
+    while True:
+        chunk = list(islice(tickets, chunk_size))
+        if not chunk:
+            break
+        for ticket_data, ticket in zip(chunk, validate_chunk(chunk, trusted)):
+            if isinstance(ticket, VALIDATED_TICKET_TYPES):
+                yield analyze_record(ticket, technical_agent, customer_agent, _orchestrator)
+            else:
+                ticket_id = ticket_data.get("ticket_id") if isinstance(ticket_data, dict) else None
+                yield AnalysisRecord.from_error(ticket_id, error_output(ticket))
+
+
+def process_tickets_parallel(
+    tickets: Iterable[Dict],
+    workers: Optional[int] = None,
+    chunk_size: int = 1000,
+    short_circuit: bool = False
+) -> Iterator[AgentOutput]:
+    """
+    Processes a stream of support tickets across a pool of worker processes.
+
+    Tickets are sharded into chunks of raw dictionaries and validated and
+    analyzed by the agents in a worker. Only plain tuples of the agent output
+    fields and their reasoning (reason codes with the agent's render function,
+    or the text) are sent back; the cheap merge step runs here.
+    Outputs are yielded in input order, and at most two chunks per worker are
+    in flight so memory stays bounded on long streams.
+
+    Args:
+        tickets (Iterable[Dict]): Raw ticket dictionaries.
+        workers (int, optional): Number of worker processes; defaults to the CPU count.
+        chunk_size (int): Number of tickets sent to a worker at a time.
+        short_circuit (bool): Skips an agent whose analysis cannot change the decision (see `process_tickets`).
+
+    Yields:
+        AgentOutput: The final analysis for each ticket, in input order.
+    """
+    tickets = iter(tickets)
+    chunks = iter(lambda: list(islice(tickets, chunk_size)), [])
+    return _process_parallel(partial(_process_chunk, short_circuit=short_circuit), chunks, workers)
+
+
+def process_store_parallel(
+    path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 1000,
+    short_circuit: bool = False
+) -> Iterator[AgentOutput]:
+    """
+    Same as `process_tickets_parallel` for a ticket store (see
+    `pipeline.ticket_store`). Workers are only sent index ranges; each maps
+    the store itself, so the corpus is neither parsed nor pickled and its
+    pages are shared between the processes.
+
+    Args:
+        path (str): Ticket store directory.
+        workers (int, optional): Number of worker processes; defaults to the CPU count.
+        chunk_size (int): Number of tickets per range sent to a worker.
+        short_circuit (bool): Skips an agent whose analysis cannot change the decision (see `process_tickets`).
+
+    Yields:
+        AgentOutput: The final analysis for each ticket, in store order.
+    """
+    from pipeline.ticket_store import TicketStore
+
+    ranges = TicketStore(path).ranges(chunk_size)
+    return _process_parallel(partial(_process_store_range, path, short_circuit=short_circuit), ranges, workers)
+
+
+def _process_parallel(
+    process_chunk: Callable[[object], List[Tuple]],
+    chunks: Iterator,
+    workers: Optional[int]
+) -> Iterator[AgentOutput]:
+    """
+    Runs `process_chunk` over `chunks` in a process pool and merges the
+    returned agent fields here, in order, with at most two chunks per worker in flight.
+    With latency tracking on, the workers time their stages too and each
+    chunk's histograms are merged into the recorder here.
+    """
+    # Imported here: starting a process pool pulls in multiprocessing, which single-process callers never need
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+    # Workers start with the rules active here (shipped as the declarative spec), the same agents and latency tracking
+    initargs = (active_rules(), registered_agents(), latency.recorder is not None)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as executor:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight.append(executor.submit(_run_chunk, process_chunk, chunk))
+            if not in_flight:
+                break
+            results, chunk_latencies = in_flight.popleft().result()
+            recorder = latency.recorder
+            if chunk_latencies is not None and recorder is not None:
+                recorder.merge(chunk_latencies)
+            for ticket_id, tech_fields, cust_fields in results:
+                if tech_fields is None and cust_fields is None:
+                    # Validation failed in the worker; `ticket_id` holds the error message
+                    yield error_output(ticket_id)
+                    continue
+                # An agent skipped by short-circuiting has no fields
+                yield _orchestrator.merge(ticket_id, _agent_output(tech_fields), _agent_output(cust_fields))
+
+
+def _run_chunk(process_chunk: Callable[[object], List[Tuple]], chunk) -> Tuple[List[Tuple], Optional[latency.LatencyRecorder]]:
+    """
+    Worker-side wrapper of `process_chunk` that also returns the stage
+    latencies recorded for the chunk, if the worker tracks them.
+    """
+    results = process_chunk(chunk)
+    recorder = latency.recorder
+    return results, recorder.drain() if recorder is not None else None
+
+
+def _process_chunk(chunk: List[Dict], trusted: bool = False, short_circuit: bool = False) -> List[Tuple]:
+    """
+    Worker-side entry point for `process_tickets_parallel`. Returns compact
+    (ticket_id, technical fields, customer fields) tuples instead of pickled
+    Pydantic models, or (error message, None, None) for invalid tickets.
+    """
+    technical_agent, customer_agent = default_agents()
+    results = []
+    for ticket in validate_chunk(chunk, trusted):
+        if not isinstance(ticket, VALIDATED_TICKET_TYPES):
+            results.append((str(ticket), None, None))
+            continue
+        tech_analysis, cust_analysis = _run_agents(ticket, technical_agent, customer_agent, short_circuit)
+        results.append((ticket.ticket_id, _agent_fields(tech_analysis), _agent_fields(cust_analysis)))
+    return results
+
+
+def _process_store_range(path: str, bounds: Tuple[int, int], short_circuit: bool = False) -> List[Tuple]:
+    """
+    Worker-side entry point for `process_store_parallel`.
+    """
+    return _process_chunk(list(_open_store(path).tickets(*bounds)), trusted=True, short_circuit=short_circuit)
+
+
+def _agent_fields(analysis: Optional[AgentOutput]) -> Optional[Tuple]:
+    """
+    Packs an agent output for the trip back from a worker; None for a skipped
+    agent. Reasoning travels as its `reasoning_source()`: reason codes with a
+    render function, which is pickled by its qualified name, or the text.
+    """
+    if analysis is None:
+        return None
+    source = analysis.reasoning_source()
+    if not isinstance(source, str) and "<" in getattr(source[0], "__qualname__", "<"):
+        # Lambdas and nested functions cannot be pickled by name, so send their text
+        source = analysis.reasoning
+    return analysis.category, analysis.priority, analysis.recommended_team, source
+
+
+def _agent_output(fields: Optional[Tuple]) -> Optional[AgentOutput]:
+    """
+    Unpacks the fields of `_agent_fields` into an output again. They were
+    produced by our own agents, so they are not validated again.
+    """
+    if fields is None:
+        return None
+    category, priority, recommended_team, source = fields
+    if isinstance(source, str):
+        return AgentOutput.model_construct(category=category, priority=priority, recommended_team=recommended_team, reasoning=source)
+    render_reasoning, reason_codes = source
+    return AgentOutput.deferred(category, priority, recommended_team, reason_codes, render_reasoning)
+
+
+@lru_cache(maxsize=None)
+def _open_store(path: str):
+    """
+    Maps a ticket store once per process.
+    """
+    from pipeline.ticket_store import TicketStore
+
+    return TicketStore(path)
+
+
+def init_worker(rules: RuleSet, agents: Dict, track_latency: bool = False) -> None:
+    """
+    Initializes a worker process with the parent's rules and registered agents,
+    e.g. as a `ProcessPoolExecutor` initializer with `(active_rules(), registered_agents())`.
+
+    Args:
+        rules (RuleSet): Rules to activate.
+        agents (Dict): Agents registered with `agents.registry.register_agent`, by role.
+        track_latency (bool): Also records stage latencies in the worker (see `pipeline.latency`).
+    """
+    activate_rules(rules)
+    for role, agent in agents.items():
+        register_agent(role, agent)
+    if track_latency:
+        latency.enable_latency_tracking()
+
+
+def default_agents() -> Tuple[BaseAgent, BaseAgent]:
+    """
+    Returns the shared "technical" and "customer" agents of the agent registry,
+    created once (and again after the registry changes).
+    """
+    return _create_agents(registry_version())
+
+
+@lru_cache(maxsize=1)
+def _create_agents(version: int) -> Tuple[BaseAgent, BaseAgent]:
+    # Agent classes are imported here, on first use
+    return create_agent("technical"), create_agent("customer")
+
+
+def validate_chunk(chunk: List[Dict], trusted: bool = False) -> List:
+    """
+    Validates a chunk of raw tickets in bulk. If any ticket in the chunk is
+    invalid, falls back to validating each one on its own so the error can be
+    attributed; invalid entries are returned as their exception. Validated
+    tickets (`Ticket` or `TicketRecord`) are passed through, and with
+    `trusted` dictionaries are only converted (see `Ticket.trusted`).
+    """
+    recorder = latency.recorder
+    if recorder is not None:
+        # Timed per chunk; with latency tracking off this is the only overhead
+        start = perf_counter()
+        validated = _validate_chunk_untimed(chunk, trusted)
+        recorder.observe("validation_chunk", perf_counter() - start)
+        return validated
+    return _validate_chunk_untimed(chunk, trusted)
+
+
+def _validate_chunk_untimed(chunk: List[Dict], trusted: bool) -> List:
+    """
+    Body of `validate_chunk`, without latency tracking.
+    """
+    if trusted:
+        validated = []
+        for ticket_data in chunk:
+            if isinstance(ticket_data, VALIDATED_TICKET_TYPES):
+                validated.append(ticket_data)
+                continue
+            try:
+                validated.append(Ticket.trusted(ticket_data))
+            except Exception as e:
+                validated.append(e)
+        return validated
+
+    try:
+        return _ticket_list_adapter.validate_python(chunk)
+    except Exception:
+        pass
+
+    validated = []
+    for ticket_data in chunk:
+        try:
+            validated.append(ticket_data if isinstance(ticket_data, VALIDATED_TICKET_TYPES) else Ticket(**ticket_data))
+        except Exception as e:
+            validated.append(e)
+    return validated
+
+
+def error_output(error: Exception) -> AgentOutput:
+    """
+    Builds the fallback output for a ticket that could not be parsed.
+    """
+    logger.warning("Error validating ticket input: %s", error)
+    # Return a default error output or raise the exception
+    return AgentOutput(
+        category="Error",
+        priority="Critical", # Mark as critical for immediate review
+        recommended_team="System Admin",
+        reasoning=f"Failed to parse ticket input: {error}"
+    )
+
+
+def _analyze_ticket(
+    ticket: Ticket,
+    technical_agent: BaseAgent,
+    customer_agent: BaseAgent,
+    cache: Optional[ResultCache] = None,
+    short_circuit: bool = False
+) -> TicketAnalysis:
+    """
+    Runs the specialized agents on a validated ticket and merges their analyses,
+    going through `cache` first if one is given.
+    """
+    if cache is not None:
+        # Short-circuited outputs differ in their reasoning, so they are cached apart
+        cache.bind_rules(technical_agent.rules_fingerprint() + customer_agent.rules_fingerprint() + ("+short-circuit" if short_circuit else ""))
+        key = ticket_cache_key(ticket)
+        cached_output = cache.get(key)
+        if cached_output is not None:
+            logger.debug("Cache hit for Ticket ID: %s", ticket.ticket_id)
+            _orchestrator.log_decision(ticket.ticket_id, cached_output.category, cached_output.priority, cached_output.recommended_team)
+            return TicketAnalysis(ticket, None, None, cached_output)
+
+    tech_analysis, cust_analysis = _run_agents(ticket, technical_agent, customer_agent, short_circuit)
+    final_output = _orchestrator.merge(ticket.ticket_id, tech_analysis, cust_analysis)
+    if cache is not None:
+        cache.put(key, final_output)
+    return TicketAnalysis(ticket, tech_analysis, cust_analysis, final_output)
+
+
+def _run_agents(
+    ticket: Ticket,
+    technical_agent: BaseAgent,
+    customer_agent: BaseAgent,
+    short_circuit: bool = False
+) -> Tuple[Optional[AgentOutput], Optional[AgentOutput]]:
+    """
+    Gets the technical and customer context analyses of a validated ticket.
+    With `short_circuit`, an agent that cannot change the decision is skipped
+    and its analysis is None.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Processing Ticket ID: %s", ticket.ticket_id)
+
+    # Get analyses from each agent
+    # We pass the full ticket object to each agent for their specialized analysis
+    if short_circuit:
+        tech_analysis, cust_analysis = _orchestrator.run_agents(ticket, technical_agent, customer_agent)
+    else:
+        tech_analysis = technical_agent.analyze(ticket)
+        cust_analysis = customer_agent.analyze(ticket)
+
+    if debug:
+        for name, analysis in (("Technical", tech_analysis), ("Customer", cust_analysis)):
+            if analysis is None:
+                logger.debug("  %s Agent skipped: the other analysis decides the ticket", name)
+                continue
+            logger.debug(
+                "  %s Agent Analysis: Category='%s', Priority='%s', Team='%s'",
+                name, analysis.category, analysis.priority, analysis.recommended_team,
+                extra={"fields": {"ticket_id": ticket.ticket_id, "agent": name.lower(), **analysis.model_dump()}}
+            )
+    return tech_analysis, cust_analysis
+
+
+def run_stream(
+    input_path: str,
+    output_path: str = "-",
+    input_format: Optional[str] = None,
+    workers: int = 1,
+    chunk_size: int = 1000,
+    short_circuit: bool = False
+) -> int:
+    """
+    Streams tickets from a JSONL/CSV file (or stdin) through the agents and
+    writes the outputs as JSONL (to a file or stdout) as they are produced.
+    Only a bounded number of tickets is held in memory at any time.
+
+    Args:
+        input_path (str): Ticket file, "-" for standard input, or a ticket store directory.
+        output_path (str): Result file, or "-" for standard output.
+        input_format (str, optional): "jsonl" or "csv"; inferred from the extension if omitted.
+        workers (int): Worker processes to use; 1 processes tickets in this process.
+        chunk_size (int): Number of tickets validated (and shipped to a worker) at a time.
+        short_circuit (bool): Skips an agent whose analysis cannot change the decision (see `process_tickets`).
+
+    Returns:
+        int: Number of tickets processed.
+    """
+    # Imported here: only file input needs the streaming helpers and the (NumPy-backed) ticket stores
+    from pipeline.streaming import read_tickets, write_results
+    from pipeline.ticket_store import is_ticket_store
+
+    if is_ticket_store(input_path):
+        store = _open_store(input_path)
+        if workers > 1:
+            results = process_store_parallel(input_path, workers=workers, chunk_size=chunk_size, short_circuit=short_circuit)
+        else:
+            results = process_tickets(store, chunk_size=chunk_size, trusted=True, short_circuit=short_circuit)
+        return write_results(results, output_path, store.ticket_ids())
+
+    tickets_for_ids, tickets = tee(read_tickets(input_path, input_format))
+    ticket_ids = (t.get("ticket_id") if isinstance(t, dict) else None for t in tickets_for_ids)
+    if workers > 1:
+        results = process_tickets_parallel(tickets, workers=workers, chunk_size=chunk_size, short_circuit=short_circuit)
+    else:
+        results = process_tickets(tickets, chunk_size=chunk_size, short_circuit=short_circuit)
+
+    return write_results(results, output_path, ticket_ids)
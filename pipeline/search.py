@@ -0,0 +1,267 @@
+import json
+import os
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from agents.base_agent import Ticket
+from agents.records import VALIDATED_TICKET_TYPES
+from agents.rules import OUTPUT_FIELDS, RuleSet, active_rules
+from agents.tokens import tokenize
+from pipeline.incremental import ConditionColumns, feature_keys, final_outcomes
+
+INDEX_VERSION = 2
+
+# Postings store (ticket, token position) pairs as ticket << 32 | position.
+_POSITION_BITS = 32
+
+
+class KeywordIndex:
+    """
+    Persisted inverted index of the subject and message text of a ticket corpus.
+
+    Every token (see `agents.tokens`) maps to a posting list of the tickets
+    (and token positions) containing it, so phrase queries combine a few
+    sorted arrays instead of scanning the text. Rule keywords match tokens the
+    same way, so together with the condition fields the rules test, which the
+    index also keeps, `preview` can compute the category, priority and team
+    distribution under any rules without analyzing a ticket.
+    """
+    def __init__(self, rules: RuleSet):
+        self.rules = rules
+        self.ticket_ids: List[Optional[str]] = []
+        self.valid = np.zeros(0, dtype=bool)
+        self.tokens: List[str] = []
+        self._token_ids: Dict[str, int] = {}
+        # Token postings as CSR arrays: entries[ptr[t]:ptr[t + 1]] are the encoded (ticket, position) pairs of token t
+        self._token_postings: Tuple[np.ndarray, np.ndarray] = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self._subject_lengths = np.zeros(0, dtype=np.int32)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._vocabularies: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ticket_ids)
+
+    @classmethod
+    def build(cls, tickets: Iterable, rules: Optional[RuleSet] = None) -> "KeywordIndex":
+        """
+        Indexes a ticket corpus.
+
+        Args:
+            tickets (Iterable): Raw ticket dictionaries or `Ticket` instances, e.g. a
+                                `pipeline.ticket_store.TicketStore`. Tickets that
+                                fail validation keep their position but are not indexed.
+            rules (RuleSet, optional): Rules `preview` compares with; the active ruleset if omitted.
+
+        Returns:
+            KeywordIndex: The index.
+        """
+        index = cls(rules or active_rules())
+        token_ids = index._token_ids
+        entry_tokens, entries = array("i"), array("q")
+        subject_lengths = array("i")
+        columns = ConditionColumns()
+
+        for position, ticket_data in enumerate(tickets):
+            try:
+                ticket = ticket_data if isinstance(ticket_data, VALIDATED_TICKET_TYPES) else Ticket(**ticket_data)
+            except Exception:
+                index.ticket_ids.append(ticket_data.get("ticket_id") if isinstance(ticket_data, dict) else None)
+                columns.append(None)
+                subject_lengths.append(0)
+                continue
+            index.ticket_ids.append(ticket.ticket_id)
+            columns.append(ticket)
+
+            subject_tokens = tokenize(ticket.subject)
+            subject_lengths.append(len(subject_tokens))
+            base = position << _POSITION_BITS
+            for offset, token in enumerate(subject_tokens + tokenize(ticket.message)):
+                entry_tokens.append(token_ids.setdefault(token, len(token_ids)))
+                entries.append(base | offset)
+
+        index.tokens = list(token_ids)
+        index._token_postings = _group(np.frombuffer(entry_tokens, dtype=np.int32), np.frombuffer(entries, dtype=np.int64), len(token_ids))
+        index._subject_lengths = np.frombuffer(subject_lengths, dtype=np.int32).copy()
+        index.valid, index._columns, index._vocabularies = columns.finish()
+        return index
+
+    def postings(self, phrase: str) -> np.ndarray:
+        """
+        Returns the sorted positions of the tickets whose subject or message
+        contains `phrase` as consecutive whole tokens (case-insensitive).
+        """
+        return self.keyword_postings(phrase)
+
+    def search(self, all_of: Sequence[str] = (), any_of: Sequence[str] = ()) -> List[Optional[str]]:
+        """
+        Returns the IDs of the tickets containing every phrase of `all_of` and,
+        if given, at least one phrase of `any_of`, in corpus order.
+
+        Args:
+            all_of (Sequence[str]): Phrases that must all occur (AND).
+            any_of (Sequence[str]): Phrases of which at least one must occur (OR).
+        """
+        return [self.ticket_ids[position] for position in self.query(all_of, any_of).tolist()]
+
+    def query(self, all_of: Sequence[str] = (), any_of: Sequence[str] = ()) -> np.ndarray:
+        """
+        Same as `search`, returning the ticket positions (e.g. for `preview`).
+        """
+        if not all_of and not any_of:
+            return np.flatnonzero(self.valid)
+        matched = None
+        for phrase in all_of:
+            postings = self.postings(phrase)
+            matched = postings if matched is None else np.intersect1d(matched, postings, assume_unique=True)
+        if any_of:
+            postings = np.unique(np.concatenate([self.postings(phrase) for phrase in any_of]))
+            matched = postings if matched is None else np.intersect1d(matched, postings, assume_unique=True)
+        return matched
+
+    def keyword_postings(self, keyword: str, source: str = "keywords") -> np.ndarray:
+        """
+        Returns the sorted positions of the tickets in which a rule keyword
+        matches, the way the agents match it (see `agents.keyword_matcher`):
+        in the subject ("subject_keywords"), the message ("message_keywords")
+        or either ("keywords"), never spanning the two.
+        """
+        tokens = tokenize(keyword)
+        starts = self._phrase_starts(tokens)
+        tickets = starts >> _POSITION_BITS
+        offsets = starts & ((1 << _POSITION_BITS) - 1)
+        subject_lengths = self._subject_lengths[tickets]
+        in_subject = offsets + len(tokens) <= subject_lengths
+        in_message = offsets >= subject_lengths
+        if source == "subject_keywords":
+            tickets = tickets[in_subject]
+        elif source == "message_keywords":
+            tickets = tickets[in_message]
+        else:
+            tickets = tickets[in_subject | in_message]
+        return np.unique(tickets)
+
+    def preview(self, rules: RuleSet, where: Optional[np.ndarray] = None, base: Optional[RuleSet] = None) -> Dict:
+        """
+        Computes the final category, priority and team distribution of the
+        corpus (or of the tickets at positions `where`) under `rules` and under
+        the current rules, from the posting lists alone.
+
+        Args:
+            rules (RuleSet): The changed rules.
+            where (np.ndarray, optional): Ticket positions to restrict to, e.g. from `query`.
+            base (RuleSet, optional): Rules to compare with; the indexed rules if omitted.
+
+        Returns:
+            Dict: "tickets" (number counted), "before" and "after" (value counts
+                  per output field) and "changed" ((before, after) counts of the
+                  tickets whose value changes, per output field).
+        """
+        mask = self.valid.copy()
+        if where is not None:
+            selected = np.zeros(len(self), dtype=bool)
+            selected[where] = True
+            mask &= selected
+        cache: Dict[Tuple[str, str], np.ndarray] = {}
+        before, before_codes = final_outcomes(base or self.rules, self._keys_of(cache))
+        after, after_codes = final_outcomes(rules, self._keys_of(cache))
+        pairs, counts = np.unique(
+            np.stack([before_codes[mask], after_codes[mask]], axis=1).reshape(-1, 2), axis=0, return_counts=True
+        )
+
+        preview = {
+            "tickets": int(mask.sum()),
+            "before": {field: Counter() for field in OUTPUT_FIELDS},
+            "after": {field: Counter() for field in OUTPUT_FIELDS},
+            "changed": {field: Counter() for field in OUTPUT_FIELDS},
+        }
+        for (before_code, after_code), count in zip(pairs.tolist(), counts.tolist()):
+            for i, field in enumerate(OUTPUT_FIELDS):
+                old_value, new_value = before[before_code][i], after[after_code][i]
+                preview["before"][field][old_value] += count
+                preview["after"][field][new_value] += count
+                if old_value != new_value:
+                    preview["changed"][field][(old_value, new_value)] += count
+        return preview
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to a directory (see `load`).
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {
+            "valid": self.valid,
+            "subject_lengths": self._subject_lengths,
+            "tokens.ptr": self._token_postings[0],
+            "tokens.entries": self._token_postings[1],
+        }
+        for field, column in self._columns.items():
+            arrays[f"column.{field}"] = column
+        np.savez(os.path.join(path, "postings.npz"), **arrays)
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as meta_file:
+            json.dump({
+                "version": INDEX_VERSION,
+                "rules": self.rules.spec,
+                "ticket_ids": self.ticket_ids,
+                "tokens": self.tokens,
+                "vocabularies": self._vocabularies,
+            }, meta_file)
+
+    @classmethod
+    def load(cls, path: str) -> "KeywordIndex":
+        """
+        Reads an index written by `save`.
+        """
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported keyword index version: {meta.get('version')}")
+        index = cls(RuleSet(meta["rules"]))
+        index.ticket_ids = meta["ticket_ids"]
+        index.tokens = meta["tokens"]
+        index._token_ids = {token: t for t, token in enumerate(index.tokens)}
+        index._vocabularies = meta["vocabularies"]
+        with np.load(os.path.join(path, "postings.npz")) as arrays:
+            index.valid = arrays["valid"]
+            index._subject_lengths = arrays["subject_lengths"]
+            index._token_postings = (arrays["tokens.ptr"], arrays["tokens.entries"])
+            index._columns = {
+                name[len("column."):]: arrays[name] for name in arrays.files if name.startswith("column.")
+            }
+        return index
+
+    def _phrase_starts(self, tokens: List[str]) -> np.ndarray:
+        # Encoded (ticket, start) pairs where `tokens` occur consecutively.
+        ptr, entries = self._token_postings
+        starts = np.zeros(0, dtype=np.int64)
+        for offset, token in enumerate(tokens):
+            t = self._token_ids.get(token)
+            if t is None:
+                return np.zeros(0, dtype=np.int64)
+            postings = entries[ptr[t]:ptr[t + 1]] - offset
+            # Entries in a ticket's first positions cannot start a later phrase token; drop the wrapped ones
+            if offset:
+                postings = postings[(postings & ((1 << _POSITION_BITS) - 1)) < (1 << _POSITION_BITS) - offset]
+            postings = np.unique(postings)
+            starts = postings if not offset else np.intersect1d(starts, postings, assume_unique=True)
+        return starts
+
+    def _keys_of(self, cache: Dict[Tuple[str, str], np.ndarray]) -> Callable:
+        count = len(self)
+
+        def keyword_matches(source: str, keywords: Tuple[str, ...]) -> np.ndarray:
+            matched = np.zeros(count, dtype=bool)
+            for keyword in keywords:
+                if (source, keyword) not in cache:
+                    cache[source, keyword] = self.keyword_postings(keyword, source)
+                matched[cache[source, keyword]] = True
+            return matched
+
+        return lambda table: feature_keys(table, count, keyword_matches, self._columns, self._vocabularies)
+
+
+def _group(keys: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Groups values by key into CSR arrays, keeping their order within a key.
+    order = np.argsort(keys, kind="stable")
+    ptr = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=size))]).astype(np.int64)
+    return ptr, values[order]
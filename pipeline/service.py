@@ -0,0 +1,203 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+from agents.base_agent import AsyncBaseAgent, BaseAgent, Ticket, AgentOutput
+from agents.orchestrator import Orchestrator
+from agents.records import VALIDATED_TICKET_TYPES
+from pipeline.cache import ResultCache, ticket_cache_key
+from pipeline.processing import default_agents, error_output
+
+
+class TicketService:
+    """
+    Asyncio front-end for the orchestrator.
+
+    Both agent analyses of a ticket run concurrently: agents derived from
+    `AsyncBaseAgent` are awaited directly, while synchronous agents are
+    offloaded to an executor so they never block the event loop. At most
+    `max_in_flight` tickets are processed at once; further callers wait,
+    which applies backpressure to whatever feeds the service. With
+    `short_circuit`, the agents run one after the other instead, cheapest
+    first, and the second is skipped when the first decides the ticket.
+    """
+    def __init__(
+        self,
+        technical_agent: Optional[BaseAgent] = None,
+        customer_agent: Optional[BaseAgent] = None,
+        max_in_flight: int = 64,
+        executor: Optional[Executor] = None,
+        cache: Optional[ResultCache] = None,
+        orchestrator: Optional[Orchestrator] = None,
+        short_circuit: bool = False
+    ):
+        """
+        Args:
+            technical_agent (BaseAgent, optional): Technical agent; if omitted, the
+                                                   shared one, which follows later
+                                                   `register_agent` calls (see `agents.registry`).
+            customer_agent (BaseAgent, optional): Customer context agent; the shared one if omitted.
+            max_in_flight (int): Maximum number of tickets processed concurrently.
+            executor (Executor, optional): Executor for synchronous agents; the
+                                           event loop's default executor if omitted.
+            cache (ResultCache, optional): Cache consulted before running the agents.
+            orchestrator (Orchestrator, optional): Merges the analyses; follows the active rules if omitted.
+            short_circuit (bool): Skips an agent whose analysis cannot change the
+                                  decision (see `Orchestrator.run_agents`).
+        """
+        self._technical_agent = technical_agent
+        self._customer_agent = customer_agent
+        self.max_in_flight = max_in_flight
+        self.executor = executor
+        self.cache = cache
+        self.orchestrator = orchestrator or Orchestrator()
+        self.short_circuit = short_circuit
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def technical_agent(self) -> BaseAgent:
+        return self._agents()[0]
+
+    @property
+    def customer_agent(self) -> BaseAgent:
+        return self._agents()[1]
+
+    async def process(self, ticket_data: Union[Dict, Ticket]) -> AgentOutput:
+        """
+        Processes one ticket, waiting for a free slot if `max_in_flight`
+        tickets are already being processed.
+
+        Args:
+            ticket_data (Union[Dict, Ticket]): Raw ticket information or a validated ticket.
+
+        Returns:
+            AgentOutput: The final aggregated analysis and routing decision.
+        """
+        async with self._get_semaphore():
+            return await self._process(ticket_data)
+
+    async def consume(
+        self,
+        queue: "asyncio.Queue",
+        handle_result: Callable[[Dict, AgentOutput], Optional[Awaitable[None]]]
+    ) -> None:
+        """
+        Consumes raw tickets from `queue` until it yields None, processing up to
+        `max_in_flight` of them concurrently. Tickets are only taken off the
+        queue when a slot is free, so a bounded queue pushes back on producers.
+
+        Args:
+            queue (asyncio.Queue): Source of raw ticket dictionaries; None stops the consumer.
+            handle_result (Callable): Called with (ticket_data, output) for each
+                                      ticket; may be a coroutine function.
+        """
+        semaphore = self._get_semaphore()
+        tasks = set()
+        while True:
+            await semaphore.acquire()
+            ticket_data = await queue.get()
+            if ticket_data is None:
+                semaphore.release()
+                queue.task_done()
+                break
+            task = asyncio.ensure_future(self._consume_one(semaphore, queue, ticket_data, handle_result))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _consume_one(self, semaphore, queue, ticket_data, handle_result) -> None:
+        try:
+            output = await self._process(ticket_data)
+            result = handle_result(ticket_data, output)
+            if asyncio.iscoroutine(result):
+                await result
+        finally:
+            semaphore.release()
+            queue.task_done()
+
+    def _agents(self) -> Tuple[BaseAgent, BaseAgent]:
+        # Agents not given explicitly are looked up on each ticket, so registry changes apply without a restart
+        if self._technical_agent is not None and self._customer_agent is not None:
+            return self._technical_agent, self._customer_agent
+        default_technical_agent, default_customer_agent = default_agents()
+        return self._technical_agent or default_technical_agent, self._customer_agent or default_customer_agent
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; create a fresh one per loop.
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _process(self, ticket_data: Union[Dict, Ticket]) -> AgentOutput:
+        if isinstance(ticket_data, VALIDATED_TICKET_TYPES):
+            ticket = ticket_data
+        else:
+            try:
+                ticket = Ticket(**ticket_data)
+            except Exception as e:
+                return error_output(e)
+
+        # Read once, so a concurrent registry change cannot split a ticket across agents
+        technical_agent, customer_agent = self._agents()
+        cache = self.cache
+        if cache is not None:
+            cache.bind_rules(
+                technical_agent.rules_fingerprint() + customer_agent.rules_fingerprint()
+                + ("+short-circuit" if self.short_circuit else "")
+            )
+            key = ticket_cache_key(ticket)
+            cached_output = cache.get(key)
+            if cached_output is not None:
+                self.orchestrator.log_decision(
+                    ticket.ticket_id, cached_output.category, cached_output.priority, cached_output.recommended_team
+                )
+                return cached_output
+
+        if self.short_circuit:
+            tech_analysis, cust_analysis = await self._run_agents_short_circuit(ticket, technical_agent, customer_agent)
+        else:
+            tech_analysis, cust_analysis = await asyncio.gather(
+                self._run_agent(technical_agent, ticket),
+                self._run_agent(customer_agent, ticket)
+            )
+        final_output = self.orchestrator.merge(ticket.ticket_id, tech_analysis, cust_analysis)
+        if cache is not None:
+            cache.put(key, final_output)
+        return final_output
+
+    async def _run_agents_short_circuit(self, ticket: Ticket, technical_agent: BaseAgent, customer_agent: BaseAgent):
+        # Async counterpart of `Orchestrator.run_agents`
+        (first_name, first_agent), (second_name, second_agent) = self.orchestrator.cost_order(technical_agent, customer_agent)
+        analyses = {first_name: await self._run_agent(first_agent, ticket)}
+        if self.orchestrator.decided(first_name, analyses[first_name]) is None:
+            analyses[second_name] = await self._run_agent(second_agent, ticket)
+        return analyses.get("technical"), analyses.get("customer")
+
+    async def _run_agent(self, agent: BaseAgent, ticket: Ticket) -> AgentOutput:
+        if isinstance(agent, AsyncBaseAgent):
+            return await agent.aanalyze(ticket)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, agent.analyze, ticket)
+
+
+_default_service: Optional[TicketService] = None
+
+
+async def aprocess_ticket(ticket_data: Union[Dict, Ticket]) -> AgentOutput:
+    """
+    Async counterpart of `pipeline.processing.process_ticket`, backed by a shared `TicketService`
+    with the default in-flight limit. Like `process_ticket`, it uses the agents
+    currently registered and the active rules.
+
+    Args:
+        ticket_data (Union[Dict, Ticket]): Raw ticket information or a validated ticket.
+
+    Returns:
+        AgentOutput: The final aggregated analysis and routing decision.
+    """
+    global _default_service
+    if _default_service is None:
+        _default_service = TicketService()
+    return await _default_service.process(ticket_data)
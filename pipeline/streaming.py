@@ -0,0 +1,86 @@
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+from typing import IO, Dict, Iterable, Iterator, Optional, Union
+from agents.base_agent import AgentOutput
+from pipeline import latency
+
+
+def read_tickets(path: str, input_format: Optional[str] = None) -> Iterator[Union[Dict, str]]:
+    """
+    Lazily reads raw tickets from a JSONL or CSV file, one record at a time.
+
+    Args:
+        path (str): File to read, or "-" for standard input.
+        input_format (str, optional): "jsonl" or "csv". Inferred from the file
+                                      extension if omitted; standard input defaults to JSONL.
+
+    Yields:
+        Union[Dict, str]: One raw ticket dictionary per record. A JSONL line that
+                          is not valid JSON is yielded unchanged so that it gets
+                          the regular error output instead of aborting the run.
+    """
+    input_format = input_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with _open(path, "r", sys.stdin) as stream:
+        if input_format == "csv":
+            yield from csv.DictReader(stream)
+            return
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+
+
+def write_results(
+    results: Iterable[AgentOutput],
+    path: Union[str, IO],
+    ticket_ids: Optional[Iterable[Optional[str]]] = None
+) -> int:
+    """
+    Writes analysis results as JSONL, one line per output, as they are produced.
+
+    Args:
+        results (Iterable[AgentOutput]): Outputs to write, typically a lazy stream.
+        path (Union[str, IO]): File to write, "-" for standard output, or an open text stream.
+        ticket_ids (Iterable[Optional[str]], optional): Ticket IDs aligned with
+                                                        `results`, added to each record.
+
+    Returns:
+        int: Number of records written.
+    """
+    ticket_ids = iter(ticket_ids) if ticket_ids is not None else None
+    recorder = latency.recorder
+    count = 0
+    with _open(path, "w", sys.stdout) as stream:
+        for output in results:
+            start = perf_counter() if recorder is not None else 0.0
+            record = output.model_dump()
+            if ticket_ids is not None:
+                record = {"ticket_id": next(ticket_ids, None), **record}
+            stream.write(json.dumps(record) + "\n")
+            if recorder is not None:
+                recorder.observe("serialization", perf_counter() - start)
+            count += 1
+    return count
+
+
+@contextmanager
+def _open(path: Union[str, IO], mode: str, standard_stream: IO) -> Iterator[IO]:
+    """
+    Opens `path`, or yields the given standard stream for "-" (or `path`
+    itself if it is already a stream), leaving it open.
+    """
+    if not isinstance(path, str):
+        yield path
+        return
+    if path == "-":
+        yield standard_stream
+        return
+    with open(path, mode, newline="" if mode == "r" else None, encoding="utf-8") as stream:
+        yield stream
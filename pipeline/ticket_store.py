@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from agents.base_agent import Ticket
+from agents.records import VALIDATED_TICKET_TYPES, TicketRecord
+from pipeline.processing import validate_chunk
+
+STORE_VERSION = 1
+
+# Numeric columns, stored as raw little-endian arrays. `customer_tier` holds
+# codes into the store's tier vocabulary.
+NUMERIC_COLUMNS = {
+    "customer_tier": "<u2",
+    "previous_tickets": "<i8",
+    "monthly_revenue": "<f8",
+    "account_age_days": "<i8",
+}
+# Range of the signed 64-bit integer columns; Pydantic accepts any Python int.
+INT64_RANGE = (-(1 << 63), (1 << 63) - 1)
+# Text columns, stored as one UTF-8 blob each plus an array of n + 1 offsets into it.
+TEXT_COLUMNS = ("ticket_id", "subject", "message")
+
+# Number of tickets decoded from the mapped columns at a time when iterating.
+READ_BLOCK_SIZE = 4096
+
+
+class TicketStore:
+    """
+    Read-only, memory-mapped columnar copy of a ticket corpus (see `write_ticket_store`).
+
+    Opening a store only maps its files, so it is instant whatever the size
+    of the corpus, and processes that open the same store share its pages
+    through the OS page cache. Numeric columns are exposed as NumPy arrays
+    backed by the files; text fields are decoded from their blobs only for
+    the tickets being iterated.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Directory written by `write_ticket_store`.
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported ticket store version: {meta.get('version')}")
+        self.path = path
+        self.tiers: Tuple[str, ...] = tuple(meta["tiers"])
+        self._count = meta["count"]
+
+        self.customer_tier = self._map("customer_tier.col", NUMERIC_COLUMNS["customer_tier"], self._count)
+        self.previous_tickets = self._map("previous_tickets.col", NUMERIC_COLUMNS["previous_tickets"], self._count)
+        self.monthly_revenue = self._map("monthly_revenue.col", NUMERIC_COLUMNS["monthly_revenue"], self._count)
+        self.account_age_days = self._map("account_age_days.col", NUMERIC_COLUMNS["account_age_days"], self._count)
+        self._text = {
+            field: (self._map(f"{field}.off", "<i8", self._count + 1), self._map(f"{field}.txt", "u1"))
+            for field in TEXT_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[TicketRecord]:
+        return self.tickets()
+
+    def __getitem__(self, index: int) -> TicketRecord:
+        if not -self._count <= index < self._count:
+            raise IndexError("ticket store index out of range")
+        index %= self._count
+        return next(self.tickets(index, index + 1))
+
+    def tickets(self, start: int = 0, stop: Optional[int] = None) -> Iterator[TicketRecord]:
+        """
+        Yields the tickets in [start, stop) as slotted `TicketRecord`s, which
+        the agents and processing functions accept without validating them
+        again. Use `TicketRecord.to_ticket` where a Pydantic `Ticket` is needed.
+
+        Args:
+            start (int): Index of the first ticket.
+            stop (int, optional): Index after the last ticket; the end of the store if omitted.
+
+        Yields:
+            TicketRecord: Each ticket, in the order it was written.
+        """
+        stop = self._count if stop is None else min(stop, self._count)
+        tiers = self.tiers
+        for block_start in range(start, stop, READ_BLOCK_SIZE):
+            block_stop = min(block_start + READ_BLOCK_SIZE, stop)
+            # Converting whole slices is much cheaper than reading NumPy scalars one by one
+            ticket_ids, subjects, messages = (self._decode(field, block_start, block_stop) for field in TEXT_COLUMNS)
+            tier_codes = self.customer_tier[block_start:block_stop].tolist()
+            previous_tickets = self.previous_tickets[block_start:block_stop].tolist()
+            monthly_revenue = self.monthly_revenue[block_start:block_stop].tolist()
+            account_age_days = self.account_age_days[block_start:block_stop].tolist()
+            for i in range(block_stop - block_start):
+                yield TicketRecord(
+                    ticket_ids[i], tiers[tier_codes[i]], subjects[i], messages[i],
+                    previous_tickets[i], monthly_revenue[i], account_age_days[i]
+                )
+
+    def ticket_ids(self) -> Iterator[str]:
+        """
+        Yields the ticket IDs only, without decoding the other text fields.
+        """
+        for start, stop in self.ranges(READ_BLOCK_SIZE):
+            yield from self._decode("ticket_id", start, stop)
+
+    def ranges(self, chunk_size: int) -> Iterator[Tuple[int, int]]:
+        """
+        Splits the store into consecutive (start, stop) index ranges of at
+        most `chunk_size` tickets, e.g. to hand out to worker processes.
+        """
+        for start in range(0, self._count, chunk_size):
+            yield start, min(start + chunk_size, self._count)
+
+    def _decode(self, field: str, start: int, stop: int) -> List[str]:
+        offsets, blob = self._text[field]
+        offsets = offsets[start:stop + 1].tolist()
+        base = offsets[0]
+        text = blob[base:offsets[-1]].tobytes()
+        return [text[begin - base:end - base].decode("utf-8") for begin, end in zip(offsets, offsets[1:])]
+
+    def _map(self, name: str, dtype: str, count: Optional[int] = None) -> np.ndarray:
+        file_path = os.path.join(self.path, name)
+        if os.path.getsize(file_path) == 0:
+            # Empty files cannot be memory-mapped
+            return np.empty(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r", shape=count)
+
+
+def write_ticket_store(tickets: Iterable[Union[Dict, Ticket, TicketRecord]], path: str, chunk_size: int = 10000) -> int:
+    """
+    Converts raw tickets (e.g. from `pipeline.streaming.read_tickets`) into a
+    `TicketStore` directory, streaming them a chunk at a time.
+
+    Tickets are validated once here, so reading the store needs no JSON
+    parsing or validation. Row i of the store is always input ticket i, so an
+    invalid ticket, or an integer field outside the 64-bit range of its
+    column, fails the conversion instead of being left out.
+
+    Args:
+        tickets (Iterable[Dict]): Raw ticket dictionaries, or already validated
+                                  tickets (`Ticket`s, or `TicketRecord`s, e.g.
+                                  from another store).
+        path (str): Directory to write; created if needed. Existing store files are replaced.
+        chunk_size (int): Number of tickets validated and written at a time.
+
+    Returns:
+        int: Number of tickets written.
+
+    Raises:
+        ValueError: If a ticket is invalid or does not fit the store's columns;
+                    no readable store is left behind.
+    """
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    tier_codes: Dict[str, int] = {}
+    count = 0
+    offsets = {field: 0 for field in TEXT_COLUMNS}
+    files = {}
+    try:
+        for name in [f"{column}.col" for column in NUMERIC_COLUMNS] + [f"{field}.{ext}" for field in TEXT_COLUMNS for ext in ("off", "txt")]:
+            files[name] = open(os.path.join(path, name), "wb")
+        for field in TEXT_COLUMNS:
+            np.zeros(1, dtype="<i8").tofile(files[f"{field}.off"])
+
+        tickets = iter(tickets)
+        while True:
+            chunk = list(islice(tickets, chunk_size))
+            if not chunk:
+                break
+            valid = validate_chunk(chunk)
+            for position, ticket in enumerate(valid, count):
+                if not isinstance(ticket, VALIDATED_TICKET_TYPES):
+                    raise ValueError(f"Ticket {position} is invalid: {ticket}")
+                _check_int64(ticket, position)
+            count += len(valid)
+
+            for column, dtype in NUMERIC_COLUMNS.items():
+                if column == "customer_tier":
+                    values = [tier_codes.setdefault(ticket.customer_tier, len(tier_codes)) for ticket in valid]
+                    if len(tier_codes) > 0x10000:
+                        raise ValueError("Ticket store supports at most 65536 distinct customer tiers")
+                else:
+                    values = [getattr(ticket, column) for ticket in valid]
+                np.asarray(values, dtype=dtype).tofile(files[f"{column}.col"])
+
+            for field in TEXT_COLUMNS:
+                encoded = [getattr(ticket, field).encode("utf-8") for ticket in valid]
+                chunk_offsets = offsets[field] + np.cumsum([len(value) for value in encoded], dtype="<i8")
+                if len(chunk_offsets):
+                    offsets[field] = int(chunk_offsets[-1])
+                chunk_offsets.tofile(files[f"{field}.off"])
+                files[f"{field}.txt"].write(b"".join(encoded))
+    finally:
+        for stream in files.values():
+            stream.close()
+
+    # Written last, so an interrupted conversion leaves no readable store behind
+    with open(meta_path, "w", encoding="utf-8") as meta_file:
+        json.dump({"version": STORE_VERSION, "count": count, "tiers": list(tier_codes)}, meta_file)
+    return count
+
+
+def _check_int64(ticket: Ticket, position: int) -> None:
+    # Checked before the chunk is written, as NumPy would raise a bare OverflowError midway
+    low, high = INT64_RANGE
+    for column, dtype in NUMERIC_COLUMNS.items():
+        if dtype == "<i8" and not low <= getattr(ticket, column) <= high:
+            raise ValueError(f"Ticket {position}: {column} {getattr(ticket, column)} is outside the 64-bit integer range of the store")
+
+
+def is_ticket_store(path: str) -> bool:
+    """
+    Returns True if `path` is a directory written by `write_ticket_store`.
+    """
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Converts a JSONL or CSV ticket dump into a memory-mapped ticket store.")
+    parser.add_argument("input", help="JSONL or CSV ticket file, or '-' for stdin.")
+    parser.add_argument("output", help="Directory to write the ticket store to.")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format; inferred from the file extension if omitted.")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Tickets validated and written per chunk (default: 10000).")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    from pipeline.streaming import read_tickets
+
+    args = _parse_args()
+    try:
+        written = write_ticket_store(read_tickets(args.input, args.format), args.output, args.chunk_size)
+    except ValueError as e:
+        sys.exit(f"Cannot convert {args.input}: {e}")
+    print(f"Wrote {written} tickets to {args.output}")
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+from agents.rules import activate_rules
+from evaluation.test_cases import get_test_cases
+from pipeline.cache import ResultCache
+from pipeline.processing import process_ticket, process_tickets
+from pipeline.service import TicketService
+from tests.test_rules import custom_rules
+
+
+def _tickets():
+    return [case for case in get_test_cases() if isinstance(case, dict) and "subject" in case]
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_size=2)
+    first, second, third = (process_ticket(ticket_data) for ticket_data in _tickets()[:3])
+    cache.put(b"a", first)
+    cache.put(b"b", second)
+    assert cache.get(b"a") is first
+    cache.put(b"c", third)
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is first and cache.get(b"c") is third
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1, "hit_rate": 0.75}
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = ResultCache(ttl_seconds=10, clock=lambda: now[0])
+    output = process_ticket(_tickets()[0])
+    cache.put(b"a", output)
+    now[0] = 9.5
+    assert cache.get(b"a") is output
+    now[0] = 10.0
+    assert cache.get(b"a") is None
+    assert len(cache) == 0 and cache.evictions == 1
+
+
+def test_cached_outputs_match_and_are_shared():
+    tickets = _tickets()
+    cache = ResultCache()
+    first = list(process_tickets(tickets, cache=cache))
+    assert first == [process_ticket(ticket_data) for ticket_data in tickets]
+    second = list(process_tickets(tickets, cache=cache))
+    assert all(cached is output for cached, output in zip(second, first))
+    assert cache.hits == len(tickets)
+
+
+def test_rules_change_invalidates_the_cache():
+    tickets = _tickets()
+    cache = ResultCache()
+    default_outputs = list(process_tickets(tickets, cache=cache))
+    activate_rules(custom_rules())
+    try:
+        custom_outputs = list(process_tickets(tickets, cache=cache))
+        assert custom_outputs == [process_ticket(ticket_data) for ticket_data in tickets]
+        assert custom_outputs != default_outputs
+    finally:
+        activate_rules(None)
+    assert list(process_tickets(tickets, cache=cache)) == default_outputs
+    assert cache.hits == 0
+
+
+def test_cache_hits_log_the_decision(caplog):
+    ticket_data = _tickets()[0]
+    cache = ResultCache()
+    with caplog.at_level(logging.INFO, logger="ticket_analyzer"):
+        process_ticket(ticket_data, cache=cache)
+        process_ticket(ticket_data, cache=cache)
+        asyncio.run(TicketService(cache=cache).process(ticket_data))
+    decisions = [record for record in caplog.records if "Final Decision" in record.getMessage()]
+    assert cache.hits == 2
+    assert len(decisions) == 3
+    assert {record.fields["ticket_id"] for record in decisions} == {ticket_data["ticket_id"]}
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from benchmarks.synthetic import generate_tickets
+from pipeline.consumer import AdaptiveBatchSize, InMemoryQueue, MicroBatchConsumer
+from pipeline.processing import process_ticket
+
+
+@pytest.fixture
+def tickets():
+    return list(generate_tickets(300, seed=25))
+
+
+def test_outputs_match_process_ticket(tickets):
+    queue = InMemoryQueue()
+    bodies = [json.dumps(ticket_data) if position % 2 else ticket_data for position, ticket_data in enumerate(tickets)]
+    queue.put_many(bodies + [b"{not json", "[1, 2]", {"ticket_id": "bad"}])
+    delivered = []
+    consumer = MicroBatchConsumer(queue, on_results=delivered.extend, max_batch_size=64, max_wait=0.01, poll_timeout=0.01)
+    consumer.run(stop_when_empty=True)
+
+    assert [message.message_id for message, _ in delivered] == list(range(len(tickets) + 3))
+    assert [output for _, output in delivered[:len(tickets)]] == [process_ticket(ticket_data) for ticket_data in tickets]
+    assert [output.category for _, output in delivered[len(tickets):]] == ["Error"] * 3
+    assert (queue.acked, queue.in_flight, len(queue)) == (len(tickets) + 3, 0, 0)
+    assert consumer.batches == 5 and consumer.failed_batches == 0
+
+
+def test_failed_batch_is_retried_one_message_at_a_time(tickets):
+    queue = InMemoryQueue()
+    queue.put_many(tickets[:20])
+    delivered, failures = [], []
+
+    def flaky_sink(results):
+        # Fails the first whole batch, and message 7 on its first two deliveries
+        failing = (len(results) > 1 and not failures) or any(message.message_id == 7 and message.deliveries < 3 for message, _ in results)
+        if failing:
+            failures.append([message.message_id for message, _ in results])
+            raise RuntimeError("sink down")
+        delivered.extend(results)
+
+    consumer = MicroBatchConsumer(queue, on_results=flaky_sink, max_batch_size=20, poll_timeout=0.01, max_deliveries=3)
+    consumer.run(stop_when_empty=True)
+
+    assert failures[0] == list(range(20)) and set(map(tuple, failures[1:])) == {(7,)}
+    assert sorted(message.message_id for message, _ in delivered) == list(range(20))
+    assert {message.message_id: message.deliveries for message, _ in delivered if message.deliveries > 1} == {7: 3}
+    assert all(output == process_ticket(tickets[message.message_id]) for message, output in delivered)
+    assert (queue.acked, queue.in_flight, len(queue)) == (20, 0, 0)
+    assert consumer.failed_batches == 2 and consumer.dead_lettered == 0
+
+
+def test_poison_message_is_dead_lettered(tickets):
+    queue = InMemoryQueue()
+    queue.put_many(tickets[:5])
+    dead = []
+
+    def sink(results):
+        if any(message.message_id == 2 for message, _ in results):
+            raise RuntimeError("cannot store ticket")
+
+    consumer = MicroBatchConsumer(
+        queue, on_results=sink, max_batch_size=5, poll_timeout=0.01, max_deliveries=3,
+        on_dead_letter=lambda message, error: dead.append((message.message_id, message.deliveries, str(error)))
+    )
+    consumer.run(stop_when_empty=True)
+
+    assert dead == [(2, 3, "cannot store ticket")]
+    assert consumer.dead_lettered == 1 and consumer.processed == 4
+    assert (queue.acked, queue.in_flight, len(queue)) == (5, 0, 0)
+
+
+def test_batch_size_adapts_to_latency():
+    sizer = AdaptiveBatchSize(0.01, initial=400, max_size=400, min_samples=50)
+    for _ in range(3):
+        sizer.observe([0.05] * 100, True)
+    assert sizer.size == 50
+    for _ in range(3):
+        sizer.observe([0.001] * 100, True)
+    assert 50 < sizer.size <= 400
@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import evaluation.evaluator as evaluator
+from benchmarks.synthetic import generate_tickets
+from evaluation.evaluator import MetricsAccumulator, accumulate_parallel, accumulate_results, evaluate_labeled, ticket_labels
+from evaluation.ground_truth import confusion_matrix, label_metrics
+from pipeline.processing import process_tickets_detailed
+
+
+def _labeled_tickets(count: int):
+    rng = random.Random(11)
+    tickets = list(generate_tickets(count, seed=11))
+    for ticket_data in tickets[::3]:
+        ticket_data["expected_priority"] = rng.choice(["Low", "Medium", "High", "Critical"])
+        ticket_data["expected_team"] = rng.choice(["Engineering", "DevOps", "Customer Success"])
+    tickets.append({"ticket_id": "bad", "expected_category": "General Inquiry"})
+    return tickets
+
+
+def test_confusion_matrix_counts_pairs():
+    expected = ["a", "b", "b", "c", "a"]
+    predicted = ["a", "b", "c", "c", "b"]
+    labels, matrix = confusion_matrix(expected, predicted)
+    assert labels == ["a", "b", "c"]
+    assert matrix.tolist() == [[1, 1, 0], [0, 1, 1], [0, 0, 1]]
+
+    report = label_metrics(expected, predicted)
+    assert report["accuracy"] == pytest.approx(3 / 5)
+    assert report["per_class"]["b"] == {"precision": 0.5, "recall": 0.5, "f1": 0.5, "support": 2}
+
+
+def test_bulk_label_counts_match_per_ticket_counts(monkeypatch):
+    monkeypatch.setattr(evaluator, "LABEL_BATCH_SIZE", 50)
+    tickets = _labeled_tickets(400)
+
+    bulk = accumulate_results(process_tickets_detailed(tickets), [ticket_labels(ticket_data) for ticket_data in tickets])
+    per_ticket = MetricsAccumulator()
+    for result, ticket_data in zip(process_tickets_detailed(tickets), tickets):
+        per_ticket.add(result.ticket, result.technical, result.customer, result.final, ticket_labels(ticket_data))
+
+    assert bulk.confusion == per_ticket.confusion
+    assert bulk.summary() == per_ticket.summary()
+    assert sum(bulk.confusion["priority"].values()) == len(tickets[:-1][::3])
+    assert bulk.confusion["category"] == Counter({("General Inquiry", "Error"): 1})
+
+
+def test_parallel_evaluation_matches_serial():
+    tickets = _labeled_tickets(300)
+    serial = evaluate_labeled(tickets, workers=1, chunk_size=64)
+    assert evaluate_labeled(tickets, workers=2, chunk_size=64) == serial
+    assert accumulate_parallel(tickets, workers=2, chunk_size=64).confusion == accumulate_results(
+        process_tickets_detailed(tickets), [ticket_labels(ticket_data) for ticket_data in tickets]
+    ).confusion
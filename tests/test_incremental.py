@@ -0,0 +1,83 @@
+import copy
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from agents.rules import RuleSet, activate_rules
+from benchmarks.synthetic import generate_tickets
+from evaluation.test_cases import get_test_cases
+from pipeline.incremental import AnalysisIndex
+from pipeline.processing import process_ticket_detailed
+
+
+def _variant(change) -> RuleSet:
+    spec = copy.deepcopy(RuleSet.default().spec)
+    change(spec)
+    return RuleSet(spec)
+
+
+VARIANTS = {
+    "removed keyword": lambda spec: spec["technical"]["steps"][0][1]["when"]["keywords"].remove("db"),
+    "new keywords": lambda spec: spec["technical"]["steps"][0][3]["when"]["keywords"].extend(["yesterday", "still broken"]),
+    "reordered rules": lambda spec: spec["technical"]["steps"][0].insert(0, spec["technical"]["steps"][0].pop(3)),
+    "threshold": lambda spec: spec["customer"]["steps"][1][0]["when"].update({"monthly_revenue_min": 5000}),
+    "routing": lambda spec: spec["routing"]["rules"].pop(0),
+}
+
+
+@pytest.fixture(scope="module")
+def tickets():
+    raw = list(generate_tickets(600, seed=19, keyword_density=0.2))
+    for ticket_data in raw[::5]:
+        ticket_data["expected_category"] = "Technical - Database"
+    return raw + [case for case in get_test_cases() if isinstance(case, dict)]
+
+
+def _analyses(tickets, rules: RuleSet):
+    # Brute force: every ticket through the regular pipeline under `rules`
+    activate_rules(rules)
+    try:
+        return [process_ticket_detailed(ticket_data) for ticket_data in tickets]
+    finally:
+        activate_rules(None)
+
+
+def _changed(before, after):
+    return [
+        position for position, (old, new) in enumerate(zip(before, after))
+        if old.technical is not None and (old.technical, old.customer, old.final) != (new.technical, new.customer, new.final)
+    ]
+
+
+@pytest.mark.parametrize("name", VARIANTS)
+def test_affected_matches_full_reprocessing(tickets, name):
+    rules = _variant(VARIANTS[name])
+    index = AnalysisIndex.build(tickets)
+    expected = _changed(_analyses(tickets, RuleSet.default()), _analyses(tickets, rules))
+    assert expected
+    assert index.affected(rules, tickets).tolist() == expected
+
+
+def test_new_keywords_need_the_corpus(tickets):
+    index = AnalysisIndex.build(tickets)
+    with pytest.raises(ValueError):
+        index.affected(_variant(VARIANTS["new keywords"]))
+
+
+def test_reanalyze_matches_a_fresh_build(tickets, tmp_path):
+    AnalysisIndex.build(tickets).save(str(tmp_path))
+    index = AnalysisIndex.load(str(tmp_path))
+    for name in ("reordered rules", "new keywords"):
+        rules = _variant(VARIANTS[name])
+        result = index.reanalyze(rules, tickets)
+        analyses = _analyses(tickets, rules)
+        assert result.outputs == [analyses[position].final for position in result.positions]
+
+        fresh = AnalysisIndex.build(tickets, rules)
+        assert index.metrics.summary() == fresh.metrics.summary()
+        assert index.outcomes() == fresh.outcomes()
+        assert index.outcomes() == [
+            (analysis.final.category, analysis.final.priority, analysis.final.recommended_team) if analysis.technical is not None else None
+            for analysis in analyses
+        ]
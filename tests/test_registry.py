@@ -0,0 +1,50 @@
+import pytest
+
+from agents.base_agent import AgentOutput, BaseAgent, Ticket
+from agents.registry import BUILTIN_AGENTS, register_agent
+from evaluation.test_cases import get_test_cases
+from pipeline.processing import process_ticket, process_tickets, process_tickets_parallel
+
+MODEL_REASONING = "Model says ML stuff."
+
+
+class ModelAgent(BaseAgent):
+    """
+    Stand-in for a model-backed agent: plain-text reasoning, no reason codes.
+    """
+    def analyze(self, ticket: Ticket) -> AgentOutput:
+        return AgentOutput(
+            category="Technical - ML", priority="Critical", recommended_team="ML Team",
+            reasoning=MODEL_REASONING
+        )
+
+
+@pytest.fixture
+def model_agent():
+    register_agent("technical", f"{__name__}:ModelAgent")
+    yield
+    register_agent("technical", BUILTIN_AGENTS["technical"])
+
+
+def _tickets():
+    return [case for case in get_test_cases() if isinstance(case, dict) and "subject" in case]
+
+
+@pytest.mark.parametrize("short_circuit", [False, True])
+def test_registered_agent_reasoning_reaches_final_output(model_agent, short_circuit):
+    for output in (process_ticket(ticket_data, short_circuit=short_circuit) for ticket_data in _tickets()):
+        assert output.recommended_team == "ML Team"
+        assert f"Technical perspective: {MODEL_REASONING}\n" in output.reasoning
+
+
+@pytest.mark.parametrize("short_circuit", [False, True])
+def test_registered_agent_reasoning_in_worker_processes(model_agent, short_circuit):
+    tickets = _tickets()
+    parallel = list(process_tickets_parallel(tickets, workers=2, chunk_size=2, short_circuit=short_circuit))
+    assert parallel == list(process_tickets(tickets, short_circuit=short_circuit))
+    assert all(f"Technical perspective: {MODEL_REASONING}\n" in output.reasoning for output in parallel)
+
+
+def test_builtin_reasoning_in_worker_processes():
+    tickets = _tickets()
+    assert list(process_tickets_parallel(tickets, workers=2, chunk_size=2)) == list(process_tickets(tickets))
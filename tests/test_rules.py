@@ -0,0 +1,179 @@
+import copy
+import json
+import re
+from typing import Dict, List, Tuple
+
+import pytest
+
+from agents.base_agent import Ticket
+from agents.customer_context import CustomerContextAgent
+from agents.rules import OUTPUT_FIELDS, RuleSet, activate_rules
+from agents.technical_analyzer import TechnicalAnalyzerAgent
+from benchmarks.synthetic import generate_tickets
+from evaluation.test_cases import get_test_cases
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _mentions(texts: List[str], keywords: List[str]) -> bool:
+    # Whole-token (or consecutive-token) match within one text, written independently of agents.tokens
+    for text in texts:
+        tokens = _tokens(text)
+        for keyword in keywords:
+            phrase = _tokens(keyword)
+            if any(tokens[start:start + len(phrase)] == phrase for start in range(len(tokens) - len(phrase) + 1)):
+                return True
+    return False
+
+
+def _holds(name: str, expected, ticket: Ticket, decided: Dict[str, str]) -> bool:
+    if name == "keywords":
+        return _mentions([ticket.subject, ticket.message], expected)
+    if name == "subject_keywords":
+        return _mentions([ticket.subject], expected)
+    if name == "message_keywords":
+        return _mentions([ticket.message], expected)
+    if name in OUTPUT_FIELDS:
+        value = decided[name]
+        if isinstance(expected, dict):
+            return value not in expected["not"] if "not" in expected else expected["contains"] in value
+        return value in expected
+    if name.endswith("_min"):
+        return getattr(ticket, name[:-4]) >= expected
+    return getattr(ticket, name) in expected
+
+
+def interpret(section: Dict, ticket: Ticket) -> Tuple[str, str, str, Tuple]:
+    """
+    Applies one agent's rule section to a ticket step by step, without any
+    compilation: the reference the decision tables must agree with.
+    """
+    decided = dict(section["defaults"])
+    reason_codes = []
+    for step in section["steps"]:
+        for rule in step:
+            when = rule.get("when", {})
+            conditions = [when] if isinstance(when, dict) else when
+            if any(all(_holds(name, expected, ticket, decided) for name, expected in condition.items()) for condition in conditions):
+                decided.update(rule.get("set", {}))
+                for field, mapping in rule.get("adjust", {}).items():
+                    decided[field] = mapping.get(decided[field], decided[field])
+                if "reason" in rule:
+                    args = tuple(getattr(ticket, field) for field in rule.get("reason_args", ()))
+                    reason_codes.append((rule["reason"], *args) if args else rule["reason"])
+                break
+    return (*(decided[field] for field in OUTPUT_FIELDS), tuple(reason_codes))
+
+
+def custom_rules() -> RuleSet:
+    """
+    The built-in rules with changed thresholds, an extra tier and extra
+    keywords, including a multi-word phrase.
+    """
+    spec = copy.deepcopy(RuleSet.default().spec)
+    enterprise = spec["customer"]["steps"][0][0]
+    enterprise["when"]["customer_tier"].append("gold")
+    spec["customer"]["steps"][1][0]["when"]["monthly_revenue_min"] = 5000
+    spec["customer"]["steps"][2][0]["when"]["previous_tickets_min"] = 3
+    billing = spec["customer"]["steps"][3][0]
+    billing["when"][0]["subject_keywords"] += ["invoice", "charged twice"]
+    critical = spec["technical"]["steps"][1][0]
+    critical["when"]["keywords"] += ["sev1", "site unreachable"]
+    return RuleSet(spec)
+
+
+def _tickets(rules: RuleSet) -> List[Ticket]:
+    # Synthetic tickets draw their keywords from the active rules
+    activate_rules(rules)
+    try:
+        raw = list(generate_tickets(3000, seed=7, keyword_density=0.1, tier_mix=(("free", 0.4), ("premium", 0.3), ("enterprise", 0.2), ("gold", 0.1))))
+    finally:
+        activate_rules(None)
+    cases = [case for case in get_test_cases() if isinstance(case, dict)]
+    tickets = []
+    for ticket_data in raw + cases:
+        try:
+            tickets.append(Ticket(**ticket_data))
+        except ValueError:
+            continue
+    return tickets
+
+
+@pytest.fixture(scope="module", params=["default", "custom"])
+def rules(request) -> RuleSet:
+    return RuleSet.default() if request.param == "default" else custom_rules()
+
+
+@pytest.mark.parametrize("agent_class", [TechnicalAnalyzerAgent, CustomerContextAgent])
+def test_tables_agree_with_rules(rules, agent_class):
+    agent = agent_class(rules)
+    section = rules.spec[agent_class.RULES_SECTION]
+    for ticket in _tickets(rules):
+        output = agent.analyze(ticket)
+        assert (output.category, output.priority, output.recommended_team, output.reason_codes) == interpret(section, ticket), ticket.ticket_id
+
+
+def test_custom_rules_change_decisions():
+    rules = custom_rules()
+    ticket = Ticket(
+        ticket_id="T-1", customer_tier="gold", subject="Charged twice this month",
+        message="Please refund.", previous_tickets=3, monthly_revenue=6000.0, account_age_days=10
+    )
+    category, priority, team, _ = CustomerContextAgent(rules).decide(ticket)
+    assert (category, priority, team) == ("Billing Inquiry", "High", "Billing Support")
+    assert CustomerContextAgent(RuleSet.default()).decide(ticket)[:3] == ("General Inquiry", "Low", "Customer Success")
+
+
+def test_columnar_path_matches_analyze():
+    np = pytest.importorskip("numpy")
+    from agents.customer_context_columnar import analyze_tickets_columnar
+
+    tickets = _tickets(RuleSet.default())
+    agent = CustomerContextAgent(RuleSet.default())
+    outputs = list(analyze_tickets_columnar(tickets, RuleSet.default()).to_outputs())
+    for ticket, columnar in zip(tickets, outputs):
+        output = agent.analyze(ticket)
+        assert (columnar.category, columnar.priority, columnar.recommended_team, columnar.reason_codes) == (
+            output.category, output.priority, output.recommended_team, output.reason_codes
+        )
+    with pytest.raises(ValueError, match="built-in customer rules"):
+        CustomerContextAgent(custom_rules()).analyze_columns(np.zeros(1), np.zeros(1), np.zeros(1))
+
+
+def _malformed(change) -> Dict:
+    spec = copy.deepcopy(RuleSet.default().spec)
+    change(spec)
+    return spec
+
+
+@pytest.mark.parametrize("spec, message", [
+    (["not", "a", "mapping"], "must be a mapping"),
+    (_malformed(lambda spec: spec.pop("routing")), "Missing rule section or field: 'routing'"),
+    (_malformed(lambda spec: spec.update(priorities=[])), "at least one priority"),
+    (_malformed(lambda spec: spec["technical"].update(steps="api")), "Rule steps must be a list"),
+    (_malformed(lambda spec: spec["customer"]["steps"][0][0]["when"].update(colour=["red"])), "Unknown rule condition field: colour"),
+    (_malformed(lambda spec: spec["customer"]["steps"][3][0].update(when={"subject_keywords": "billing"})), "subject_keywords must be a list of strings"),
+    (_malformed(lambda spec: spec["customer"]["steps"][1][0].update(when={"monthly_revenue_min": "lots"})), "monthly_revenue_min must be a number"),
+    (_malformed(lambda spec: spec["customer"]["steps"][0][0].update(set={"team": "Sales"})), "Rules can only set"),
+    (_malformed(lambda spec: spec["customer"]["steps"][1][0].update(reason_args=["revenue"])), "Unknown reason argument field: revenue"),
+    (_malformed(lambda spec: spec["customer"]["defaults"].update(priority="Urgent")), "priority 'Urgent'"),
+    (_malformed(lambda spec: spec["routing"]["rules"][0].update(source="billing")), "Unknown routing source: billing"),
+    (_malformed(lambda spec: spec["routing"]["rules"][0].update(when={"tech.category": ["API"]})), "Unknown routing condition field"),
+    (_malformed(lambda spec: spec["routing"]["rules"][0].update(when={"technical.category": {"regex": "API"}})), "Unknown value test"),
+])
+def test_malformed_rules_are_rejected(spec, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        RuleSet(spec)
+
+
+def test_malformed_rule_file_is_rejected(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(_malformed(lambda spec: spec["technical"]["steps"][0][0].update(when="api"))))
+    with pytest.raises(ValueError, match="'when' must be a condition or a list of conditions"):
+        RuleSet.load(str(path))
+
+    path.write_text("{not json")
+    with pytest.raises(ValueError):
+        RuleSet.load(str(path))
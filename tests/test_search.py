@@ -0,0 +1,96 @@
+import copy
+import re
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from agents.rules import OUTPUT_FIELDS, RuleSet, activate_rules
+from benchmarks.synthetic import generate_tickets
+from evaluation.test_cases import get_test_cases
+from pipeline.processing import process_tickets
+from pipeline.search import KeywordIndex
+
+PHRASES = ["timeout", "payment failed", "api", "error 500", "still broken", "db", "nowhere to be found"]
+
+
+@pytest.fixture(scope="module")
+def tickets():
+    raw = list(generate_tickets(800, seed=20, keyword_density=0.2))
+    return raw + [case for case in get_test_cases() if isinstance(case, dict)]
+
+
+@pytest.fixture(scope="module")
+def index(tickets, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("search"))
+    KeywordIndex.build(tickets).save(path)
+    return KeywordIndex.load(path)
+
+
+def _tokens(text: str):
+    return re.findall(r"\w+", text.lower())
+
+
+def _contains(texts, phrase: str) -> bool:
+    # Consecutive whole tokens within one text, written independently of agents.tokens
+    words = _tokens(phrase)
+    return any(
+        tokens[start:start + len(words)] == words
+        for tokens in map(_tokens, texts) for start in range(len(tokens) - len(words) + 1)
+    )
+
+
+def _valid_positions(tickets):
+    return [position for position, output in enumerate(process_tickets(tickets)) if output.category != "Error"]
+
+
+def test_postings_match_a_text_scan(tickets, index):
+    valid = _valid_positions(tickets)
+    assert index.query().tolist() == valid
+    for phrase in PHRASES:
+        expected = [position for position in valid if _contains([tickets[position]["subject"], tickets[position]["message"]], phrase)]
+        assert index.postings(phrase).tolist() == expected, phrase
+        subject_only = [position for position in valid if _contains([tickets[position]["subject"]], phrase)]
+        assert index.keyword_postings(phrase, "subject_keywords").tolist() == subject_only, phrase
+
+
+def test_query_combines_phrases(tickets, index):
+    valid = _valid_positions(tickets)
+
+    def has(position, phrase):
+        return _contains([tickets[position]["subject"], tickets[position]["message"]], phrase)
+
+    expected = [position for position in valid if has(position, "error") and (has(position, "api") or has(position, "timeout"))]
+    assert index.query(all_of=["error"], any_of=["api", "timeout"]).tolist() == expected
+    assert index.search(all_of=["error"], any_of=["api", "timeout"]) == [tickets[position]["ticket_id"] for position in expected]
+
+
+def _finals(tickets, rules: RuleSet):
+    activate_rules(rules)
+    try:
+        return [tuple(getattr(output, field) for field in OUTPUT_FIELDS) for output in process_tickets(tickets)]
+    finally:
+        activate_rules(None)
+
+
+@pytest.mark.parametrize("restricted", [False, True])
+def test_preview_matches_full_reprocessing(tickets, index, restricted):
+    spec = copy.deepcopy(RuleSet.default().spec)
+    spec["technical"]["steps"][0].insert(0, spec["technical"]["steps"][0].pop(3))
+    spec["customer"]["steps"][3][0]["when"][0]["subject_keywords"].extend(["broken", "urgent"])
+    rules = RuleSet(spec)
+
+    where = index.postings("error") if restricted else None
+    positions = where.tolist() if restricted else _valid_positions(tickets)
+    old, new = _finals(tickets, RuleSet.default()), _finals(tickets, rules)
+    preview = index.preview(rules, where=where)
+
+    assert preview["tickets"] == len(positions)
+    for i, field in enumerate(OUTPUT_FIELDS):
+        assert preview["before"][field] == Counter(old[position][i] for position in positions)
+        assert preview["after"][field] == Counter(new[position][i] for position in positions)
+        assert preview["changed"][field] == Counter(
+            (old[position][i], new[position][i]) for position in positions if old[position][i] != new[position][i]
+        )
+    assert preview["changed"]["category"]
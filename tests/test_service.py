@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from agents.base_agent import AgentOutput, AsyncBaseAgent, Ticket
+from agents.registry import BUILTIN_AGENTS, register_agent
+from evaluation.test_cases import get_test_cases
+from pipeline.processing import process_ticket
+from pipeline.service import TicketService, aprocess_ticket
+
+LLM_REASONING = "The model thinks this is an outage."
+
+
+class LLMAgent(AsyncBaseAgent):
+    """
+    Stand-in for an LLM-backed agent that records how many analyses overlap.
+    """
+    active = 0
+    peak = 0
+
+    async def aanalyze(self, ticket: Ticket) -> AgentOutput:
+        LLMAgent.active += 1
+        LLMAgent.peak = max(LLMAgent.peak, LLMAgent.active)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            LLMAgent.active -= 1
+        return AgentOutput(category="Technical - API", priority="High", recommended_team="Engineering", reasoning=LLM_REASONING)
+
+
+def _tickets():
+    return [case for case in get_test_cases() if isinstance(case, dict) and "subject" in case]
+
+
+@pytest.fixture
+def llm_agent():
+    LLMAgent.active = LLMAgent.peak = 0
+    register_agent("technical", LLMAgent)
+    yield
+    register_agent("technical", BUILTIN_AGENTS["technical"])
+
+
+def test_async_agent_reasoning_reaches_final_output(llm_agent):
+    async def run():
+        service = TicketService()
+        return await asyncio.gather(*(service.process(ticket_data) for ticket_data in _tickets()))
+
+    for output in asyncio.run(run()):
+        assert f"Technical perspective: {LLM_REASONING}\n" in output.reasoning
+
+
+def test_aprocess_ticket_follows_the_registry():
+    ticket_data = _tickets()[0]
+    assert asyncio.run(aprocess_ticket(ticket_data)) == process_ticket(ticket_data)
+
+    register_agent("technical", LLMAgent)
+    try:
+        assert LLM_REASONING in asyncio.run(aprocess_ticket(ticket_data)).reasoning
+    finally:
+        register_agent("technical", BUILTIN_AGENTS["technical"])
+    assert asyncio.run(aprocess_ticket(ticket_data)) == process_ticket(ticket_data)
+
+
+def test_process_limits_tickets_in_flight(llm_agent):
+    async def run():
+        service = TicketService(max_in_flight=3)
+        await asyncio.gather(*(service.process(ticket_data) for ticket_data in _tickets() * 4))
+
+    asyncio.run(run())
+    assert LLMAgent.peak == 3
+
+
+def test_consume_applies_backpressure(llm_agent):
+    tickets = _tickets() * 3
+
+    async def run():
+        service = TicketService(max_in_flight=2)
+        queue = asyncio.Queue(maxsize=1)
+        results = []
+        consumer = asyncio.ensure_future(service.consume(queue, lambda ticket_data, output: results.append(output)))
+        finished_before_put = []
+        for ticket_data in tickets:
+            finished_before_put.append(len(results))
+            await queue.put(ticket_data)
+        await queue.put(None)
+        await consumer
+        return results, finished_before_put
+
+    results, finished_before_put = asyncio.run(run())
+    assert len(results) == len(tickets)
+    assert LLMAgent.peak == 2
+    # The producer could only run ahead by the tickets in flight plus the one queued
+    assert all(finished >= position - 3 for position, finished in enumerate(finished_before_put))
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from agents.base_agent import Ticket
+from agents.records import TicketRecord
+from benchmarks.synthetic import generate_tickets
+from pipeline.processing import process_ticket
+from pipeline.ticket_store import TicketStore, write_ticket_store
+
+
+def _fields(ticket) -> tuple:
+    return tuple(getattr(ticket, field) for field in Ticket.model_fields)
+
+
+def test_store_round_trip(tmp_path):
+    raw = list(generate_tickets(500, seed=3))
+    assert write_ticket_store(raw, str(tmp_path), chunk_size=64) == len(raw)
+    store = TicketStore(str(tmp_path))
+    assert len(store) == len(raw)
+    assert [_fields(record) for record in store] == [_fields(Ticket(**ticket_data)) for ticket_data in raw]
+    assert process_ticket(store[-1]) == process_ticket(raw[-1])
+
+
+def test_store_accepts_validated_tickets(tmp_path):
+    raw = list(generate_tickets(100, seed=4))
+    write_ticket_store(raw, str(tmp_path / "first"))
+    records = list(TicketStore(str(tmp_path / "first")))
+    assert isinstance(records[0], TicketRecord)
+
+    mixed = records[:50] + [Ticket(**ticket_data) for ticket_data in raw[50:]]
+    assert write_ticket_store(mixed, str(tmp_path / "second"), chunk_size=16) == len(raw)
+    assert [_fields(record) for record in TicketStore(str(tmp_path / "second"))] == [_fields(record) for record in records]
+
+
+def test_invalid_ticket_fails_the_conversion(tmp_path):
+    raw = list(generate_tickets(10, seed=5))
+    raw.insert(7, {"ticket_id": "bad"})
+    with pytest.raises(ValueError, match="Ticket 7 is invalid"):
+        write_ticket_store(raw, str(tmp_path), chunk_size=4)
+    with pytest.raises(OSError):
+        TicketStore(str(tmp_path))
+
+
+def test_integers_outside_int64_are_rejected(tmp_path):
+    raw = list(generate_tickets(3, seed=6))
+    raw[2]["account_age_days"] = 1 << 63
+    with pytest.raises(ValueError, match="Ticket 2: account_age_days .* 64-bit integer range"):
+        write_ticket_store(raw, str(tmp_path))
@@ -0,0 +1,76 @@
+import pytest
+
+from agents.base_agent import Ticket
+from agents.customer_context import CustomerContextAgent
+from agents.orchestrator import Orchestrator
+from agents.records import TicketRecord, analyze_record
+from agents.technical_analyzer import TechnicalAnalyzerAgent
+from agents.tokens import TokenSet, normalize_keyword, tokenize
+from pipeline.processing import process_ticket
+
+
+def _ticket(subject: str, message: str = "Thanks.", customer_tier: str = "free") -> Ticket:
+    return Ticket(
+        ticket_id="T-1", customer_tier=customer_tier, subject=subject, message=message,
+        previous_tickets=0, monthly_revenue=0.0, account_age_days=30
+    )
+
+
+def test_tokenize_lowercases_and_splits_on_non_word_characters():
+    assert tokenize("DB-Migration failed: HTTP 500!") == ["db", "migration", "failed", "http", "500"]
+    assert normalize_keyword("Status-Code") == "status code"
+    assert normalize_keyword("--") == ""
+
+
+@pytest.mark.parametrize("subject", [
+    "Some feedback on the product",     # "db" inside "feedback"
+    "A quick question",                 # "ui" inside "quick"
+    "We are interested in an upgrade",  # "rest" inside "interested"
+])
+def test_keywords_inside_other_words_do_not_match(subject):
+    output = TechnicalAnalyzerAgent().analyze(_ticket(subject))
+    assert output.category == "General Technical"
+    assert output.recommended_team == "Support Tier 2"
+
+
+@pytest.mark.parametrize("subject, category", [
+    ("DB is down", "Technical - Database"),
+    ("db-migration stuck", "Technical - Database"),
+    ("New UI is confusing", "Technical - Frontend/UI"),
+    ("REST calls fail", "Technical - API"),
+])
+def test_keywords_match_whole_words(subject, category):
+    assert TechnicalAnalyzerAgent().analyze(_ticket(subject)).category == category
+
+
+def test_multi_word_phrases_match_consecutive_words_only():
+    agent = TechnicalAnalyzerAgent()
+    output = agent.analyze(_ticket("Urgent", "We noticed data loss overnight."))
+    assert (output.category, output.priority) == ("Technical - Database", "Critical")
+
+    assert agent.analyze(_ticket("Urgent", "Loss of data overnight.")).priority != "Critical"
+    # Phrases do not span the end of the subject and the start of the message
+    assert agent.analyze(_ticket("Lost some data", "Loss happened overnight.")).priority != "Critical"
+    assert "data loss" not in TokenSet.from_text("some data", "loss overnight").phrases((2,))
+
+
+def test_phrases_are_built_only_for_requested_lengths_and_starts():
+    tokens = TokenSet.from_text("Data loss after the data migration", "data")
+    assert tokens.phrases((2, 4), {"data"}) == {"data loss", "data migration", "data loss after the"}
+    assert tokens.phrases((3,)) == {"data loss after", "loss after the", "after the data", "the data migration"}
+
+
+def test_customer_keywords_match_whole_words():
+    agent = CustomerContextAgent()
+    assert agent.analyze(_ticket("Billing question")).category == "Billing Inquiry"
+    assert agent.analyze(_ticket("Rebilling question")).category == "General Inquiry"
+    assert agent.analyze(_ticket("Hello", "Cannot LOGIN since Monday")).category == "Account Management"
+
+
+def test_ticket_records_match_like_tickets():
+    ticket = _ticket("Some feedback", "The API has data loss since the db-migration.", customer_tier="premium")
+    record = TicketRecord.from_ticket(ticket)
+    assert record.tokens.keywords.words == ticket.tokens.keywords.words
+
+    agents = TechnicalAnalyzerAgent(), CustomerContextAgent(), Orchestrator()
+    assert analyze_record(record, *agents).to_output() == process_ticket(ticket)